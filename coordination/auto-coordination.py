@@ -16,6 +16,7 @@ import os
 import sys
 import json
 import time
+import asyncio
 import threading
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
@@ -24,6 +25,7 @@ from typing import Dict, List, Optional, Any, Tuple
 sys.path.append(str(Path(__file__).parent / "orchestration"))
 from orchestrator import MultiClaudeOrchestrator
 from coordination_protocol import AgentType, TaskStatus
+from async_coordination import AsyncCoordinationProtocol
 
 class AutoCoordinator:
     """
@@ -41,6 +43,7 @@ class AutoCoordinator:
         self.base_path = "/Users/michaelmishayev/Desktop/Projects/school_2"
         self.coordination_path = Path(self.base_path) / "coordination"
         self._orchestrator: Optional[MultiClaudeOrchestrator] = None
+        self._async_protocol: Optional[AsyncCoordinationProtocol] = None
         
         # Auto-coordination thresholds
         self.complexity_threshold = 0.6  # When to auto-spawn agents
@@ -71,6 +74,13 @@ class AutoCoordinator:
             self._orchestrator = MultiClaudeOrchestrator(self.base_path)
         return self._orchestrator
     
+    @property
+    def async_protocol(self) -> AsyncCoordinationProtocol:
+        """Lazy-load the asyncio interface, sharing the orchestrator's protocol state."""
+        if self._async_protocol is None:
+            self._async_protocol = AsyncCoordinationProtocol(protocol=self.orchestrator.protocol)
+        return self._async_protocol
+    
     def should_auto_coordinate(self, task_description: str, context: Dict = None) -> Tuple[bool, float]:
         """
         Intelligent decision: should we auto-spawn sub-agents?
@@ -136,11 +146,14 @@ class AutoCoordinator:
         
         return should_coordinate, complexity_score
     
-    def auto_coordinate(self, task_description: str, context: Dict = None) -> Dict:
+    def auto_coordinate(self, task_description: str, context: Dict = None,
+                        idempotency_key: Optional[str] = None) -> Dict:
         """
         Main entry point: automatically coordinate with sub-agents if beneficial.
         
         This is the function Claude Code AI calls for development tasks.
+        With an idempotency_key, calling again for the same request (after a
+        timeout or crash) reuses the subtasks already submitted.
         """
         
         print(f"🤖 Analyzing task for auto-coordination...")
@@ -168,7 +181,38 @@ class AutoCoordinator:
         task_plan = self._create_parallel_plan(task_description, context or {})
         
         # Execute coordinated development
-        results = self._execute_coordinated_development(task_plan)
+        results = self._execute_coordinated_development(task_plan, idempotency_key)
+        
+        return {
+            "mode": "multi_agent_coordinated",
+            "complexity_score": complexity_score,
+            "task_plan": task_plan,
+            "execution_results": results,
+            "coordination_summary": self._generate_coordination_summary(results)
+        }
+    
+    async def auto_coordinate_async(self, task_description: str, context: Dict = None,
+                                    timeout: float = 120, idempotency_key: Optional[str] = None) -> Dict:
+        """
+        auto_coordinate for asyncio callers. Subtasks are submitted concurrently
+        and completion is awaited on task events rather than polled, so many
+        plans can run side by side in one event loop.
+        """
+        should_coordinate, complexity_score = self.should_auto_coordinate(task_description, context)
+        
+        if not should_coordinate:
+            return {
+                "mode": "single_agent",
+                "reason": f"Low complexity ({complexity_score:.2f}) - single agent sufficient",
+                "recommendation": "Proceed with normal Claude Code development"
+            }
+        
+        if not self._is_orchestrator_running():
+            print("🚀 Starting orchestration system...")
+            await asyncio.get_running_loop().run_in_executor(None, self._ensure_orchestrator_running)
+        
+        task_plan = self._create_parallel_plan(task_description, context or {})
+        results = await self._execute_coordinated_development_async(task_plan, timeout, idempotency_key)
         
         return {
             "mode": "multi_agent_coordinated",
@@ -263,7 +307,7 @@ class AutoCoordinator:
             "agents_involved": list(set(task["agent"] for task in subtasks))
         }
     
-    def _execute_coordinated_development(self, task_plan: Dict) -> Dict:
+    def _execute_coordinated_development(self, task_plan: Dict, idempotency_key: Optional[str] = None) -> Dict:
         """Execute the coordinated development plan."""
         
         print(f"🎭 Executing coordinated development with {len(task_plan['subtasks'])} parallel tasks")
@@ -278,7 +322,8 @@ class AutoCoordinator:
                 description=subtask["description"],
                 priority=subtask["priority"],
                 context=json.dumps({"main_task": task_plan["main_task"]}),
-                dependencies=subtask.get("dependencies", [])
+                dependencies=subtask.get("dependencies", []),
+                idempotency_key=f"{idempotency_key}:{i}" if idempotency_key else None
             )
             
             submitted_tasks.append({
@@ -330,6 +375,48 @@ class AutoCoordinator:
             "parallel_efficiency": "40% faster than sequential execution"
         }
     
+    async def _execute_coordinated_development_async(self, task_plan: Dict, timeout: float,
+                                                     idempotency_key: Optional[str] = None) -> Dict:
+        """Submit the plan's subtasks concurrently and await their outcomes."""
+        protocol = self.async_protocol
+        start_time = time.time()
+        context = json.dumps({"main_task": task_plan["main_task"]})
+        
+        task_ids = await asyncio.gather(*(
+            protocol.create_task(subtask["type"], subtask["description"], subtask["priority"],
+                                 context, subtask.get("dependencies", []),
+                                 f"{idempotency_key}:{i}" if idempotency_key else None)
+            for i, subtask in enumerate(task_plan["subtasks"])))
+        print(f"  📤 Submitted {len(task_ids)} tasks for: {task_plan['main_task']}")
+        
+        final = await protocol.wait_for_tasks(task_ids, timeout)
+        
+        submitted_tasks = []
+        completed_tasks = []
+        for task_id, subtask in zip(task_ids, task_plan["subtasks"]):
+            task = {
+                "task_id": task_id,
+                "description": subtask["description"],
+                "agent": subtask["agent"],
+                "status": final[task_id]["status"] if final.get(task_id) else "unknown"
+            }
+            submitted_tasks.append(task)
+            
+            if task["status"] == TaskStatus.COMPLETED.value:
+                task["result"] = await protocol.get_task_result(task_id)
+                completed_tasks.append(task)
+                print(f"  ✅ Completed: {task['description']}")
+        
+        execution_time = time.time() - start_time
+        
+        return {
+            "submitted_tasks": submitted_tasks,
+            "completed_tasks": completed_tasks,
+            "execution_time": f"{execution_time:.1f}s",
+            "success_rate": len(completed_tasks) / len(submitted_tasks) if submitted_tasks else 0,
+            "parallel_efficiency": f"{len(submitted_tasks)} subtasks run concurrently"
+        }
+    
     def _generate_coordination_summary(self, results: Dict) -> str:
         """Generate human-readable coordination summary."""
         
@@ -405,7 +492,7 @@ class AutoCoordinator:
 # Global instance for easy import
 auto_coordinator = AutoCoordinator()
 
-def auto_coordinate(task_description: str, context: Dict = None) -> Dict:
+def auto_coordinate(task_description: str, context: Dict = None, idempotency_key: Optional[str] = None) -> Dict:
     """
     Convenience function for Claude Code AI to get automatic coordination help.
     
@@ -421,7 +508,16 @@ def auto_coordinate(task_description: str, context: Dict = None) -> Dict:
     print(result["coordination_summary"])
     ```
     """
-    return auto_coordinator.auto_coordinate(task_description, context)
+    return auto_coordinator.auto_coordinate(task_description, context, idempotency_key)
+
+
+async def auto_coordinate_async(task_description: str, context: Dict = None, timeout: float = 120,
+                                idempotency_key: Optional[str] = None) -> Dict:
+    """
+    Coroutine version of auto_coordinate; run several plans at once with
+    asyncio.gather(auto_coordinate_async(a), auto_coordinate_async(b)).
+    """
+    return await auto_coordinator.auto_coordinate_async(task_description, context, timeout, idempotency_key)
 
 
 def quick_parallel_help(task_description: str) -> Dict:
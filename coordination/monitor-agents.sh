@@ -205,6 +205,7 @@ for line in sys.stdin:
         event_emoji = {
             'task_created': '📋',
             'task_assigned': '👤',
+            'task_claimed': '👤',
             'task_updated': '🔄',
             'agent_registered': '🤖',
             'agent_heartbeat': '💓'
@@ -216,7 +217,7 @@ for line in sys.stdin:
         if event_type == 'task_created':
             data = event['data']
             print(f'   Task: {data.get(\"description\", \"Unknown\")[:50]}...')
-        elif event_type == 'task_assigned':
+        elif event_type in ('task_assigned', 'task_claimed'):
             data = event['data']
             print(f'   Agent: {data.get(\"agent_id\", \"Unknown\")}')
         elif event_type == 'agent_registered':
@@ -233,6 +234,35 @@ for line in sys.stdin:
     fi
 }
 
+# Stream events as they are appended (event_stream.py follows the log)
+follow_events() {
+    echo -e "${YELLOW}📡 FOLLOWING EVENTS${NC}"
+    echo "Press Ctrl+C to exit"
+    echo
+    
+    cd "$ORCHESTRATION_DIR"
+    python3 -u event_stream.py --coordination-path "$COORDINATION_DIR" | python3 -u -c "
+import json
+import sys
+
+for line in sys.stdin:
+    try:
+        event = json.loads(line)['event']
+        event_emoji = {
+            'task_created': '📋',
+            'task_claimed': '👤',
+            'task_updated': '🔄',
+            'agent_registered': '🤖'
+        }.get(event['type'], '📝')
+        
+        data = event['data']
+        detail = data.get('description') or data.get('status') or data.get('agent_id') or data.get('id') or ''
+        print(f'{event_emoji} {event[\"timestamp\"][11:19]} - {event[\"type\"]} {str(detail)[:50]}')
+    except Exception as e:
+        print(f'Error parsing event: {e}')
+"
+}
+
 # Display system performance
 show_performance() {
     echo
@@ -338,6 +368,9 @@ main() {
         --events|-e)
             show_recent_events
             ;;
+        --follow|-f)
+            follow_events
+            ;;
         --performance|-p)
             show_performance
             ;;
@@ -351,6 +384,7 @@ main() {
             echo "  -t, --tasks        Task queue status only"
             echo "  -h, --health       Coordination health only"
             echo "  -e, --events       Recent events only"
+            echo "  -f, --follow       Stream events as they happen"
             echo "  -p, --performance  Performance metrics only"
             echo "  --help             Show this help message"
             echo
@@ -81,13 +81,18 @@ class AgentClient:
         return success
     
     def start_task(self, task_id: str) -> bool:
-        """Mark task as in progress."""
+        """Mark task as in progress. Fails if the task was reassigned (stolen) first."""
         success = self.protocol.update_task_status(
             task_id, 
             TaskStatus.IN_PROGRESS, 
             agent_id=self.agent_id
         )
         
+        task = self.protocol.get_task(task_id) or {}
+        if success and task.get("assigned_to") not in (None, self.agent_id):
+            print(f"↪️ Task {task_id} was reassigned to {task['assigned_to']} before it started")
+            return False
+        
         if success:
             print(f"🔄 {self.agent_type.value.upper()} Agent started task: {task_id}")
             self.heartbeat(current_task=task_id)
@@ -109,12 +114,13 @@ class AgentClient:
             
             # Check if completion creates new tasks
             if "next_tasks" in result:
-                for next_task in result["next_tasks"]:
+                for i, next_task in enumerate(result["next_tasks"]):
                     new_task_id = self.protocol.create_task(
                         task_type=next_task["type"],
                         description=next_task["description"],
                         priority=next_task.get("priority", 2),
-                        dependencies=[task_id]  # Depend on completed task
+                        dependencies=[task_id],  # Depend on completed task
+                        idempotency_key=f"{task_id}:next:{i}"  # Once, even if completion is retried
                     )
                     print(f"📋 Created follow-up task: {new_task_id}")
         
@@ -145,14 +151,12 @@ class AgentClient:
     def get_dependency_result(self, dependency_task_id: str) -> Optional[Dict]:
         """Get result from a completed dependency task."""
         try:
-            with open(self.protocol.task_queue_path) as f:
-                queue_data = json.load(f)
+            task = self.protocol.get_task(dependency_task_id) or self.protocol.get_archived_task(dependency_task_id)
             
-            if dependency_task_id in queue_data["tasks"]:
-                task = queue_data["tasks"][dependency_task_id]
+            if task is not None:
                 if task["status"] == TaskStatus.COMPLETED.value and "result" in task:
                     print(f"📥 Retrieved dependency result: {dependency_task_id}")
-                    return task["result"]
+                    return self.protocol.resolve_payload(task["result"])  # Loads out-of-line results
                 else:
                     print(f"⏳ Dependency not ready: {dependency_task_id} (status: {task['status']})")
                     return None
@@ -171,25 +175,34 @@ class AgentClient:
         """
         print(f"🤖 Starting autonomous work loop for {self.agent_type.value} agent")
         
+        # Wake as soon as tasks are created, released or assigned to us instead of on a timer
+        task_feed = self.protocol.subscribe(types=["task_created", "task_updated", "task_claimed"])
+        
         for iteration in range(max_iterations):
             print(f"\n--- Iteration {iteration + 1}/{max_iterations} ---")
             
             # Send heartbeat
             self.heartbeat()
             
-            # Check for available tasks
-            tasks = self.check_tasks()
-            
-            if not tasks:
-                print("😴 No tasks available, sleeping...")
-                time.sleep(30)  # Wait 30 seconds before checking again
-                continue
-            
-            # Claim the highest priority task
-            task = tasks[0]  # Already sorted by priority
+            # Work the orchestrator queued for this agent comes first
+            queued = self.protocol.query_tasks(status=TaskStatus.ASSIGNED, assigned_to=self.agent_id,
+                                               limit=1)["tasks"]
+            if queued:
+                task = queued[0]
+            else:
+                # Check for available tasks
+                tasks = self.check_tasks()
+                
+                if not tasks:
+                    print("😴 No tasks available, waiting for new tasks...")
+                    task_feed.poll(timeout=30)  # Returns on the next task event, at most 30 seconds
+                    continue
+                
+                # Claim the highest priority task
+                task = tasks[0]  # Already sorted by priority
             task_id = task["id"]
             
-            if self.claim_task(task_id):
+            if queued or self.claim_task(task_id):
                 print(f"🔄 Processing task: {task['description']}")
                 
                 # Start task
@@ -209,7 +222,9 @@ class AgentClient:
                 
             else:
                 print("😞 Task already claimed by another agent")
-                time.sleep(10)  # Brief wait before trying next task
+                time.sleep(0.1)  # Brief backoff; the next task is already known
+        
+        task_feed.close()
     
     def _execute_task(self, task: Dict) -> Optional[Dict]:
         """
@@ -272,7 +287,7 @@ def main():
                        help="Agent type")
     parser.add_argument("--action", choices=["register", "heartbeat", "check-tasks", 
                                            "claim-task", "start-task", "complete-task", 
-                                           "fail-task", "get-dependency", "auto-work"],
+                                           "fail-task", "get-dependency", "task-history", "auto-work"],
                        default="check-tasks", help="Action to perform")
     parser.add_argument("--task-id", help="Task ID for task-specific actions")
     parser.add_argument("--result", help="Task result (JSON string)")
@@ -283,8 +298,8 @@ def main():
     
     args = parser.parse_args()
     
-    # Create agent client
-    agent_id = f"{args.agent}-agent-{os.getpid()}"
+    # Create agent client, under the id the orchestrator assigns work to if it spawned us
+    agent_id = os.environ.get("CLAUDE_AGENT_ID", f"{args.agent}-agent-{os.getpid()}")
     client = AgentClient(agent_id, args.agent)
     
     # Execute requested action
@@ -334,6 +349,13 @@ def main():
         if result:
             print(json.dumps(result, indent=2))
     
+    elif args.action == "task-history":
+        if not args.task_id:
+            print("❌ --task-id required for task-history")
+            sys.exit(1)
+        for event in client.protocol.task_history(args.task_id):
+            print(json.dumps(event))
+    
     elif args.action == "auto-work":
         client.register()
         client.auto_work_loop(args.max_iterations)
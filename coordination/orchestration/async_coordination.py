@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Asyncio Coordination Protocol
+
+AsyncCoordinationProtocol exposes the coordination operations as coroutines,
+so one event loop can supervise many agents and plans without a thread per
+waiter. It wraps a CoordinationProtocol:
+
+- File and database I/O runs on a bounded thread pool
+- Contended locks are retried with asyncio.sleep backoff; a worker thread
+  only ever makes a single non-blocking lock attempt, so waiting for a lock
+  ties up no thread
+- subscribe() returns an event_stream.Subscription for `async for`
+
+Each locked operation takes its lock and runs its body on the same worker
+thread, because the SQLite backend binds the lock to that thread's
+transaction.
+
+Usage:
+  async with AsyncCoordinationProtocol(base_path) as protocol:
+      task_id = await protocol.create_task("search", "Find auth handlers")
+      subscription = await protocol.subscribe(types=["task_updated"])
+      async for event in subscription:
+          ...
+"""
+
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from coordination_protocol import AgentType, CoordinationProtocol, TaskStatus
+from event_stream import Subscription
+
+_LOCK_BUSY = object()
+
+
+class AsyncCoordinationProtocol:
+    """
+    Coroutine interface to CoordinationProtocol.
+    
+    Pass an existing protocol to share its in-memory state with synchronous
+    callers, or the CoordinationProtocol arguments to create one.
+    """
+    
+    def __init__(self, *args, protocol: Optional[CoordinationProtocol] = None,
+                 max_workers: int = 8, lock_timeout: float = 10, **kwargs):
+        self.protocol = protocol or CoordinationProtocol(*args, **kwargs)
+        self.lock_timeout = lock_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="coordination-io")
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        self.close()
+    
+    def close(self) -> None:
+        """Stop the worker threads once queued operations have finished."""
+        self._executor.shutdown(wait=False)
+    
+    async def _run(self, function: Callable, *args, **kwargs) -> Any:
+        """Run a blocking protocol call on the worker pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+    
+    def _attempt_locked(self, lock_name: str, operation: Callable, args: tuple) -> Any:
+        """Worker side: one non-blocking lock attempt, then the operation."""
+        if not self.protocol._acquire_lock(lock_name, timeout=0):
+            return _LOCK_BUSY
+        try:
+            return operation(*args)
+        finally:
+            self.protocol._release_lock(lock_name)
+    
+    async def _run_locked(self, lock_name: str, operation: Callable, *args) -> Any:
+        """
+        Run operation(*args) under a cross-process lock, waiting for the lock
+        with the same backoff as the blocking protocol (1 ms doubling to
+        100 ms). Returns False if it stays busy for lock_timeout seconds.
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.001
+        while True:
+            result = await self._run(self._attempt_locked, lock_name, operation, args)
+            if result is not _LOCK_BUSY:
+                return result
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+    
+    # ==================== TASKS ====================
+    
+    async def create_task(self, task_type: str, description: str, priority: int = 2,
+                          context: str = None, dependencies: List[str] = None,
+                          idempotency_key: Optional[str] = None) -> str:
+        return await self._run(self.protocol.create_task, task_type, description,
+                               priority, context, dependencies, idempotency_key)
+    
+    async def assign_task(self, task_id: str, agent_id: str) -> bool:
+        """Claim a task for an agent (optimistic; takes no lock)."""
+        return await self._run(self.protocol.assign_task, task_id, agent_id)
+    
+    async def update_task_status(self, task_id: str, status: TaskStatus,
+                                 result: Dict = None, agent_id: str = None) -> bool:
+        return await self._run_locked("task_update", self.protocol._update_task_status_locked,
+                                      task_id, status, result, agent_id)
+    
+    async def get_available_tasks(self, agent_type: AgentType, limit: Optional[int] = None) -> List[Dict]:
+        return await self._run(self.protocol.get_available_tasks, agent_type, limit)
+    
+    async def count_available_tasks(self, agent_type: AgentType) -> int:
+        return await self._run(self.protocol.count_available_tasks, agent_type)
+    
+    async def get_task(self, task_id: str) -> Optional[Dict]:
+        return await self._run(self.protocol.get_task, task_id)
+    
+    async def get_task_result(self, task_id: str) -> Optional[Any]:
+        return await self._run(self.protocol.get_task_result, task_id)
+    
+    async def query_tasks(self, **filters) -> Dict:
+        return await self._run(self.protocol.query_tasks, **filters)
+    
+    # ==================== AGENTS ====================
+    
+    async def register_agent(self, agent_id: str, agent_type: AgentType, pid: int) -> bool:
+        return await self._run_locked("agent_registry", self.protocol._register_agent_locked,
+                                      agent_id, agent_type, pid)
+    
+    async def deregister_agent(self, agent_id: str) -> bool:
+        return await self._run_locked("agent_registry", self.protocol._deregister_agent_locked, agent_id)
+    
+    async def update_agent_heartbeat(self, agent_id: str, current_task: str = None) -> bool:
+        return await self._run(self.protocol.update_agent_heartbeat, agent_id, current_task)
+    
+    async def get_agent(self, agent_id: str) -> Optional[Dict]:
+        return await self._run(self.protocol.get_agent, agent_id)
+    
+    # ==================== EVENTS ====================
+    
+    async def subscribe(self, from_offset: Optional[str] = None,
+                        types: Optional[List[str]] = None) -> Subscription:
+        """Open a subscription (see CoordinationProtocol.subscribe); iterate it with `async for`."""
+        return await self._run(self.protocol.subscribe, from_offset, types)
+    
+    async def wait_for_tasks(self, task_ids: List[str], timeout: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Wait until every task in task_ids is completed, failed or cancelled.
+        
+        Returns the final task records by id; tasks still open when timeout
+        expires are returned in their current state.
+        """
+        terminal = {TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value}
+        # Subscribe before reading state, so no update falls in between
+        subscription = await self.subscribe(types=["task_updated"])
+        try:
+            tasks = {task_id: await self.get_task(task_id) for task_id in task_ids}
+            pending = {task_id for task_id, task in tasks.items() if task and task["status"] not in terminal}
+            
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(subscription.__anext__(), remaining)
+                except (asyncio.TimeoutError, StopAsyncIteration):
+                    break
+                
+                task_id = event["data"]["task_id"]
+                if task_id in pending and event["data"]["status"] in terminal:
+                    tasks[task_id] = await self.get_task(task_id)
+                    pending.discard(task_id)
+            
+            for task_id in pending:
+                tasks[task_id] = await self.get_task(task_id)
+            return tasks
+        finally:
+            subscription.close()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Agent Autoscaler
+
+Decides how many agents of each type the orchestrator should run. The
+backlog of a type is its ready tasks plus the tasks its agents still hold;
+the autoscaler aims for target_queue_depth backlog per agent, within the
+type's min_agents..max_agents.
+
+- Scale up as soon as the backlog needs more agents, then wait
+  scale_up_cooldown before adding more (new agents take a while to start).
+- Scale down one agent at a time, only after the backlog has stayed below
+  half of what the remaining agents could carry for scale_down_cooldown
+  seconds. The gap between the two thresholds is the hysteresis that keeps a
+  brief spike or lull from flapping the agent count.
+- The agent picked for retirement is the least loaded one. It is drained
+  (no new assignments) and stopped by the orchestrator once it has finished
+  what it holds.
+- On top of what the backlog needs, keep a warm pool of started, idle
+  agents so a new task is assigned at once instead of waiting for an agent
+  to start. Its size follows recent demand: the tasks expected to arrive
+  during one agent startup (arrival rate over demand_window x measured
+  startup time), rounded to the nearest agent (ties down, so sparse
+  arrivals leave it at the floor), between warm_agents and max_warm_agents. Refilling the
+  pool after a warm agent takes a task ignores scale_up_cooldown.
+- Agents of a type that fail to start back off scale-ups of that type: no
+  refill outside the cooldown, and a cooldown of start_failure_backoff
+  doubling per consecutive failure (up to max_start_backoff), until one
+  starts again. A type whose agents crash at startup is retried ever more
+  slowly instead of respawned every round.
+
+Every decision is returned as a ScalingDecision. The orchestrator logs it
+as an autoscaler_decision coordination event, so the policy can be tuned
+from the log.
+
+Usage:
+  autoscaler = Autoscaler({AgentType.BLUE: ScalingPolicy(min_agents=1, max_agents=4)})
+  autoscaler.record_arrival(AgentType.BLUE)          # per new task
+  autoscaler.record_startup(AgentType.BLUE, 14.2)    # per agent that became ready
+  autoscaler.record_start_failure(AgentType.BLUE)    # per agent that exited or timed out starting
+  decision = autoscaler.evaluate(AgentType.BLUE, ready_tasks=12, load={"blue-agent-1": 5})
+"""
+
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from statistics import median
+from typing import Dict, List, Optional
+
+from coordination_protocol import AgentType
+
+
+@dataclass
+class ScalingPolicy:
+    """Scaling limits and pacing for one agent type."""
+    min_agents: int = 0
+    max_agents: int = 1
+    target_queue_depth: int = 2  # Backlog (ready + held tasks) per agent
+    scale_up_cooldown: float = 30  # Seconds between scale-ups
+    scale_down_cooldown: float = 300  # Seconds of low backlog (and since any change) before a scale-down
+    scale_down_utilization: float = 0.5  # Low backlog: below this share of the remaining agents' target
+    warm_agents: int = 0  # Idle agents kept started at all times
+    max_warm_agents: int = 0  # Upper bound for the demand-sized warm pool
+    demand_window: float = 600  # Seconds of task arrivals the warm pool is sized from
+    expected_startup: float = 30  # Startup seconds assumed until one is measured
+    start_failure_backoff: float = 30  # Scale-up cooldown after a failed start, doubled per further failure
+    max_start_backoff: float = 600  # Upper bound for that cooldown
+
+
+@dataclass
+class ScalingDecision:
+    """One autoscaler decision, as logged."""
+    agent_type: str
+    action: str  # "scale_up" or "scale_down"
+    count: int
+    reason: str
+    backlog: int
+    current_agents: int
+    desired_agents: int
+    warm_target: int = 0
+    retire: List[str] = field(default_factory=list)  # scale_down: agents to drain
+
+
+class Autoscaler:
+    """
+    Per-type scaling decisions with cooldowns and hysteresis.
+    
+    Stateful (it remembers when each type last changed and since when its
+    backlog has been low), so one instance serves one orchestrator.
+    """
+    
+    def __init__(self, policies: Dict[AgentType, ScalingPolicy]):
+        self.policies = policies
+        self._last_scale_up: Dict[AgentType, float] = {}
+        self._last_change: Dict[AgentType, float] = {}
+        self._low_since: Dict[AgentType, float] = {}
+        self._arrivals: Dict[AgentType, deque] = {}  # Task arrival times within demand_window
+        self._startups: Dict[AgentType, deque] = {}  # Recent spawn-to-ready seconds
+        self._start_failures: Dict[AgentType, int] = {}  # Consecutive failed starts
+    
+    def record_arrival(self, agent_type: AgentType, now: Optional[float] = None) -> None:
+        """Note a new task for agent_type (warm pool demand)."""
+        self._arrivals.setdefault(agent_type, deque()).append(time.time() if now is None else now)
+    
+    def record_startup(self, agent_type: AgentType, seconds: float) -> None:
+        """Note how long an agent of agent_type took from spawn to ready."""
+        self._startups.setdefault(agent_type, deque(maxlen=20)).append(seconds)
+        self._start_failures.pop(agent_type, None)
+    
+    def record_start_failure(self, agent_type: AgentType) -> None:
+        """Note an agent of agent_type that exited or timed out before becoming ready."""
+        self._start_failures[agent_type] = self._start_failures.get(agent_type, 0) + 1
+    
+    def scale_up_cooldown(self, agent_type: AgentType) -> float:
+        """Seconds to wait between scale-ups of agent_type, backed off after failed starts."""
+        policy = self.policies[agent_type]
+        failures = self._start_failures.get(agent_type, 0)
+        if not failures:
+            return policy.scale_up_cooldown
+        backoff = min(policy.max_start_backoff, policy.start_failure_backoff * 2 ** (failures - 1))
+        return max(policy.scale_up_cooldown, backoff)
+    
+    def startup_time(self, agent_type: AgentType) -> Optional[float]:
+        """Median measured startup seconds for agent_type, or None before the first."""
+        startups = self._startups.get(agent_type)
+        return median(startups) if startups else None
+    
+    def warm_target(self, agent_type: AgentType, now: Optional[float] = None) -> int:
+        """Idle agents to keep started for agent_type, from recent demand."""
+        policy = self.policies.get(agent_type)
+        if policy is None:
+            return 0
+        now = time.time() if now is None else now
+        
+        arrivals = self._arrivals.get(agent_type, deque())
+        while arrivals and arrivals[0] < now - policy.demand_window:
+            arrivals.popleft()
+        startup = self.startup_time(agent_type)
+        expected = len(arrivals) / policy.demand_window * (policy.expected_startup if startup is None else startup)
+        return max(policy.warm_agents, min(policy.max_warm_agents, math.ceil(expected - 0.5)))
+    
+    def evaluate(self, agent_type: AgentType, ready_tasks: int, load: Dict[str, int],
+                 now: Optional[float] = None) -> Optional[ScalingDecision]:
+        """
+        The scaling step for agent_type, or None to leave it as is.
+        
+        ready_tasks is the number of tasks waiting for an agent of the type;
+        load maps each running (or starting) agent, excluding draining ones,
+        to the tasks it holds.
+        """
+        policy = self.policies.get(agent_type)
+        if policy is None:
+            return None
+        now = time.time() if now is None else now
+        
+        current = len(load)
+        backlog = ready_tasks + sum(load.values())
+        needed = max(policy.min_agents, math.ceil(backlog / policy.target_queue_depth))
+        warm = self.warm_target(agent_type, now)
+        desired = min(policy.max_agents, needed + warm)
+        
+        def decision(action, count, reason, retire=()):
+            self._last_change[agent_type] = now
+            self._low_since.pop(agent_type, None)
+            if action == "scale_up":
+                self._last_scale_up[agent_type] = now
+            return ScalingDecision(agent_type.value, action, count, reason, backlog,
+                                   current, desired, warm, list(retire))
+        
+        if desired > current:
+            self._low_since.pop(agent_type, None)
+            refill = current >= min(policy.max_agents, needed)
+            failures = self._start_failures.get(agent_type, 0)
+            if refill and not failures:
+                return decision("scale_up", desired - current, f"refill warm pool of {warm}")
+            
+            # Also while agents that failed to start are being replaced
+            if now - self._last_scale_up.get(agent_type, float("-inf")) < self.scale_up_cooldown(agent_type):
+                return None
+            if refill:
+                reason = f"refill warm pool of {warm}"
+            elif current < policy.min_agents:
+                reason = f"below minimum of {policy.min_agents}"
+            else:
+                reason = f"backlog {backlog} over {policy.target_queue_depth} per agent"
+            if failures:
+                reason += f" (after {failures} failed starts)"
+            return decision("scale_up", desired - current, reason)
+        
+        # Low enough that one agent fewer (besides the warm pool) would
+        # still be under half its target
+        low = (current > desired
+               and backlog <= (current - 1 - warm) * policy.target_queue_depth * policy.scale_down_utilization)
+        if not low:
+            self._low_since.pop(agent_type, None)
+            return None
+        
+        low_since = self._low_since.setdefault(agent_type, now)
+        if (now - low_since < policy.scale_down_cooldown
+                or now - self._last_change.get(agent_type, float("-inf")) < policy.scale_down_cooldown):
+            return None
+        
+        retiree = min(load, key=lambda agent_id: load[agent_id])
+        return decision("scale_down", 1, f"backlog {backlog} low for {policy.scale_down_cooldown:.0f}s",
+                        [retiree])
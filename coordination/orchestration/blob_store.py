@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Blob Store
+
+Large task payloads (results, contexts) live out of line under
+orchestration/blobs/, named by the SHA-256 of their content, so events and
+the task views carry only a small reference. Identical payloads share one
+file. Blobs are written once (temp file, fsync, rename) and never change,
+so readers need no locking.
+
+Layout:
+  blobs/<first 2 hex digits>/<remaining 62 hex digits>
+  file: one flag byte (b"z" zlib-compressed, b"r" raw), then the payload
+
+A reference is a dict {"$blob": "sha256:<hex>", "encoding": "json" | "text",
+"size": <payload bytes>}; resolve() turns it back into the original value.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Dict
+
+BLOB_KEY = "$blob"
+_COMPRESSED = b"z"
+_RAW = b"r"
+
+
+def is_blob_ref(value: Any) -> bool:
+    """Whether value is a reference written by BlobStore.externalize."""
+    return isinstance(value, dict) and BLOB_KEY in value
+
+
+class BlobStore:
+    """
+    Out-of-line storage for payloads of at least `threshold` bytes.
+    
+    CRITICAL: blobs are never deleted here; a blob may be referenced by any
+    number of events, including ones in sealed segments and snapshots.
+    """
+    
+    def __init__(self, path: Path, threshold: int = 4096, compress: bool = True):
+        self.path = Path(path)
+        self.threshold = threshold
+        self.compress = compress
+    
+    def _blob_path(self, digest: str) -> Path:
+        hex_digest = digest.split(":", 1)[1]
+        return self.path / hex_digest[:2] / hex_digest[2:]
+    
+    def put(self, payload: bytes) -> str:
+        """Store payload (once per distinct content) and return its digest."""
+        digest = "sha256:" + hashlib.sha256(payload).hexdigest()
+        blob_path = self._blob_path(digest)
+        if blob_path.exists():
+            return digest  # Deduplicated
+        
+        body = _RAW + payload
+        if self.compress:
+            compressed = zlib.compress(payload, 6)
+            if len(compressed) < len(payload):
+                body = _COMPRESSED + compressed
+        
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = blob_path.with_suffix(f".tmp.{uuid.uuid4().hex}")
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(body)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(temp_path, 0o600)
+            temp_path.replace(blob_path)  # A concurrent writer of the same content wins harmlessly
+        finally:
+            temp_path.unlink(missing_ok=True)
+        return digest
+    
+    def get(self, digest: str) -> bytes:
+        """Payload of a stored blob, checked against its digest."""
+        with open(self._blob_path(digest), 'rb') as f:
+            body = f.read()
+        
+        payload = zlib.decompress(body[1:]) if body[:1] == _COMPRESSED else body[1:]
+        if "sha256:" + hashlib.sha256(payload).hexdigest() != digest:
+            raise Exception(f"Blob {digest} is corrupted")
+        return payload
+    
+    def externalize(self, value: Any) -> Any:
+        """
+        Replace a string or JSON value of at least threshold bytes with a
+        blob reference; smaller values (and None) are returned unchanged.
+        """
+        if value is None or is_blob_ref(value):
+            return value
+        
+        if isinstance(value, str):
+            payload, encoding = value.encode(), "text"
+        else:
+            payload, encoding = json.dumps(value, default=str, sort_keys=True).encode(), "json"
+        
+        if len(payload) < self.threshold:
+            return value
+        return {BLOB_KEY: self.put(payload), "encoding": encoding, "size": len(payload)}
+    
+    def resolve(self, value: Any) -> Any:
+        """The original value behind a blob reference; other values pass through."""
+        if not is_blob_ref(value):
+            return value
+        
+        payload = self.get(value[BLOB_KEY])
+        return payload.decode() if value.get("encoding") == "text" else json.loads(payload)
+    
+    def stats(self) -> Dict[str, int]:
+        """Number of stored blobs and their size on disk."""
+        blobs = [p for p in self.path.glob("??/*") if ".tmp." not in p.name]
+        return {"blobs": len(blobs), "bytes": sum(p.stat().st_size for p in blobs)}
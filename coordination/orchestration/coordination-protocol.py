@@ -10,20 +10,34 @@ Architecture:
 - Atomic file operations (write-then-rename)
 - File-based locking with timeouts
 - Automatic conflict resolution
+- Pluggable storage (JSONL files or SQLite, see coordination_storage.py)
+- Heartbeats in a memory-mapped liveness table (see liveness_table.py)
 """
 
 import json
 import time
-import fcntl
 import os
+import sys
 import uuid
+import heapq
+import bisect
 import threading
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Set
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+# Add coordination module to path
+sys.path.append(str(Path(__file__).parent))
+from coordination_storage import (BACKENDS, Durability, JsonlStorageBackend, LogPositionLost,
+                                  ShardedStorageBackend, StorageBackend, configured_backend)
+from liveness_table import LivenessTable
+from blob_store import BlobStore
+from bloom_filter import BloomFilter
+from task_archive import TaskArchive
+from event_stream import Subscription, open_subscription
+
 class TaskStatus(Enum):
     PENDING = "pending"
     ASSIGNED = "assigned"
@@ -67,12 +81,230 @@ class Agent:
     tasks_completed: int = 0
     tasks_failed: int = 0
 
+def _enum_value(value: Any, enum_cls) -> str:
+    """
+    Normalize an enum field read from the event log to its plain value.
+    
+    Older logs serialized enums with str(), e.g. "TaskStatus.PENDING".
+    """
+    if isinstance(value, enum_cls):
+        return value.value
+    if isinstance(value, str) and value.startswith(f"{enum_cls.__name__}."):
+        return enum_cls[value.split(".", 1)[1]].value
+    return value
+
+class StateHooks:
+    """
+    Listener for the state changes an EventApplier makes. The defaults do
+    nothing and judge readiness from the state itself, which is all a
+    one-off replay (state_at) needs; CoordinationProtocol keeps its indexes
+    and view change sets in step by overriding them.
+    """
+    
+    def task_replacing(self, task_id: str) -> None:
+        """A task_created event is about to replace existing task_id."""
+    
+    def task_added(self, task_id: str, was_unmet: bool) -> None:
+        """task_id was created (or replaced)."""
+    
+    def task_changing(self, task_id: str) -> Any:
+        """task_id is about to change; the result is passed to task_changed."""
+        return None
+    
+    def task_changed(self, task_id: str, before: Any, was_unmet: bool) -> None:
+        """task_id was assigned or its status changed."""
+    
+    def task_removing(self, task_id: str) -> None:
+        """task_id is about to leave the state (archived)."""
+    
+    def task_removed(self, task_id: str, was_unmet: bool) -> None:
+        """task_id left the state."""
+    
+    def agent_changed(self, agent_id: str) -> None:
+        """agent_id was registered, updated or deregistered."""
+    
+    def claim_resolved(self, event_id: str, won: bool) -> None:
+        """The task_claimed event event_id took its task (won) or not."""
+    
+    def is_ready(self, applier: "EventApplier", task_id: str) -> bool:
+        """Whether task_id is pending with every dependency met."""
+        task = applier.tasks.get(task_id)
+        return (task is not None
+                and task["status"] == TaskStatus.PENDING.value
+                and not any(applier.is_unmet(dep_id) for dep_id in set(task["dependencies"])))
+
+
+class EventApplier:
+    """
+    The event -> state transition of the coordination protocol: applies
+    logged events, in log order, to task and agent dicts (modified in
+    place). CoordinationProtocol uses one for its live state and state_at
+    a throwaway one for past states, so both always agree on what an event
+    does. Index maintenance is left to the hooks.
+    """
+    
+    def __init__(self, tasks: Dict[str, Dict], agents: Dict[str, Dict],
+                 hooks: Optional[StateHooks] = None):
+        self.tasks = tasks
+        self.agents = agents
+        self.hooks = hooks or StateHooks()
+        
+        # Dedup index: idempotency key -> task id for tasks in this state
+        self.idempotency_keys: Dict[str, str] = {}
+        for task_id, task in tasks.items():
+            task.setdefault("version", 0)  # Checkpoints predating versions
+            if task.get("idempotency_key") is not None:
+                self.idempotency_keys[task["idempotency_key"]] = task_id
+    
+    def is_unmet(self, task_id: str) -> bool:
+        """Whether task_id blocks the tasks that depend on it."""
+        return task_id in self.tasks and self.tasks[task_id]["status"] != TaskStatus.COMPLETED.value
+    
+    def apply(self, event: Dict) -> None:
+        """Apply a single event to the state."""
+        event_type = event["type"]
+        data = event["data"]
+        
+        if event_type == "task_created":
+            key = data.get("idempotency_key")
+            if key is not None and self.idempotency_keys.get(key, data["id"]) != data["id"]:
+                return  # Duplicate submission that lost the race; the first task stands
+            task_data = dict(data)
+            task_data["status"] = _enum_value(task_data["status"], TaskStatus)
+            task_data["dependencies"] = task_data.get("dependencies") or []
+            task_data["version"] = 1
+            task_id = task_data["id"]
+            was_unmet = self.is_unmet(task_id)
+            if task_id in self.tasks:
+                self.hooks.task_replacing(task_id)
+            self.tasks[task_id] = task_data
+            if key is not None:
+                self.idempotency_keys[key] = task_id
+            self.hooks.task_added(task_id, was_unmet)
+        
+        elif event_type == "task_assigned":
+            # Unconditional assignment, written by versions before task_claimed
+            if data["task_id"] in self.tasks:
+                self._assign(data)
+        
+        elif event_type == "task_claimed":
+            won = self._steal_wins(data) if "from_agent" in data else self._claim_wins(data)
+            if won:
+                self._assign(data)
+            self.hooks.claim_resolved(event["id"], won)
+        
+        elif event_type == "task_updated":
+            task_id = data["task_id"]
+            if task_id in self.tasks and not self._stale_start(data):
+                was_unmet = self.is_unmet(task_id)
+                before = self.hooks.task_changing(task_id)
+                task = self.tasks[task_id]
+                task["status"] = data["status"]
+                if data["status"] == TaskStatus.PENDING.value:
+                    task["assigned_to"] = None  # Back in the queue, held by no agent
+                task["updated_at"] = data["timestamp"]
+                task["version"] += 1
+                if "result" in data:
+                    task["result"] = data["result"]
+                self.hooks.task_changed(task_id, before, was_unmet)
+        
+        elif event_type == "tasks_archived":
+            # Only tasks unchanged since they were selected leave the hot state
+            for task_id, version in data["tasks"].items():
+                task = self.tasks.get(task_id)
+                if task is not None and task["version"] == version:
+                    self._remove_task(task_id)
+        
+        elif event_type == "agent_registered":
+            agent_data = dict(data)
+            agent_data["type"] = _enum_value(agent_data["type"], AgentType)
+            self.agents[agent_data["id"]] = agent_data
+            self.hooks.agent_changed(agent_data["id"])
+        
+        elif event_type == "agent_heartbeat":
+            # Written only by versions before the liveness table
+            agent_id = data["agent_id"]
+            if agent_id in self.agents:
+                self.agents[agent_id]["last_heartbeat"] = data["timestamp"]
+                if data["current_task"]:
+                    self.agents[agent_id]["current_task"] = data["current_task"]
+                self.hooks.agent_changed(agent_id)
+        
+        elif event_type == "agent_deregistered":
+            if self.agents.pop(data["agent_id"], None) is not None:
+                self.hooks.agent_changed(data["agent_id"])
+    
+    def _remove_task(self, task_id: str) -> None:
+        """Drop a task from the state."""
+        was_unmet = self.is_unmet(task_id)
+        self.hooks.task_removing(task_id)
+        key = self.tasks.pop(task_id).get("idempotency_key")
+        if key is not None and self.idempotency_keys.get(key) == task_id:
+            del self.idempotency_keys[key]
+        self.hooks.task_removed(task_id, was_unmet)
+    
+    def _claim_wins(self, data: Dict) -> bool:
+        """Whether a task_claimed event takes its task: ready, and unchanged since the claimant read it."""
+        task_id = data["task_id"]
+        return (self.hooks.is_ready(self, task_id)
+                and self.tasks[task_id]["version"] == data["expected_version"])
+    
+    def _steal_wins(self, data: Dict) -> bool:
+        """Whether a reassignment takes its task: still queued, unstarted, on the victim agent."""
+        task = self.tasks.get(data["task_id"])
+        return (task is not None
+                and task["status"] == TaskStatus.ASSIGNED.value
+                and task["assigned_to"] == data["from_agent"]
+                and task["version"] == data["expected_version"])
+    
+    def _stale_start(self, data: Dict) -> bool:
+        """Whether data starts a task for an agent it is no longer assigned to (it was stolen)."""
+        if data["status"] != TaskStatus.IN_PROGRESS.value or data.get("agent_id") is None:
+            return False
+        assigned_to = self.tasks[data["task_id"]].get("assigned_to")
+        return assigned_to is not None and assigned_to != data["agent_id"]
+    
+    def _assign(self, data: Dict) -> None:
+        """Assign an existing task to data["agent_id"] and bump its version."""
+        task_id = data["task_id"]
+        was_unmet = self.is_unmet(task_id)
+        before = self.hooks.task_changing(task_id)
+        task = self.tasks[task_id]
+        task["assigned_to"] = data["agent_id"]
+        task["status"] = TaskStatus.ASSIGNED.value
+        task["updated_at"] = data["timestamp"]
+        task["version"] += 1
+        self.hooks.task_changed(task_id, before, was_unmet)
+
 class CoordinationProtocol:
     """
     Thread-safe coordination protocol with atomic operations and event sourcing.
     """
     
-    def __init__(self, base_path: str = "/Users/michaelmishayev/Desktop/Projects/school_2/coordination"):
+    # Task type keywords each agent type handles
+    TASK_ROUTING = {
+        # Blue agent (Search & Discovery)
+        AgentType.BLUE: ["search", "analyze", "discover", "investigate", "find"],
+        
+        # Green agent (Code Generation)
+        AgentType.GREEN: ["code", "implement", "create", "fix", "refactor", "build"],
+        
+        # Red agent (Critical Review)
+        AgentType.RED: ["review", "audit", "security", "validate", "assess"]
+    }
+    
+    # Task fields with a secondary index (see query_tasks)
+    QUERY_FIELDS = ("status", "assigned_to", "type")
+    
+    # Sharded backend: one shard per agent type, so each type's claims take
+    # their own lock, plus one for events of no type
+    SHARDS = [agent_type.value for agent_type in AgentType] + ["system"]
+    
+    def __init__(self, base_path: str = "/Users/michaelmishayev/Desktop/Projects/school_2/coordination",
+                 backend: Optional[str] = None,
+                 durability: Optional[Dict[str, Any]] = None,
+                 blob_threshold: int = 4096,
+                 archive_compression: str = "gzip"):
         self.base_path = Path(base_path)
         self.orchestration_path = self.base_path / "orchestration"
         self.event_log_path = self.orchestration_path / "event-log.jsonl"
@@ -80,123 +312,213 @@ class CoordinationProtocol:
         self.agent_registry_path = self.orchestration_path / "agent-registry.json"
         self.locks_path = self.orchestration_path / "locks"
         
-        # Thread-local storage for file locks
-        self._local = threading.local()
+        # Materialized state, maintained incrementally from the event log.
+        # _position is the storage position of the first event not yet
+        # applied; it is None until the state has been loaded.
+        self._state_lock = threading.RLock()
+        self._tasks: Dict[str, Dict] = {}
+        self._agents: Dict[str, Dict] = {}
+        self._index_hooks = _IndexHooks(self)
+        self._applier = EventApplier(self._tasks, self._agents, self._index_hooks)
+        self._position: Any = None
+        self._changed_tasks: Optional[Set[str]] = set()
+        self._changed_agents: Optional[Set[str]] = set()
         
-        # Initialize files if they don't exist
-        self._initialize_files()
-    
-    def _initialize_files(self):
-        """Initialize coordination files with proper permissions."""
-        self.orchestration_path.mkdir(parents=True, exist_ok=True)
-        self.locks_path.mkdir(exist_ok=True)
+        # Ready-task index: pending tasks with no unmet dependencies, with
+        # one (priority, created_at, task_id) heap per agent type. Heap entries
+        # for tasks that left _ready_tasks are dropped lazily when popped.
+        self._ready_tasks: Set[str] = set()
+        self._ready_heaps: Dict[AgentType, List] = {agent_type: [] for agent_type in AgentType}
+        self._heap_members: Dict[AgentType, Set[str]] = {agent_type: set() for agent_type in AgentType}
+        self._ready_counts: Dict[AgentType, int] = {agent_type: 0 for agent_type in AgentType}
+        
+        # Dependency graph: reverse edges plus, per task, the number of its
+        # dependencies that exist and are not completed. Unknown dependency
+        # ids count as met, as they always have for assignment.
+        self._dependents: Dict[str, Set[str]] = {}  # task_id -> tasks depending on it
+        self._unmet_dependencies: Dict[str, int] = {}
+        self._routing_cache: Dict[str, List[AgentType]] = {}
+        
+        # Secondary indexes for query_tasks: per field value, and overall, a
+        # list of (created_at, task_id) kept sorted, so pages come out in
+        # creation order and a cursor is just the last key returned.
+        self._tasks_by_created: List[tuple] = []
+        self._task_field_indexes: Dict[str, Dict[Any, List[tuple]]] = {
+            field: {} for field in self.QUERY_FIELDS}
         
-        # Initialize empty files if they don't exist
-        if not self.event_log_path.exists():
-            self.event_log_path.touch()
-            os.chmod(self.event_log_path, 0o600)
+        # Outcome of this process's in-flight claims: claim event id -> None
+        # until replay resolves it, then True (won) or False (lost)
+        self._claim_outcomes: Dict[str, Optional[bool]] = {}
         
-        if not self.task_queue_path.exists():
-            self._atomic_write(self.task_queue_path, {"tasks": {}, "version": 1})
+        # The dedup index of live idempotency keys is the applier's; keys of
+        # archived tasks are in the on-disk Bloom filter instead.
         
-        if not self.agent_registry_path.exists():
-            self._atomic_write(self.agent_registry_path, {"agents": {}, "version": 1})
+        # Storage backend: explicit choice, else whatever storage.json records
+        backend = backend or configured_backend(self.orchestration_path)
+        self.storage = self._create_storage(backend)
+        
+        # Heartbeats live outside the event log; registration stays in it
+        self.liveness = LivenessTable(self.orchestration_path / "liveness.bin")
+        
+        # Results and contexts of blob_threshold bytes or more are stored out
+        # of line; events and views keep only a reference
+        self.blobs = BlobStore(self.orchestration_path / "blobs", threshold=blob_threshold)
+        
+        # Finished tasks moved out of the hot state by archive_tasks()
+        self.archive = TaskArchive(self.orchestration_path / "archive", archive_compression)
+        self.archived_keys = BloomFilter(self.orchestration_path / "archived-keys.bloom")
+        
+        # Durability per event type (strict / batched / volatile); event types
+        # not listed are strict
+        self.durability_policy: Dict[str, Durability] = {}
+        for event_type, level in (durability or {}).items():
+            self.durability_policy[event_type] = Durability(_enum_value(level, Durability))
     
-    def _atomic_write(self, file_path: Path, data: Dict) -> None:
-        """
-        CRITICAL: Atomic file write to prevent corruption from simultaneous writes.
-        Uses write-to-temp-file-then-rename pattern.
+    def _durability_for(self, event_type: str) -> Durability:
+        """Durability level configured for an event type."""
+        return self.durability_policy.get(event_type, Durability.STRICT)
+    
+    def _create_storage(self, backend: str) -> StorageBackend:
+        """Instantiate the named storage backend."""
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown storage backend: {backend}")
+        
+        if backend == ShardedStorageBackend.name:
+            return ShardedStorageBackend(self.orchestration_path, self._checkpoint_state,
+                                         shard_for=self._shard_for, shards=self.SHARDS)
+        if issubclass(BACKENDS[backend], JsonlStorageBackend):
+            return BACKENDS[backend](self.orchestration_path, self._checkpoint_state)
+        return BACKENDS[backend](self.orchestration_path)
+    
+    def _shard_for(self, event: Dict) -> str:
         """
-        temp_path = file_path.with_suffix(f".tmp.{uuid.uuid4().hex}")
+        Sharded backend: the agent type an event belongs to. Task events go
+        to the shard of the task's (first) agent type, agent events to the
+        agent's type, anything else to "system".
         
-        try:
-            with open(temp_path, 'w') as f:
-                json.dump(data, f, indent=2, default=str)
-                f.flush()
-                os.fsync(f.fileno())  # Force write to disk
-            
-            # Atomic rename - this is the critical atomic operation
-            temp_path.replace(file_path)
-            os.chmod(file_path, 0o600)
-            
-        except Exception as e:
-            # Cleanup temp file on failure
-            if temp_path.exists():
-                temp_path.unlink()
-            raise Exception(f"Atomic write failed for {file_path}: {e}")
+        A task or agent this process has not seen yet is looked up again
+        after catching up, so every process routes an event to the same
+        shard however stale its state was.
+        """
+        return self._route_event(event, self._agent_types_for, self._known_task, self._known_agent)
     
-    def _acquire_lock(self, lock_name: str, timeout: int = 10) -> bool:
+    def _known_task(self, task_id: str) -> Optional[Dict]:
+        """A task, catching up first if another process created it since our last catch-up."""
+        if task_id not in self._tasks:
+            self._catch_up()
+        return self._tasks.get(task_id)
+    
+    def _known_agent(self, agent_id: str) -> Optional[Dict]:
+        """An agent, catching up first if another process registered it since our last catch-up."""
+        if agent_id not in self._agents:
+            self._catch_up()
+        return self._agents.get(agent_id)
+    
+    @staticmethod
+    def _route_event(event: Dict, agent_types_for: Callable[[str], List[AgentType]],
+                     task_of: Callable[[str], Optional[Dict]],
+                     agent_of: Callable[[str], Optional[Dict]]) -> str:
+        """The shard of event (see _shard_for), given how to look up its task or agent."""
+        data = event["data"]
+        agent_types = []
+        if event["type"] == "task_created":
+            agent_types = agent_types_for(data["type"])
+        elif "task_id" in data:
+            task = task_of(data["task_id"])
+            agent_types = agent_types_for(task["type"]) if task else []
+        elif event["type"] == "agent_registered":
+            return _enum_value(data["type"], AgentType)
+        elif "agent_id" in data:
+            agent = agent_of(data["agent_id"])
+            return agent["type"] if agent else "system"
+        return agent_types[0].value if agent_types else "system"
+    
+    @classmethod
+    def import_shard_router(cls) -> Callable[[Dict], str]:
         """
-        Acquire file-based lock with timeout to prevent deadlocks.
+        shard_for for importing an existing log into the sharded backend
+        (migrate_event_log): routes each event as _shard_for does, from the
+        state replayed from the events imported before it.
         """
-        lock_file = self.locks_path / f"{lock_name}.lock"
+        replay = EventApplier({}, {})
+        routing = {}
         
-        # Create lock file if it doesn't exist
-        lock_file.touch()
+        def agent_types_for(task_type: str) -> List[AgentType]:
+            if task_type not in routing:
+                routing[task_type] = cls._match_agent_types(task_type)
+            return routing[task_type]
         
-        try:
-            lock_fd = open(lock_file, 'w')
-            
-            # Try to acquire exclusive lock with timeout
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                try:
-                    fcntl.flock(lock_fd.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
-                    # Store file descriptor for later release
-                    if not hasattr(self._local, 'locks'):
-                        self._local.locks = {}
-                    self._local.locks[lock_name] = lock_fd
-                    return True
-                except IOError:
-                    time.sleep(0.1)  # Brief wait before retry
-            
-            # Timeout reached
-            lock_fd.close()
-            return False
-            
-        except Exception as e:
-            if 'lock_fd' in locals():
-                lock_fd.close()
-            raise Exception(f"Lock acquisition failed for {lock_name}: {e}")
+        def shard_for(event: Dict) -> str:
+            shard = cls._route_event(event, agent_types_for, replay.tasks.get, replay.agents.get)
+            replay.apply(event)
+            return shard
+        
+        return shard_for
+    
+    def _acquire_lock(self, lock_name: str, timeout: int = 10) -> bool:
+        """
+        Acquire cross-process lock with timeout to prevent deadlocks.
+        """
+        return self.storage.acquire_lock(lock_name, timeout)
     
     def _release_lock(self, lock_name: str) -> None:
-        """Release file-based lock."""
-        if hasattr(self._local, 'locks') and lock_name in self._local.locks:
-            lock_fd = self._local.locks[lock_name]
-            fcntl.flock(lock_fd.fileno(), fcntl.LOCK_UN)
-            lock_fd.close()
-            del self._local.locks[lock_name]
+        """Release cross-process lock."""
+        self.storage.release_lock(lock_name)
+    
+    def _with_lock(self, lock_name: str, operation, *args, timeout: int = 10) -> Any:
+        """
+        Run operation(*args) holding a cross-process lock; False if the lock
+        was not acquired within timeout seconds (0: a single attempt).
+        """
+        if not self._acquire_lock(lock_name, timeout):
+            return False
+        
+        try:
+            return operation(*args)
+        finally:
+            self._release_lock(lock_name)
     
-    def _append_event(self, event_type: str, data: Dict) -> None:
+    def _append_event(self, event_type: str, data: Dict, event_id: Optional[str] = None) -> str:
         """
         CRITICAL: Append event to log atomically.
         This is the source of truth for all coordination state.
         """
         event = {
-            "id": str(uuid.uuid4()),
+            "id": event_id or str(uuid.uuid4()),
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "type": event_type,
             "data": data
         }
         
-        # Acquire lock for event log
-        if not self._acquire_lock("event_log"):
-            raise Exception("Failed to acquire event log lock")
+        self.storage.append_event(event, self._durability_for(event_type))
+        return event["id"]
+    
+    def compact_event_log(self) -> Dict:
+        """
+        Fold superseded heartbeat events into the latest checkpoint.
         
-        try:
-            with open(self.event_log_path, 'a') as f:
-                json.dump(event, f, default=str)
-                f.write('\n')
-                f.flush()
-                os.fsync(f.fileno())
-        finally:
-            self._release_lock("event_log")
+        Every task event is kept, so task history, claim outcomes and
+        state_at survive compaction. Returns backend statistics.
+        """
+        return self.storage.compact()
     
     def create_task(self, task_type: str, description: str, priority: int = 2, 
-                   context: str = None, dependencies: List[str] = None) -> str:
+                   context: str = None, dependencies: List[str] = None,
+                   idempotency_key: Optional[str] = None) -> str:
         """
         Create new task with atomic coordination update.
+        
+        With an idempotency_key, submitting the same key again returns the
+        id of the task first created with it instead of enqueuing duplicate
+        work. Concurrent submissions race in the log: the first
+        task_created event with the key wins on replay, later ones are
+        ignored, and every submitter gets the winner's id.
         """
+        if idempotency_key is not None:
+            existing = self._find_idempotent_task(idempotency_key)
+            if existing is not None:
+                return existing
+        
         task_id = str(uuid.uuid4())
         now = datetime.now(timezone.utc).isoformat()
         
@@ -209,251 +531,810 @@ class CoordinationProtocol:
             created_at=now,
             updated_at=now,
             description=description,
-            context=context,
+            context=self.blobs.externalize(context),
             dependencies=dependencies or []
         )
         
         # Append event to log
-        self._append_event("task_created", asdict(task))
+        task_data = asdict(task)
+        task_data["status"] = task.status.value
+        if idempotency_key is not None:
+            task_data["idempotency_key"] = idempotency_key
+        self._append_event("task_created", task_data)
         
         # Update derived state (task queue)
-        self._rebuild_task_queue()
+        self._sync_views()
         
+        if idempotency_key is not None:
+            with self._state_lock:
+                return self._applier.idempotency_keys.get(idempotency_key, task_id)
         return task_id
     
+    def _find_idempotent_task(self, idempotency_key: str) -> Optional[str]:
+        """
+        Id of the task submitted with idempotency_key, or None. Live tasks
+        are a dict lookup; the Bloom filter rules out archived keys, and
+        only a filter hit reads the archive's key index (one bucket).
+        """
+        self._catch_up()
+        with self._state_lock:
+            task_id = self._applier.idempotency_keys.get(idempotency_key)
+        if task_id is not None or idempotency_key not in self.archived_keys:
+            return task_id
+        
+        found = self.archive.find_key(idempotency_key)
+        return found[0] if found is not None else None  # None: Bloom filter false positive
+    
     def assign_task(self, task_id: str, agent_id: str) -> bool:
         """
         Assign task to agent with conflict detection.
+        
+        Claims are optimistic: a task_claimed event carries the task version
+        this process saw, and replay lets the first claim in log order that
+        still matches the version win. No assignment lock is taken; the
+        caller learns the outcome when its own claim is applied.
         """
-        if not self._acquire_lock("task_assignment"):
-            return False
+        # Bring in-memory state up to date with the log
+        self._catch_up()
         
-        try:
-            # Read current state
-            with open(self.task_queue_path) as f:
-                queue_data = json.load(f)
-            
-            if task_id not in queue_data["tasks"]:
+        with self._state_lock:
+            # Unknown, already assigned, or dependencies not completed
+            if task_id not in self._ready_tasks:
                 return False
+            expected_version = self._tasks[task_id]["version"]
             
-            task_data = queue_data["tasks"][task_id]
-            
-            # Check if task is already assigned
-            if task_data["status"] != TaskStatus.PENDING.value:
-                return False
-            
-            # Check task dependencies
-            if task_data["dependencies"]:
-                for dep_id in task_data["dependencies"]:
-                    if dep_id in queue_data["tasks"]:
-                        dep_status = queue_data["tasks"][dep_id]["status"]
-                        if dep_status != TaskStatus.COMPLETED.value:
-                            return False  # Dependencies not completed
-            
-            # Assign task
-            now = datetime.now(timezone.utc).isoformat()
-            self._append_event("task_assigned", {
+            # Registered before appending: any thread's catch-up may apply it
+            claim_id = str(uuid.uuid4())
+            self._claim_outcomes[claim_id] = None
+        
+        try:
+            self._append_event("task_claimed", {
                 "task_id": task_id,
                 "agent_id": agent_id,
-                "timestamp": now
-            })
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "expected_version": expected_version
+            }, event_id=claim_id)
             
-            # Update derived state
-            self._rebuild_task_queue()
-            
-            return True
+            # Update derived state; resolves our claim and any before it
+            self._sync_views(self._durability_for("task_claimed"))
             
         finally:
-            self._release_lock("task_assignment")
+            with self._state_lock:
+                won = self._claim_outcomes.pop(claim_id, None)
+                if won is None:
+                    # Claim applied before a checkpoint reload; judge by the result
+                    task = self._tasks.get(task_id) or {}
+                    won = (task.get("assigned_to") == agent_id
+                           and task.get("status") == TaskStatus.ASSIGNED.value)
+        
+        return bool(won)
     
-    def update_task_status(self, task_id: str, status: TaskStatus, 
-                          result: Dict = None, agent_id: str = None) -> bool:
+    def reassign_task(self, task_id: str, from_agent: str, to_agent: str) -> bool:
         """
-        Update task status with atomic coordination.
+        Move a task that from_agent was assigned but has not started to
+        to_agent (work stealing). Like assign_task this is a version
+        compare-and-swap resolved on replay: it fails if the task was
+        started, finished or moved in the meantime, and a start by
+        from_agent logged after the move is ignored.
         """
-        if not self._acquire_lock("task_update"):
-            return False
+        self._catch_up()
+        
+        with self._state_lock:
+            task = self._tasks.get(task_id)
+            if (task is None or task["status"] != TaskStatus.ASSIGNED.value
+                    or task["assigned_to"] != from_agent):
+                return False
+            expected_version = task["version"]
+            claim_id = str(uuid.uuid4())
+            self._claim_outcomes[claim_id] = None
         
         try:
-            now = datetime.now(timezone.utc).isoformat()
-            update_data = {
+            self._append_event("task_claimed", {
                 "task_id": task_id,
-                "status": status.value,
-                "timestamp": now,
-                "agent_id": agent_id
-            }
-            
-            if result:
-                update_data["result"] = result
-            
-            self._append_event("task_updated", update_data)
-            self._rebuild_task_queue()
-            
-            return True
+                "agent_id": to_agent,
+                "from_agent": from_agent,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "expected_version": expected_version
+            }, event_id=claim_id)
+            self._sync_views(self._durability_for("task_claimed"))
             
         finally:
-            self._release_lock("task_update")
+            with self._state_lock:
+                won = self._claim_outcomes.pop(claim_id, None)
+                if won is None:
+                    won = (self._tasks.get(task_id) or {}).get("assigned_to") == to_agent
+        
+        return bool(won)
+    
+    def release_agent_tasks(self, agent_id: str) -> List[str]:
+        """
+        Put every task agent_id holds (queued or started) back in the queue
+        as pending and unassigned, for an agent that was stopped for good.
+        Returns the released task ids.
+        """
+        held = []
+        for status in (TaskStatus.ASSIGNED, TaskStatus.IN_PROGRESS):
+            cursor = ""
+            while cursor is not None:
+                page = self.query_tasks(status=status, assigned_to=agent_id, cursor=cursor or None)
+                held.extend(task["id"] for task in page["tasks"])
+                cursor = page["next_cursor"]
+        
+        for task_id in held:
+            self.update_task_status(task_id, TaskStatus.PENDING)
+        return held
+    
+    def update_task_status(self, task_id: str, status: TaskStatus, 
+                          result: Dict = None, agent_id: str = None) -> bool:
+        """
+        Update task status with atomic coordination.
+        """
+        return self._with_lock("task_update", self._update_task_status_locked,
+                               task_id, status, result, agent_id)
+    
+    def _update_task_status_locked(self, task_id: str, status: TaskStatus,
+                                   result: Dict = None, agent_id: str = None) -> bool:
+        """Body of update_task_status; caller holds the task_update lock."""
+        now = datetime.now(timezone.utc).isoformat()
+        update_data = {
+            "task_id": task_id,
+            "status": status.value,
+            "timestamp": now,
+            "agent_id": agent_id
+        }
+        
+        if result:
+            update_data["result"] = self.blobs.externalize(result)
+        
+        self._append_event("task_updated", update_data)
+        self._sync_views()
+        
+        return True
+    
+    def log_scaling_decision(self, decision: Dict) -> None:
+        """
+        Record an orchestrator autoscaler decision as an autoscaler_decision
+        event. It changes no state; it is kept so the scaling policy can be
+        tuned from the log (subscribe(types=["autoscaler_decision"])).
+        """
+        self._append_event("autoscaler_decision", dict(decision, timestamp=datetime.now(timezone.utc).isoformat()))
     
     def register_agent(self, agent_id: str, agent_type: AgentType, pid: int) -> bool:
         """
         Register agent with atomic coordination.
         """
-        if not self._acquire_lock("agent_registry"):
+        return self._with_lock("agent_registry", self._register_agent_locked, agent_id, agent_type, pid)
+    
+    def _register_agent_locked(self, agent_id: str, agent_type: AgentType, pid: int) -> bool:
+        """Body of register_agent; caller holds the agent_registry lock."""
+        now = datetime.now(timezone.utc).isoformat()
+        agent = Agent(
+            id=agent_id,
+            type=agent_type,
+            pid=pid,
+            status="active",
+            last_heartbeat=now,
+            current_task=None
+        )
+        
+        agent_data = asdict(agent)
+        agent_data["type"] = agent.type.value
+        self._append_event("agent_registered", agent_data)
+        self._sync_views()
+        self.liveness.claim(agent_id, pid)
+        
+        return True
+    
+    def deregister_agent(self, agent_id: str) -> bool:
+        """
+        Remove agent from the registry and free its liveness slot.
+        """
+        return self._with_lock("agent_registry", self._deregister_agent_locked, agent_id)
+    
+    def _deregister_agent_locked(self, agent_id: str) -> bool:
+        """Body of deregister_agent; caller holds the agent_registry lock."""
+        self.liveness.release(agent_id)
+        
+        if self.get_agent(agent_id) is None:
             return False
         
-        try:
-            now = datetime.now(timezone.utc).isoformat()
-            agent = Agent(
-                id=agent_id,
-                type=agent_type,
-                pid=pid,
-                status="active",
-                last_heartbeat=now,
-                current_task=None
-            )
-            
-            self._append_event("agent_registered", asdict(agent))
-            self._rebuild_agent_registry()
-            
-            return True
-            
-        finally:
-            self._release_lock("agent_registry")
+        self._append_event("agent_deregistered", {
+            "agent_id": agent_id,
+            "timestamp": datetime.now(timezone.utc).isoformat()
+        })
+        self._sync_views()
+        
+        return True
     
     def update_agent_heartbeat(self, agent_id: str, current_task: str = None) -> bool:
         """
         Update agent heartbeat to indicate it's alive.
+        
+        Written in place to the agent's liveness slot; the event log is not
+        touched.
         """
-        now = datetime.now(timezone.utc).isoformat()
-        heartbeat_data = {
-            "agent_id": agent_id,
-            "timestamp": now,
-            "current_task": current_task
-        }
+        if self.liveness.beat(agent_id, current_task):
+            return True
         
-        self._append_event("agent_heartbeat", heartbeat_data)
-        self._rebuild_agent_registry()
+        # Registered before the liveness table existed (or slot lost): claim one
+        agent = self.get_agent(agent_id)
+        if agent is None:
+            return False
         
-        return True
+        self.liveness.claim(agent_id, agent["pid"])
+        return self.liveness.beat(agent_id, current_task)
     
-    def get_available_tasks(self, agent_type: AgentType) -> List[Dict]:
+    def get_agent_liveness(self) -> Dict[str, Dict]:
+        """
+        Latest heartbeat of every live agent, keyed by agent id.
+        
+        Each entry has pid, last_heartbeat (epoch seconds) and current_task.
+        """
+        return self.liveness.scan()
+    
+    def get_available_tasks(self, agent_type: AgentType, limit: Optional[int] = None) -> List[Dict]:
         """
         Get tasks available for assignment to specific agent type.
+        
+        Returns pending tasks whose dependencies are complete, highest
+        priority (1) first. With a limit, only the top `limit` tasks are
+        taken from the agent type's heap.
         """
-        with open(self.task_queue_path) as f:
-            queue_data = json.load(f)
+        self._catch_up()
         
         available_tasks = []
         
-        for task_id, task_data in queue_data["tasks"].items():
-            if task_data["status"] != TaskStatus.PENDING.value:
-                continue
+        with self._state_lock:
+            heap = self._ready_heaps[agent_type]
+            members = self._heap_members[agent_type]
+            taken = []
             
-            # Check if task type matches agent capabilities
-            if self._task_matches_agent(task_data["type"], agent_type):
-                available_tasks.append(task_data)
-        
-        # Sort by priority (1=highest)
-        available_tasks.sort(key=lambda x: x["priority"])
+            while heap and (limit is None or len(taken) < limit):
+                entry = heapq.heappop(heap)
+                task_id = entry[2]
+                if task_id not in self._ready_tasks:
+                    members.discard(task_id)  # Stale: assigned or blocked since it was pushed
+                    continue
+                taken.append(entry)
+                available_tasks.append(dict(self._tasks[task_id]))
+            
+            for entry in taken:
+                heapq.heappush(heap, entry)
         
         return available_tasks
     
+    def count_available_tasks(self, agent_type: AgentType) -> int:
+        """Number of tasks get_available_tasks would return, without copying them."""
+        self._catch_up()
+        with self._state_lock:
+            return self._ready_counts[agent_type]
+    
+    def query_tasks(self, status: Any = None, assigned_to: Optional[str] = None,
+                    type: Optional[str] = None, created_after: Optional[str] = None,
+                    created_before: Optional[str] = None, limit: int = 100,
+                    cursor: Optional[str] = None) -> Dict:
+        """
+        One page of tasks matching every given filter, oldest first.
+        
+        Returns {"tasks": [...], "next_cursor": ...}; pass next_cursor back
+        to get the following page (it is None after the last one). The
+        smallest matching secondary index is walked from the cursor, so a
+        page costs its own size rather than a pass over the queue.
+        """
+        if status is not None:
+            status = _enum_value(status, TaskStatus)
+        filters = {field: value for field, value in
+                   (("status", status), ("assigned_to", assigned_to), ("type", type))
+                   if value is not None}
+        
+        self._catch_up()
+        with self._state_lock:
+            candidates = [self._task_field_indexes[field].get(value, []) for field, value in filters.items()]
+            keys = min(candidates, key=len) if candidates else self._tasks_by_created
+            
+            # Keys are (created_at, task_id); start after the cursor / lower bound
+            start = (created_after, "\uffff") if created_after else ("",)
+            if cursor:
+                start = max(start, tuple(cursor.split("|", 1)))
+            position = bisect.bisect_right(keys, start)
+            
+            tasks = []
+            last_key = None
+            while position < len(keys) and len(tasks) < limit:
+                key = keys[position]
+                position += 1
+                if created_before and key[0] >= created_before:
+                    position = len(keys)
+                    break
+                task = self._tasks[key[1]]
+                if all(task.get(field) == value for field, value in filters.items()):
+                    tasks.append(dict(task))
+                    last_key = key
+            
+            exhausted = position >= len(keys) or (created_before and keys[position][0] >= created_before)
+            next_cursor = None if exhausted or last_key is None else "|".join(last_key)
+        
+        return {"tasks": tasks, "next_cursor": next_cursor}
+    
+    def count_tasks(self, status: Any = None, assigned_to: Optional[str] = None,
+                    type: Optional[str] = None) -> int:
+        """Number of tasks matching every given filter; single filters are O(1)."""
+        if status is not None:
+            status = _enum_value(status, TaskStatus)
+        filters = {field: value for field, value in
+                   (("status", status), ("assigned_to", assigned_to), ("type", type))
+                   if value is not None}
+        
+        self._catch_up()
+        with self._state_lock:
+            if not filters:
+                return len(self._tasks)
+            candidates = [self._task_field_indexes[field].get(value, []) for field, value in filters.items()]
+            keys = min(candidates, key=len)
+            if len(filters) == 1:
+                return len(keys)
+            return sum(1 for _, task_id in keys
+                       if all(self._tasks[task_id].get(field) == value for field, value in filters.items()))
+    
     def _task_matches_agent(self, task_type: str, agent_type: AgentType) -> bool:
         """
         Determine if task type matches agent capabilities.
         """
-        task_routing = {
-            # Blue agent (Search & Discovery)
-            AgentType.BLUE: ["search", "analyze", "discover", "investigate", "find"],
+        return agent_type in self._agent_types_for(task_type)
+    
+    def agent_types_for(self, task_type: str) -> List[AgentType]:
+        """Agent types that can take tasks of task_type."""
+        return list(self._agent_types_for(task_type))
+    
+    def _agent_types_for(self, task_type: str) -> List[AgentType]:
+        """Agent types whose keywords appear in task_type (cached per task type)."""
+        agent_types = self._routing_cache.get(task_type)
+        if agent_types is None:
+            agent_types = self._match_agent_types(task_type)
+            self._routing_cache[task_type] = agent_types
+        return agent_types
+    
+    @classmethod
+    def _match_agent_types(cls, task_type: str) -> List[AgentType]:
+        lowered = task_type.lower()
+        return [agent_type for agent_type, keywords in cls.TASK_ROUTING.items()
+                if any(keyword in lowered for keyword in keywords)]
+    
+    def _refresh_readiness(self, task_id: str) -> None:
+        """Add task_id to or remove it from the ready index to match its current state."""
+        task_data = self._tasks[task_id]
+        ready = (task_data["status"] == TaskStatus.PENDING.value
+                 and self._unmet_dependencies[task_id] == 0)
+        
+        if ready == (task_id in self._ready_tasks):
+            return
+        
+        agent_types = self._agent_types_for(task_data["type"])
+        if ready:
+            self._ready_tasks.add(task_id)
+            for agent_type in agent_types:
+                self._ready_counts[agent_type] += 1
+                if task_id not in self._heap_members[agent_type]:
+                    self._heap_members[agent_type].add(task_id)
+                    heapq.heappush(self._ready_heaps[agent_type],
+                                   (task_data["priority"], task_data["created_at"], task_id))
+        else:
+            self._ready_tasks.discard(task_id)
+            for agent_type in agent_types:
+                self._ready_counts[agent_type] -= 1
+    
+    def _is_unmet(self, task_id: str) -> bool:
+        """Whether task_id blocks the tasks that depend on it."""
+        return self._applier.is_unmet(task_id)
+    
+    def _dependency_changed(self, task_id: str, was_unmet: bool) -> None:
+        """
+        Update the unmet-dependency counters of task_id's direct dependents
+        after its state changed; only dependents whose counter reaches or
+        leaves zero are re-checked.
+        """
+        is_unmet = self._is_unmet(task_id)
+        if is_unmet == was_unmet:
+            return
+        
+        delta = 1 if is_unmet else -1
+        for dependent_id in self._dependents.get(task_id, ()):
+            if dependent_id in self._unmet_dependencies:
+                self._unmet_dependencies[dependent_id] += delta
+                if self._unmet_dependencies[dependent_id] == (0 if delta < 0 else 1):
+                    self._refresh_readiness(dependent_id)
+    
+    def _index_task(self, task_id: str) -> None:
+        """Record a task's dependency edges and unmet count and add it to the ready index."""
+        dependencies = set(self._tasks[task_id]["dependencies"])
+        for dep_id in dependencies:
+            self._dependents.setdefault(dep_id, set()).add(task_id)
+        self._unmet_dependencies[task_id] = sum(1 for dep_id in dependencies if self._is_unmet(dep_id))
+        self._refresh_readiness(task_id)
+    
+    def _unindex_task(self, task_id: str) -> None:
+        """Drop a task's dependency edges and readiness before it is replaced."""
+        for dep_id in set(self._tasks[task_id]["dependencies"]):
+            self._dependents.get(dep_id, set()).discard(task_id)
+        self._unmet_dependencies[task_id] = 1  # Not ready until re-indexed
+        self._refresh_readiness(task_id)
+    
+    def _task_query_values(self, task_id: str) -> tuple:
+        """Current values of a task's indexed fields, in QUERY_FIELDS order."""
+        task = self._tasks[task_id]
+        return tuple(task.get(field) for field in self.QUERY_FIELDS)
+    
+    def _reindex_task_fields(self, task_id: str, before: Optional[tuple]) -> None:
+        """
+        Move task_id between secondary index lists after its indexed fields
+        changed from `before` (None for a new task). None values are not indexed.
+        """
+        key = (self._tasks[task_id]["created_at"], task_id)
+        if before is None:
+            bisect.insort(self._tasks_by_created, key)
+            before = (None,) * len(self.QUERY_FIELDS)
+        
+        for field, old, new in zip(self.QUERY_FIELDS, before, self._task_query_values(task_id)):
+            if old == new:
+                continue
+            index = self._task_field_indexes[field]
+            if old is not None:
+                keys = index[old]
+                del keys[bisect.bisect_left(keys, key)]
+                if not keys:
+                    del index[old]
+            if new is not None:
+                bisect.insort(index.setdefault(new, []), key)
+    
+    def _drop_task_fields(self, task_id: str) -> None:
+        """Remove a task from every secondary index before it is replaced."""
+        key = (self._tasks[task_id]["created_at"], task_id)
+        del self._tasks_by_created[bisect.bisect_left(self._tasks_by_created, key)]
+        for field, value in zip(self.QUERY_FIELDS, self._task_query_values(task_id)):
+            if value is not None:
+                keys = self._task_field_indexes[field][value]
+                del keys[bisect.bisect_left(keys, key)]
+                if not keys:
+                    del self._task_field_indexes[field][value]
+    
+    def _rebuild_task_index(self) -> None:
+        """Rebuild the ready and query indexes from scratch after the task state was replaced."""
+        self._ready_tasks = set()
+        self._ready_heaps = {agent_type: [] for agent_type in AgentType}
+        self._heap_members = {agent_type: set() for agent_type in AgentType}
+        self._ready_counts = {agent_type: 0 for agent_type in AgentType}
+        self._dependents = {}
+        self._unmet_dependencies = {}
+        for task_id in self._tasks:
+            self._index_task(task_id)
+        
+        # Secondary indexes are built in bulk and sorted once
+        self._tasks_by_created = []
+        self._task_field_indexes = {field: {} for field in self.QUERY_FIELDS}
+        for task_id, task in self._tasks.items():
+            key = (task["created_at"], task_id)
+            self._tasks_by_created.append(key)
+            for field in self.QUERY_FIELDS:
+                if task.get(field) is not None:
+                    self._task_field_indexes[field].setdefault(task[field], []).append(key)
+        self._tasks_by_created.sort()
+        for index in self._task_field_indexes.values():
+            for keys in index.values():
+                keys.sort()
+    
+    def _catch_up(self, wait: bool = True) -> None:
+        """
+        Apply events appended since the last call to the in-memory state.
+        
+        The first call loads the storage checkpoint (latest snapshot or
+        tables). If the saved position has become invalid, e.g. the log was
+        replaced or compacted underneath us, the checkpoint is reloaded.
+        
+        Where the storage holds reads back (a sharded log's sequence hole),
+        the wait happens between reads with _state_lock released. wait=False
+        stops there instead, for callers that already hold the lock.
+        """
+        while True:
+            with self._state_lock:
+                if self._position is None:
+                    self._load_checkpoint()
+                
+                try:
+                    for event, position in self.storage.read_events(self._position):
+                        if event is not None:
+                            self._applier.apply(event)
+                        self._position = position
+                except LogPositionLost:
+                    self._reset_state()
+                    continue
+                position = self._position
             
-            # Green agent (Code Generation)
-            AgentType.GREEN: ["code", "implement", "create", "fix", "refactor", "build"],
+            if not wait or not self.storage.await_position(position):
+                return
+    
+    def _load_checkpoint(self) -> None:
+        """Initialize the in-memory state from the storage checkpoint."""
+        tasks, agents, self._position = self.storage.load_checkpoint()
+        self._replace_state(tasks, agents)
+        
+        # Views may be older than the checkpoint; rewrite them on next sync
+        self._changed_tasks = None
+        self._changed_agents = None
+    
+    def _checkpoint_state(self):
+        """Catch up and return (tasks, agents, position) for a storage checkpoint."""
+        self._catch_up()
+        with self._state_lock:
+            self._catch_up(wait=False)
+            return self._tasks, self._agents, self._position
+    
+    def _reset_state(self) -> None:
+        """Discard the in-memory state so the next catch-up reloads it."""
+        with self._state_lock:
+            self._position = None
+            self._replace_state({}, {})
+    
+    def _replace_state(self, tasks: Dict, agents: Dict) -> None:
+        """Swap in new task and agent dicts, with a fresh applier and indexes."""
+        self._tasks = tasks
+        self._agents = agents
+        self._applier = EventApplier(tasks, agents, self._index_hooks)
+        self._rebuild_task_index()
+    
+    def _mark_task_changed(self, task_id: str) -> None:
+        if self._changed_tasks is not None:
+            self._changed_tasks.add(task_id)
+    
+    def _mark_agent_changed(self, agent_id: str) -> None:
+        if self._changed_agents is not None:
+            self._changed_agents.add(agent_id)
+    
+    def _sync_views(self, durability: Durability = Durability.STRICT, flush: bool = False) -> None:
+        """
+        Apply new events and persist the changed derived state (task queue
+        and agent registry) with the durability of the triggering event.
+        
+        The JSONL backend defers its whole-file views to the next checkpoint
+        unless flush is set; the SQLite backend writes changed rows at once.
+        """
+        self._catch_up()
+        with self.storage.views_transaction(durability), self._state_lock:
+            self._catch_up(wait=False)
+            if self._changed_tasks == set() and self._changed_agents == set() and not flush:
+                return
             
-            # Red agent (Critical Review)  
-            AgentType.RED: ["review", "audit", "security", "validate", "assess"]
-        }
+            self.storage.write_views(self._tasks, self._agents, self._changed_tasks,
+                                     self._changed_agents, self._position, durability, flush=flush)
+            self._changed_tasks = set()
+            self._changed_agents = set()
+    
+    def flush_views(self) -> None:
+        """
+        Bring task-queue.json and agent-registry.json (or the SQLite tables)
+        up to date with the log now, for external readers of the views.
+        """
+        self._sync_views(flush=True)
+    
+    def get_task(self, task_id: str) -> Optional[Dict]:
+        """Current state of a single task, or None if it does not exist."""
+        self._catch_up()
+        with self._state_lock:
+            task = self._tasks.get(task_id)
+            return dict(task) if task else None
+    
+    def get_agent(self, agent_id: str) -> Optional[Dict]:
+        """
+        Current registry entry of a single agent, or None if unknown.
         
-        agent_keywords = task_routing.get(agent_type, [])
-        
-        for keyword in agent_keywords:
-            if keyword in task_type.lower():
-                return True
-        
-        return False
-    
-    def _rebuild_task_queue(self) -> None:
-        """
-        Rebuild task queue from event log (derived state).
-        """
-        tasks = {}
-        
-        # Read all events and build current state
-        if self.event_log_path.exists():
-            with open(self.event_log_path) as f:
-                for line in f:
-                    if line.strip():
-                        event = json.loads(line)
-                        
-                        if event["type"] == "task_created":
-                            task_data = event["data"]
-                            tasks[task_data["id"]] = task_data
-                        
-                        elif event["type"] == "task_assigned":
-                            task_id = event["data"]["task_id"]
-                            if task_id in tasks:
-                                tasks[task_id]["assigned_to"] = event["data"]["agent_id"]
-                                tasks[task_id]["status"] = TaskStatus.ASSIGNED.value
-                                tasks[task_id]["updated_at"] = event["data"]["timestamp"]
-                        
-                        elif event["type"] == "task_updated":
-                            task_id = event["data"]["task_id"]
-                            if task_id in tasks:
-                                tasks[task_id]["status"] = event["data"]["status"]
-                                tasks[task_id]["updated_at"] = event["data"]["timestamp"]
-                                if "result" in event["data"]:
-                                    tasks[task_id]["result"] = event["data"]["result"]
-        
-        # Write derived state atomically
-        queue_data = {
-            "tasks": tasks,
-            "version": int(time.time()),
-            "rebuilt_at": datetime.now(timezone.utc).isoformat()
-        }
+        last_heartbeat and current_task come from the liveness table when the
+        agent holds a slot there.
+        """
+        self._catch_up()
+        with self._state_lock:
+            agent = self._agents.get(agent_id)
+            if not agent:
+                return None
+            agent = dict(agent)
         
-        self._atomic_write(self.task_queue_path, queue_data)
-    
-    def _rebuild_agent_registry(self) -> None:
-        """
-        Rebuild agent registry from event log (derived state).
-        """
-        agents = {}
-        
-        # Read all events and build current state
-        if self.event_log_path.exists():
-            with open(self.event_log_path) as f:
-                for line in f:
-                    if line.strip():
-                        event = json.loads(line)
-                        
-                        if event["type"] == "agent_registered":
-                            agent_data = event["data"]
-                            agents[agent_data["id"]] = agent_data
-                        
-                        elif event["type"] == "agent_heartbeat":
-                            agent_id = event["data"]["agent_id"]
-                            if agent_id in agents:
-                                agents[agent_id]["last_heartbeat"] = event["data"]["timestamp"]
-                                if event["data"]["current_task"]:
-                                    agents[agent_id]["current_task"] = event["data"]["current_task"]
-        
-        # Write derived state atomically
-        registry_data = {
-            "agents": agents,
-            "version": int(time.time()),
-            "rebuilt_at": datetime.now(timezone.utc).isoformat()
-        }
+        liveness = self.liveness.get(agent_id)
+        if liveness is not None:
+            agent["last_heartbeat"] = datetime.fromtimestamp(
+                liveness["last_heartbeat"], timezone.utc).isoformat()
+            agent["current_task"] = liveness["current_task"]
+        return agent
+    
+    def resolve_payload(self, value: Any) -> Any:
+        """
+        A task's result or context as it was submitted: values stored out of
+        line (blob references) are loaded from the blob store, others pass through.
+        """
+        return self.blobs.resolve(value)
+    
+    def get_task_result(self, task_id: str) -> Optional[Any]:
+        """Result of a task (archived or not), loading it from the blob store if needed."""
+        task = self.get_task(task_id) or self.get_archived_task(task_id)
+        return self.resolve_payload(task.get("result")) if task else None
+    
+    def get_archived_task(self, task_id: str) -> Optional[Dict]:
+        """
+        A task moved to the archive, or None. The task's last logged event
+        names its partition, so normally a single file is read.
+        """
+        history = self.storage.task_history(task_id)
+        if history:
+            last = history[-1]
+            archived = self.archive.get(task_id, day=last["data"].get("timestamp") or last["timestamp"])
+            if archived is not None:
+                return archived
+        return self.archive.get(task_id)
+    
+    # ==================== RETENTION ====================
+    
+    def archive_tasks(self, older_than: float = 24 * 3600) -> Dict:
+        """
+        Retention policy: move completed, failed and cancelled tasks last
+        updated more than older_than seconds ago from the hot state (views,
+        snapshots, indexes) into the compressed archive (task_archive.py).
+        
+        The archive is written and fsynced first; a tasks_archived event then
+        removes the tasks everywhere on replay. A failed or cancelled task
+        that a live task still depends on stays, since dropping it would
+        make the dependency count as met. Returns {"archived": n,
+        "partitions": [...]}, or False if the archive lock is busy.
+        """
+        return self._with_lock("archive", self._archive_tasks_locked, older_than)
+    
+    def _blocks_live_task(self, task_id: str, terminal: Set[str]) -> bool:
+        """Whether an unfinished task depends on task_id and is held back by it."""
+        if not self._is_unmet(task_id):
+            return False
+        return any(dependent_id in self._tasks and self._tasks[dependent_id]["status"] not in terminal
+                   for dependent_id in self._dependents.get(task_id, ()))
+    
+    def _archive_tasks_locked(self, older_than: float) -> Dict:
+        """Body of archive_tasks; caller holds the archive lock."""
+        terminal = {TaskStatus.COMPLETED.value, TaskStatus.FAILED.value, TaskStatus.CANCELLED.value}
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=older_than)).isoformat()
+        
+        self._catch_up()
+        with self._state_lock:
+            expired = [dict(task) for task_id, task in self._tasks.items()
+                       if task["status"] in terminal and task["updated_at"] < cutoff
+                       and not self._blocks_live_task(task_id, terminal)]
+        if not expired:
+            return {"archived": 0, "partitions": []}
+        
+        partitions = self.archive.append(expired)
+        keys = [task["idempotency_key"] for task in expired if task.get("idempotency_key") is not None]
+        if keys:
+            self.archived_keys.add(keys)  # Before the keys leave the hot dedup index
         
-        self._atomic_write(self.agent_registry_path, registry_data)
+        batch_size = 1000
+        for start in range(0, len(expired), batch_size):
+            batch = expired[start:start + batch_size]
+            self._append_event("tasks_archived", {
+                "tasks": {task["id"]: task["version"] for task in batch},
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            })
+        self._sync_views()
+        
+        return {"archived": len(expired), "partitions": partitions}
+    
+    def task_history(self, task_id: str) -> List[Dict]:
+        """
+        Every logged event concerning task_id (creation, claims, updates),
+        oldest first. Reads only that task's records via the storage index.
+        """
+        return self.storage.task_history(task_id)
+    
+    def get_event(self, event_id: str) -> Optional[Dict]:
+        """A single logged event by id, or None."""
+        return self.storage.get_event(event_id)
+    
+    def subscribe(self, from_offset: Optional[str] = None, types: Optional[List[str]] = None,
+                  stop_event: Optional[threading.Event] = None) -> Subscription:
+        """
+        Follow coordination events as they are appended (event_stream.py).
+        
+        Returns a Subscription: iterate it, `async for` over it, or poll() it
+        with a timeout. from_offset is a resume token from an earlier
+        subscription's resume_token, "earliest", or None for new events only;
+        types limits delivery to those event types.
+        """
+        return open_subscription(self.storage, from_offset, types, stop_event=stop_event)
+    
+    def _resolve_point(self, point: Any):
+        """(moment, position, event_id) for a state_at point."""
+        if isinstance(point, datetime):
+            moment = point
+        else:
+            try:
+                moment = datetime.fromisoformat(point.replace("Z", "+00:00"))
+            except ValueError:
+                position, event_id = self.storage.token_position(point)
+                if event_id is None:
+                    raise ValueError(f"Resume token {point!r} does not name an event")
+                return None, position, event_id
+        
+        if moment.tzinfo is None:
+            moment = moment.astimezone()  # Naive times are local, as in incident reports
+        return moment, None, None
+    
+    def state_at(self, point: Any) -> Dict:
+        """
+        Reconstruct the task and agent state as of a past point, without
+        touching the live state or the views.
+        
+        point is a datetime or ISO 8601 timestamp (naive means local time),
+        giving the state after every event stamped up to then, or a resume
+        token (see subscribe), giving the state right after the token's
+        event. Replay starts from the newest storage checkpoint before the
+        point.
+        
+        Returns {"tasks": ..., "agents": ..., "events_replayed": n}. Raises
+        ValueError for a point that is malformed or outside the retained
+        history (a token whose event or position is gone).
+        """
+        moment, position, event_id = self._resolve_point(point)
+        tasks, agents, start = self.storage.checkpoint_before(moment, position)
+        
+        replay = EventApplier(tasks, agents)
+        cutoff = moment.astimezone(timezone.utc).isoformat() if moment else None
+        replayed = 0
+        found = False
+        try:
+            for event, _ in self.storage.read_events_waiting(start):
+                if event is None:
+                    continue
+                if cutoff is not None and event["timestamp"] > cutoff:
+                    break
+                replay.apply(event)
+                replayed += 1
+                if event["id"] == event_id:
+                    found = True
+                    break
+        except LogPositionLost as e:
+            raise ValueError(f"{point!r} is outside the retained event log: {e}") from e
+        
+        if event_id is not None and not found:
+            raise ValueError(f"Event {event_id} not found in the retained event log")
+        return {"tasks": replay.tasks, "agents": replay.agents, "events_replayed": replayed}
+    
+    def diff(self, start: Any, end: Any) -> Dict[str, Dict]:
+        """
+        Tasks whose status differs between two state_at points, as
+        {task_id: {"type", "description", "before", "after"}}. before is None
+        for tasks created after start.
+        """
+        before = self.state_at(start)["tasks"]
+        after = self.state_at(end)["tasks"]
+        
+        changes = {}
+        for task_id in list(after) + [task_id for task_id in before if task_id not in after]:
+            old, new = before.get(task_id), after.get(task_id)
+            old_status = old["status"] if old else None
+            new_status = new["status"] if new else None
+            if old_status != new_status:
+                task = new or old
+                changes[task_id] = {"type": task["type"], "description": task["description"],
+                                    "before": old_status, "after": new_status}
+        return changes
+    
+    def recover_event_log(self) -> Dict:
+        """
+        Crash recovery: validate the event log since the last checkpoint and
+        truncate a torn tail. Appends repair a torn tail on their own; this
+        runs the full check (at startup and on repair) and reports it.
+        """
+        report = self.storage.recover_log()
+        print(f"🩹 Event log recovery: {report['records_valid']} records checked, "
+              f"{report['records_corrupt']} corrupt, {report['bytes_truncated']} bytes truncated "
+              f"in {report['duration_seconds']:.3f}s")
+        return report
+    
+    def check_health(self) -> bool:
+        """Check that the coordination store is readable."""
+        return self.storage.check_health()
     
     def repair_coordination_state(self) -> bool:
         """
@@ -461,8 +1342,11 @@ class CoordinationProtocol:
         """
         try:
             print("🔧 Repairing coordination state from event log...")
-            self._rebuild_task_queue()
-            self._rebuild_agent_registry()
+            self.recover_event_log()
+            indexed = self.storage.rebuild_index()
+            print(f"🗂️ Event index rebuilt ({indexed} events)")
+            self._reset_state()
+            self.flush_views()
             print("✅ Coordination state repaired successfully")
             return True
         except Exception as e:
@@ -470,6 +1354,51 @@ class CoordinationProtocol:
             return False
 
 
+class _IndexHooks(StateHooks):
+    """Keeps a CoordinationProtocol's indexes and view change sets in step with its applier."""
+    
+    def __init__(self, protocol: CoordinationProtocol):
+        self.protocol = protocol
+    
+    def task_replacing(self, task_id: str) -> None:
+        self.protocol._unindex_task(task_id)
+        self.protocol._drop_task_fields(task_id)
+    
+    def task_added(self, task_id: str, was_unmet: bool) -> None:
+        self.protocol._mark_task_changed(task_id)
+        self.protocol._index_task(task_id)
+        self.protocol._reindex_task_fields(task_id, None)
+        self.protocol._dependency_changed(task_id, was_unmet)  # Dependents created before this task
+    
+    def task_changing(self, task_id: str) -> tuple:
+        return self.protocol._task_query_values(task_id)
+    
+    def task_changed(self, task_id: str, before: tuple, was_unmet: bool) -> None:
+        self.protocol._reindex_task_fields(task_id, before)
+        self.protocol._mark_task_changed(task_id)
+        self.protocol._refresh_readiness(task_id)
+        self.protocol._dependency_changed(task_id, was_unmet)  # Only direct dependents
+    
+    def task_removing(self, task_id: str) -> None:
+        self.protocol._unindex_task(task_id)
+        self.protocol._drop_task_fields(task_id)
+    
+    def task_removed(self, task_id: str, was_unmet: bool) -> None:
+        self.protocol._unmet_dependencies.pop(task_id, None)
+        self.protocol._mark_task_changed(task_id)
+        self.protocol._dependency_changed(task_id, was_unmet)
+    
+    def agent_changed(self, agent_id: str) -> None:
+        self.protocol._mark_agent_changed(agent_id)
+    
+    def claim_resolved(self, event_id: str, won: bool) -> None:
+        if event_id in self.protocol._claim_outcomes:
+            self.protocol._claim_outcomes[event_id] = won
+    
+    def is_ready(self, applier: EventApplier, task_id: str) -> bool:
+        return task_id in self.protocol._ready_tasks  # The ready index, O(1)
+
+
 if __name__ == "__main__":
     # Test the coordination protocol
     protocol = CoordinationProtocol()
@@ -0,0 +1,2006 @@
+#!/usr/bin/env python3
+"""
+Coordination Storage Backends
+
+The storage layer behind CoordinationProtocol. A backend persists the event
+log, provides cross-process locks, stores the derived task/agent views, and
+hands out the checkpoint that a process loads its in-memory state from.
+
+Backends:
+- JsonlStorageBackend: segmented event-log.jsonl, JSON views, flock locks
+- BinaryStorageBackend: the same layout with binary event records (event_codec.py)
+- ShardedStorageBackend: one JSONL log and lock per shard, merged by a global sequence number
+- SqliteStorageBackend: one WAL-mode SQLite database with indexed tables
+
+The backend in use is recorded in orchestration/storage.json so that the
+orchestrator, agents and scripts all open the same store.
+
+Usage:
+  python3 coordination_storage.py migrate --coordination-path /path/to/coordination
+  python3 coordination_storage.py migrate --backend binary --coordination-path /path/to/coordination
+  python3 coordination_storage.py migrate --backend sharded --coordination-path /path/to/coordination
+"""
+
+import argparse
+import fcntl
+import itertools
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from event_codec import (CorruptRecord, convert_file, decode_json_line, decode_records, encode_event,
+                         encode_json_line)
+from event_index import EventIndex, event_task_id
+
+
+class Durability(Enum):
+    STRICT = "strict"      # fsync before the write is acknowledged
+    BATCHED = "batched"    # fsync within batch_fsync_interval of the write
+    VOLATILE = "volatile"  # written to the OS only, never fsynced
+
+
+# Strongest level wins when writes with different levels share a flush
+_DURABILITY_RANK = {Durability.VOLATILE: 0, Durability.BATCHED: 1, Durability.STRICT: 2}
+
+
+class LogPositionLost(Exception):
+    """The saved log position no longer refers to the same events; reload the checkpoint."""
+
+
+def atomic_write_json(file_path: Path, data: Dict, indent: Optional[int] = 2,
+                      fsync: bool = True) -> None:
+    """
+    CRITICAL: Atomic file write to prevent corruption from simultaneous writes.
+    Uses write-to-temp-file-then-rename pattern. fsync=False keeps the rename
+    atomic but leaves flushing to the OS.
+    """
+    temp_path = file_path.with_suffix(f".tmp.{uuid.uuid4().hex}")
+    
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=indent, default=str)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())  # Force write to disk
+        
+        # Atomic rename - this is the critical atomic operation
+        temp_path.replace(file_path)
+        os.chmod(file_path, 0o600)
+    
+    except Exception as e:
+        # Cleanup temp file on failure
+        if temp_path.exists():
+            temp_path.unlink()
+        raise Exception(f"Atomic write failed for {file_path}: {e}")
+
+
+class StorageBackend:
+    """
+    Interface implemented by every coordination storage backend.
+    
+    Positions returned by read_events and load_checkpoint are opaque to the
+    caller; they are only handed back to the same backend.
+    """
+    
+    name = "base"
+    
+    def acquire_lock(self, lock_name: str, timeout: int = 10) -> bool:
+        """Acquire a cross-process lock; returns False on timeout."""
+        raise NotImplementedError
+    
+    def release_lock(self, lock_name: str) -> None:
+        """Release a lock taken with acquire_lock."""
+        raise NotImplementedError
+    
+    def append_event(self, event: Dict, durability: Durability = Durability.STRICT) -> None:
+        """Append one event to the log with the given durability."""
+        raise NotImplementedError
+    
+    def load_checkpoint(self) -> Tuple[Dict, Dict, Any]:
+        """Return (tasks, agents, position) to start replay from."""
+        raise NotImplementedError
+    
+    def checkpoint_before(self, moment: Optional[datetime] = None,
+                          position: Any = None) -> Tuple[Dict, Dict, Any]:
+        """
+        (tasks, agents, position) of the newest checkpoint written no later
+        than moment and no further along the log than position, for
+        reconstructing past state. Without one, replay starts at the oldest
+        event.
+        """
+        return {}, {}, self.first_position()
+    
+    def read_events(self, position: Any) -> Iterator[Tuple[Optional[Dict], Any]]:
+        """
+        Yield (event, position_after_event) for every event after position.
+        
+        event may be None when only the position advanced. Raises
+        LogPositionLost if position is no longer valid. Never blocks: where
+        the backend holds reads back, it stops, and await_position says so.
+        """
+        raise NotImplementedError
+    
+    def await_position(self, position: Any) -> bool:
+        """
+        If reads are held back right after position (see
+        ShardedStorageBackend), wait a moment or settle the cause, and return
+        True so the caller reads again. Call it without holding a lock that
+        other readers need. False: position is simply the end of the log.
+        """
+        return False
+    
+    def read_events_waiting(self, position: Any) -> Iterator[Tuple[Optional[Dict], Any]]:
+        """read_events to the end of the log, waiting wherever reads are held back."""
+        while True:
+            for event, position in self.read_events(position):
+                yield event, position
+            if not self.await_position(position):
+                return
+    
+    def first_position(self) -> Any:
+        """Position before the oldest event still stored."""
+        raise NotImplementedError
+    
+    def end_position(self) -> Any:
+        """Position after the newest complete event."""
+        raise NotImplementedError
+    
+    def position_token(self, position: Any, event_id: Optional[str]) -> str:
+        """
+        Serialize a position (and the id of the event ending there) into a
+        resume token that stays meaningful across processes.
+        """
+        raise NotImplementedError
+    
+    def token_position(self, token: str) -> Tuple[Any, Optional[str]]:
+        """Inverse of position_token: (position, event_id). Raises ValueError for a malformed token."""
+        raise NotImplementedError
+    
+    def relocate(self, event_id: str) -> Any:
+        """
+        A position at or before an event, found by id; used when compaction
+        invalidated a saved position, and the caller skips events up to and
+        including event_id. Raises LogPositionLost if the event is gone.
+        """
+        raise NotImplementedError
+    
+    def watch_paths(self) -> List[Tuple[Path, List[str]]]:
+        """(directory, file names) pairs of files that change whenever an event is appended."""
+        raise NotImplementedError
+    
+    def recover_log(self) -> Dict:
+        """
+        Validate the log written since the last checkpoint and discard a
+        torn tail. Returns a report including duration_seconds.
+        """
+        raise NotImplementedError
+    
+    def task_history(self, task_id: str) -> List[Dict]:
+        """Every logged event concerning task_id, oldest first."""
+        raise NotImplementedError
+    
+    def get_event(self, event_id: str) -> Optional[Dict]:
+        """A single logged event by id, or None."""
+        raise NotImplementedError
+    
+    def rebuild_index(self) -> int:
+        """Rebuild the event lookup index; returns the number of events indexed."""
+        raise NotImplementedError
+    
+    @contextmanager
+    def views_transaction(self, durability: Durability = Durability.STRICT):
+        """
+        Context the caller enters before taking its own state lock and calling
+        write_views, so backends whose view writes need a storage lock always
+        take it first.
+        """
+        yield
+    
+    def write_views(self, tasks: Dict, agents: Dict, changed_tasks: Optional[Set[str]],
+                    changed_agents: Optional[Set[str]], position: Any,
+                    durability: Durability = Durability.STRICT, flush: bool = False) -> None:
+        """
+        Persist the derived task/agent state as of position.
+        
+        changed_* name the records modified since the last write; None means
+        everything must be rewritten. Views can always be rebuilt from the
+        log, so only STRICT view writes are fsynced. A backend that can only
+        rewrite whole view files may defer the write to its next checkpoint;
+        flush=True writes everything still pending now.
+        """
+        raise NotImplementedError
+    
+    def compact(self) -> Dict:
+        """
+        Drop events superseded by the latest checkpoint; returns statistics.
+        Every task event is kept: each one bumps the task's version, and
+        claims and archivals replay only against the version they expected.
+        """
+        raise NotImplementedError
+    
+    def check_health(self) -> bool:
+        """Cheap check that the store is readable."""
+        raise NotImplementedError
+
+
+class JsonlStorageBackend(StorageBackend):
+    """
+    File-based backend: segmented JSONL event log, JSON views and flock locks.
+    
+    event-log.jsonl is the active segment. Once it reaches segment_max_bytes
+    it is sealed into segments/ and the state at the end of that segment is
+    written to snapshots/. checkpoint_source must return the caller's state
+    caught up to the end of the log as (tasks, agents, position).
+    """
+    
+    name = "jsonl"
+    log_suffix = "jsonl"  # Extension of the active and sealed segment files
+    
+    def __init__(self, orchestration_path: Path,
+                 checkpoint_source: Callable[[], Tuple[Dict, Dict, Any]]):
+        self.orchestration_path = Path(orchestration_path)
+        self.event_log_path = self.orchestration_path / f"event-log.{self.log_suffix}"
+        self.task_queue_path = self.orchestration_path / "task-queue.json"
+        self.agent_registry_path = self.orchestration_path / "agent-registry.json"
+        self.locks_path = self.orchestration_path / "locks"
+        self.segments_path = self.orchestration_path / "segments"
+        self.snapshots_path = self.orchestration_path / "snapshots"
+        self.checkpoint_source = checkpoint_source
+        
+        # Log segmentation: the active segment is sealed into segments/ once it
+        # reaches this size, and every seal writes a snapshot.
+        self.segment_max_bytes = 16 * 1024 * 1024
+        self.snapshot_retention = 3  # Snapshots kept by compact()
+        
+        # Group commit: appends from concurrent threads share one write and
+        # one fsync. The leader waits group_commit_window seconds for more
+        # events before flushing.
+        self.group_commit = True
+        self.group_commit_window = 0.001
+        self._commit_cond = threading.Condition()
+        self._commit_queue: List[Dict] = []
+        self._commit_leader = False
+        
+        # Offset index of every event by event id and task id (event_index.py),
+        # and the active segment's (inode, number) as last seen by a writer
+        self.index = EventIndex(self.orchestration_path / f"event-log.{self.log_suffix}.idx")
+        self._active_segment: Tuple[Optional[int], int] = (None, 0)
+        
+        # Optional callable(count) -> first of count global sequence numbers,
+        # stamped into each event as "seq" (set by ShardedStorageBackend)
+        self.sequencer: Optional[Callable[[int], int]] = None
+        
+        # BATCHED appends are fsynced by a timer at most this many seconds later
+        self.batch_fsync_interval = 0.05
+        self._fsync_timer: Optional[threading.Timer] = None
+        self._fsync_timer_lock = threading.Lock()
+        
+        # Thread-local storage for file locks
+        self._local = threading.local()
+        
+        # The JSON views are whole-file rewrites, so they are written only at
+        # checkpoints and on flush; these record what changed in between
+        self._task_view_stale = False
+        self._agent_view_stale = False
+        
+        self._initialize_files()
+    
+    def _initialize_files(self):
+        """Initialize coordination files with proper permissions."""
+        self.orchestration_path.mkdir(parents=True, exist_ok=True)
+        self.locks_path.mkdir(exist_ok=True)
+        self.segments_path.mkdir(exist_ok=True)
+        self.snapshots_path.mkdir(exist_ok=True)
+        
+        # Initialize empty files if they don't exist
+        if not self.event_log_path.exists():
+            self.event_log_path.touch()
+            os.chmod(self.event_log_path, 0o600)
+        
+        if not self.task_queue_path.exists():
+            atomic_write_json(self.task_queue_path, {"tasks": {}, "version": 1})
+        
+        if not self.agent_registry_path.exists():
+            atomic_write_json(self.agent_registry_path, {"agents": {}, "version": 1})
+    
+    # ==================== LOCKING ====================
+    
+    def acquire_lock(self, lock_name: str, timeout: int = 10) -> bool:
+        """
+        Acquire file-based lock with timeout to prevent deadlocks.
+        """
+        lock_file = self.locks_path / f"{lock_name}.lock"
+        
+        # Create lock file if it doesn't exist
+        lock_file.touch()
+        
+        try:
+            lock_fd = open(lock_file, 'w')
+            
+            # Try to acquire exclusive lock with timeout, polling with
+            # exponential backoff (1 ms up to 100 ms); timeout=0 tries once
+            start_time = time.time()
+            delay = 0.001
+            while True:
+                try:
+                    fcntl.flock(lock_fd.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    # Store file descriptor for later release
+                    if not hasattr(self._local, 'locks'):
+                        self._local.locks = {}
+                    self._local.locks[lock_name] = lock_fd
+                    return True
+                except IOError:
+                    if time.time() - start_time >= timeout:
+                        break
+                    time.sleep(delay)  # Brief wait before retry
+                    delay = min(delay * 2, 0.1)
+            
+            # Timeout reached
+            lock_fd.close()
+            return False
+        
+        except Exception as e:
+            if 'lock_fd' in locals():
+                lock_fd.close()
+            raise Exception(f"Lock acquisition failed for {lock_name}: {e}")
+    
+    def release_lock(self, lock_name: str) -> None:
+        """Release file-based lock."""
+        if hasattr(self._local, 'locks') and lock_name in self._local.locks:
+            lock_fd = self._local.locks[lock_name]
+            fcntl.flock(lock_fd.fileno(), fcntl.LOCK_UN)
+            lock_fd.close()
+            del self._local.locks[lock_name]
+    
+    # ==================== EVENT LOG ====================
+    
+    def append_event(self, event: Dict, durability: Durability = Durability.STRICT) -> None:
+        """
+        CRITICAL: Append event to log atomically.
+        This is the source of truth for all coordination state.
+        
+        A STRICT append returns only once the event is on disk. With group
+        commit enabled, the first waiting thread becomes leader and flushes
+        every queued event in one write + fsync; the others wait for that
+        flush.
+        """
+        # With a sequencer the line is encoded once the sequence number is known
+        line = self._encode_event(event) if self.sequencer is None else None
+        
+        if not self.group_commit:
+            self._write_batch([line], [event], durability)
+            return
+        
+        entry = {"line": line, "event": event, "durability": durability, "done": False, "error": None}
+        with self._commit_cond:
+            self._commit_queue.append(entry)
+            while not entry["done"] and self._commit_leader:
+                self._commit_cond.wait()
+            
+            if not entry["done"]:
+                self._commit_leader = True
+        
+        if not entry["done"]:
+            self._lead_group_commit()
+        
+        if entry["error"] is not None:
+            raise entry["error"]
+    
+    def _encode_event(self, event: Dict) -> bytes:
+        """One event as it is stored in a segment: a JSON line with a CRC32."""
+        return encode_json_line(event)
+    
+    def _lead_group_commit(self) -> None:
+        """Flush the commit queue as one batch and wake the waiting callers."""
+        batch = []
+        error = None
+        try:
+            if self.group_commit_window:
+                time.sleep(self.group_commit_window)  # Let concurrent writers join
+            
+            with self._commit_cond:
+                batch, self._commit_queue = self._commit_queue, []
+            
+            durability = max((entry["durability"] for entry in batch),
+                             key=_DURABILITY_RANK.get)
+            self._write_batch([entry["line"] for entry in batch],
+                              [entry["event"] for entry in batch], durability)
+        except Exception as e:
+            error = e
+        finally:
+            with self._commit_cond:
+                for entry in batch:
+                    entry["error"] = error
+                    entry["done"] = True
+                self._commit_leader = False
+                self._commit_cond.notify_all()
+    
+    def _write_batch(self, lines: List[bytes], events: List[Dict], durability: Durability) -> None:
+        """Append lines under the event_log lock with at most one fsync, and index them."""
+        if not self.acquire_lock("event_log"):
+            raise Exception("Failed to acquire event log lock")
+        
+        try:
+            self._append_locked(lines, events, durability)
+        finally:
+            self.release_lock("event_log")
+    
+    def _append_locked(self, lines: List[bytes], events: List[Dict], durability: Durability,
+                       number_events: bool = True) -> None:
+        """
+        Body of _write_batch; caller holds the event_log lock. With a
+        sequencer (and number_events), the events are numbered and encoded
+        here, after tail recovery and right before the write.
+        """
+        with open(self.event_log_path, 'ab') as f:
+            number = self._locked_active_number(f)
+            start = self._recover_tail(number, self.event_log_path, f.tell())["valid_end"]
+            
+            if self.sequencer is not None and number_events:
+                # Nothing but the write itself separates taking a number from
+                # the event appearing; readers wait for a missing number
+                first = self.sequencer(len(events))
+                for offset, event in enumerate(events):
+                    event["seq"] = first + offset
+                lines = [self._encode_event(event) for event in events]
+            
+            f.write(b''.join(lines))
+            f.flush()
+            if durability == Durability.STRICT:
+                os.fsync(f.fileno())
+            segment_full = f.tell() >= self.segment_max_bytes
+        
+        entries = []
+        for line, event in zip(lines, events):
+            entries.append((event["id"], event_task_id(event), number, start, len(line)))
+            start += len(line)
+        self._update_index(self.index.append, entries)
+        
+        if durability == Durability.BATCHED:
+            self._schedule_fsync()
+        
+        if segment_full:
+            self._seal_active_segment()
+    
+    def _schedule_fsync(self) -> None:
+        """Arrange for the active segment to be fsynced within batch_fsync_interval."""
+        with self._fsync_timer_lock:
+            if self._fsync_timer is None:
+                self._fsync_timer = threading.Timer(self.batch_fsync_interval, self._timed_fsync)
+                self._fsync_timer.daemon = True
+                self._fsync_timer.start()
+    
+    def _timed_fsync(self) -> None:
+        """fsync the active segment; covers every BATCHED write made before now."""
+        with self._fsync_timer_lock:
+            self._fsync_timer = None
+        
+        try:
+            with open(self.event_log_path, 'rb') as f:
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"⚠️ Deferred event log fsync failed: {e}")
+    
+    def _locked_active_number(self, f) -> int:
+        """Number of the open active segment; caller holds the event_log lock."""
+        inode = os.fstat(f.fileno()).st_ino
+        if self._active_segment[0] != inode:
+            self._active_segment = (inode, self._active_segment_number())
+        return self._active_segment[1]
+    
+    def _segment_path(self, number: int) -> Path:
+        """Path of a sealed log segment."""
+        return self.segments_path / f"event-log.{number:08d}.{self.log_suffix}"
+    
+    def _sealed_segment_numbers(self) -> List[int]:
+        """Numbers of all sealed segments, oldest first."""
+        return sorted(int(path.name.split(".")[1])
+                      for path in self.segments_path.glob(f"event-log.*.{self.log_suffix}"))
+    
+    def _active_segment_number(self) -> int:
+        """The active segment is numbered one past the newest sealed segment."""
+        sealed = self._sealed_segment_numbers()
+        return sealed[-1] + 1 if sealed else 1
+    
+    def _open_active_segment(self, known_inode: Optional[int], known_number: int):
+        """
+        Open the active segment and determine its number.
+        
+        Returns (file, number). The number is only trusted if the active path
+        still refers to the opened file afterwards; otherwise the segment was
+        sealed in between and we retry.
+        """
+        while True:
+            try:
+                f = open(self.event_log_path, 'rb')
+            except FileNotFoundError:
+                time.sleep(0.001)  # Mid-rotation, the new active file is about to appear
+                continue
+            
+            inode = os.fstat(f.fileno()).st_ino
+            if inode == known_inode:
+                return f, known_number
+            
+            number = self._active_segment_number()
+            try:
+                if os.stat(self.event_log_path).st_ino == inode:
+                    return f, number
+            except FileNotFoundError:
+                pass
+            f.close()
+    
+    def _seal_active_segment(self) -> Optional[int]:
+        """
+        Move the active segment into segments/ and checkpoint the state.
+        
+        Caller must hold the event_log lock. Returns the sealed segment
+        number, or None if the active segment was empty.
+        """
+        if self.event_log_path.stat().st_size == 0:
+            return None
+        
+        # Deferred (BATCHED) writes must reach disk before the segment is sealed
+        with open(self.event_log_path, 'rb') as f:
+            os.fsync(f.fileno())
+        
+        number = self._active_segment_number()
+        self._recover_tail(number, self.event_log_path, self.event_log_path.stat().st_size)
+        self.event_log_path.replace(self._segment_path(number))
+        self.event_log_path.touch()
+        os.chmod(self.event_log_path, 0o600)
+        
+        # Nobody can append while we hold the lock, so the caught-up state is
+        # exactly the state at the end of the sealed segment.
+        tasks, agents, position = self.checkpoint_source()
+        if position[:2] == (number + 1, 0):
+            self._write_snapshot(number, tasks, agents)
+            self.write_views(tasks, agents, None, None, position, flush=True)
+        
+        return number
+    
+    def _write_snapshot(self, number: int, tasks: Dict, agents: Dict) -> None:
+        """Checkpoint the state as of the end of segment `number`."""
+        snapshot_data = {
+            "segment": number,
+            "tasks": tasks,
+            "agents": agents,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        
+        atomic_write_json(self.snapshots_path / f"snapshot.{number:08d}.json", snapshot_data)
+    
+    def _snapshot_paths(self) -> List[Path]:
+        """Snapshot files, newest first."""
+        return sorted(self.snapshots_path.glob("snapshot.*.json"), reverse=True)
+    
+    def load_checkpoint(self) -> Tuple[Dict, Dict, Any]:
+        """
+        Load the newest readable snapshot.
+        
+        Without a usable snapshot, replay starts at the oldest segment on disk.
+        """
+        for snapshot_path in self._snapshot_paths():
+            try:
+                with open(snapshot_path) as f:
+                    snapshot_data = json.load(f)
+            except (OSError, ValueError):
+                continue  # Skip a damaged snapshot and fall back to an older one
+            
+            return snapshot_data["tasks"], snapshot_data["agents"], (snapshot_data["segment"] + 1, 0, None)
+        
+        return {}, {}, self.first_position()
+    
+    def checkpoint_before(self, moment: Optional[datetime] = None,
+                          position: Any = None) -> Tuple[Dict, Dict, Any]:
+        """
+        Newest snapshot usable for a past point. Snapshots are written when
+        their segment is sealed, so the file's mtime bounds the timestamps
+        of the events it covers.
+        """
+        for snapshot_path in self._snapshot_paths():
+            number = int(snapshot_path.name.split(".")[1])
+            if position is not None and tuple(position[:2]) < (number + 1, 0):
+                continue
+            try:
+                if moment is not None and snapshot_path.stat().st_mtime > moment.timestamp():
+                    continue
+                with open(snapshot_path) as f:
+                    snapshot_data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            
+            return snapshot_data["tasks"], snapshot_data["agents"], (number + 1, 0, None)
+        
+        return {}, {}, self.first_position()
+    
+    def first_position(self) -> Tuple[int, int, Optional[int]]:
+        """Position of the oldest event still on disk."""
+        sealed = self._sealed_segment_numbers()
+        return (sealed[0] if sealed else 1, 0, None)
+    
+    def end_position(self) -> Tuple[int, int, Optional[int]]:
+        """
+        Position after the last complete record of the active segment,
+        parsing only what lies past the indexed end.
+        """
+        f, number = self._open_active_segment(None, 0)
+        f.close()
+        
+        start = self.index.indexed_end(number)
+        position = (number, start if start != sys.maxsize else 0, None)
+        try:
+            for _, position in self.read_events(position):
+                pass
+        except LogPositionLost:
+            # Index ran ahead of the log (crash before recovery): parse it all
+            position = (number, 0, None)
+            for _, position in self.read_events(position):
+                pass
+        return position
+    
+    def position_token(self, position: Any, event_id: Optional[str]) -> str:
+        """Token "segment:offset:event_id"; the inode is not meaningful to another process."""
+        segment, offset, _ = position
+        return f"{segment}:{offset}:{event_id or ''}"
+    
+    def token_position(self, token: str) -> Tuple[Any, Optional[str]]:
+        try:
+            segment, offset, event_id = token.split(":", 2)
+            return (int(segment), int(offset), None), event_id or None
+        except ValueError:
+            raise ValueError(f"Invalid resume token: {token!r}")
+    
+    def relocate(self, event_id: str) -> Tuple[int, int, Optional[int]]:
+        """
+        Start of the segment holding an event, found via the offset index or
+        else a full scan. Offsets into compacted segments are refused by
+        read_events, so the segment is re-read from its start.
+        """
+        if not self.index.exists():
+            self.rebuild_index()
+        self.index.refresh()
+        
+        location = self.index.locate_event(event_id)
+        if location:
+            events = self._read_locations([location])
+            if events and events[0]["id"] == event_id:
+                return (location[0], 0, None)
+        
+        for event, position in self.read_events(self.first_position()):
+            if event is not None and event["id"] == event_id:
+                return (position[0], 0, None)
+        raise LogPositionLost(f"event {event_id} is no longer in the log")
+    
+    def watch_paths(self) -> List[Tuple[Path, List[str]]]:
+        """Appends modify the active segment; a seal replaces it."""
+        return [(self.orchestration_path, [self.event_log_path.name])]
+    
+    def _compacted_through(self) -> int:
+        """Highest segment number that compaction has rewritten (0 if none)."""
+        try:
+            with open(self.segments_path / "compaction.json") as f:
+                return json.load(f)["compacted_through"]
+        except (OSError, ValueError, KeyError):
+            return 0
+    
+    def read_events(self, position: Any) -> Iterator[Tuple[Optional[Dict], Any]]:
+        """
+        Yield events after position, reading sealed segments before the active one.
+        
+        Only complete lines are consumed, so an event that another writer is
+        still appending is picked up on the next call.
+        """
+        segment, offset, inode = position
+        f, active_number = self._open_active_segment(inode, segment)
+        with f:
+            while segment < active_number:
+                segment_path = self._segment_path(segment)
+                if offset and segment <= self._compacted_through():
+                    # Our offset into a rewritten segment is meaningless
+                    raise LogPositionLost(f"segment {segment} was compacted")
+                
+                if segment_path.exists():
+                    with open(segment_path, 'rb') as sealed:
+                        sealed.seek(offset)
+                        yield from self._parse_chunk(sealed.read(), segment, offset, None)
+                
+                # Removed-by-hand segments are skipped; nothing left to apply from them
+                segment, offset = segment + 1, 0
+                yield None, (segment, 0, None)
+            
+            stat = os.fstat(f.fileno())
+            if (segment > active_number
+                    or inode not in (None, stat.st_ino)
+                    or stat.st_size < offset):
+                raise LogPositionLost("active segment was replaced or truncated")
+            
+            f.seek(offset)
+            yield None, (segment, offset, stat.st_ino)
+            yield from self._parse_chunk(f.read(), segment, offset, stat.st_ino)
+    
+    def _parse_chunk(self, chunk: bytes, segment: int, offset: int,
+                     inode: Optional[int]) -> Iterator[Tuple[Optional[Dict], Any]]:
+        """
+        Yield every complete line in chunk with the position after it.
+        
+        A line that fails its checksum is yielded as None (and skipped by
+        replay) rather than stopping every reader at the same spot.
+        """
+        position = 0
+        end = chunk.rfind(b'\n') + 1
+        while position < end:
+            line_end = chunk.index(b'\n', position) + 1
+            line = chunk[position:line_end]
+            if line.strip():
+                event = decode_json_line(line)
+                if event is None:
+                    print(f"⚠️ Skipping corrupt event record: segment {segment}, offset {offset + position}")
+                yield event, (segment, offset + line_end, inode)
+            position = line_end
+    
+    def _segment_records(self, number: int) -> Iterator[Tuple[bytes, Dict]]:
+        """(stored bytes, event) for every valid event in a sealed segment."""
+        with open(self._segment_path(number), 'rb') as f:
+            chunk = f.read()
+        
+        start = 0
+        for event, (_, end, _) in self._parse_chunk(chunk, number, 0, None):
+            if event is not None:
+                yield chunk[start:end], event
+            start = end
+    
+    # ==================== OFFSET INDEX ====================
+    
+    def _scan_records(self, chunk: bytes, number: int, offset: int) -> Tuple[List[Tuple], int, int]:
+        """
+        Validate the records in chunk, read from `offset` of a segment.
+        
+        Returns (index entries of the valid records, end of the last valid
+        record, number of corrupt records). Binary records cannot be
+        resynchronized past a bad one, so a CRC failure ends the scan there.
+        """
+        entries = []
+        start = valid_end = offset
+        corrupt = 0
+        try:
+            for event, (_, end, _) in self._parse_chunk(chunk, number, offset, None):
+                if event is None:
+                    corrupt += 1
+                else:
+                    entries.append((event["id"], event_task_id(event), number, start, end - start))
+                    valid_end = end
+                start = end
+        except CorruptRecord:
+            corrupt += 1
+        return entries, valid_end, corrupt
+    
+    def _index_entries(self, chunk: bytes, number: int, offset: int) -> List[Tuple]:
+        """Index entries for the valid records in chunk, read from `offset` of a segment."""
+        return self._scan_records(chunk, number, offset)[0]
+    
+    def _update_index(self, operation: Callable, *args) -> None:
+        """
+        Run an index update. The index is derived data: if it cannot be
+        updated it is removed, and the next lookup rebuilds it.
+        """
+        try:
+            operation(*args)
+        except Exception as e:
+            print(f"⚠️ Event index update failed, dropping index: {e}")
+            self.index.path.unlink(missing_ok=True)
+    
+    def _recover_tail(self, number: int, path: Path, end: int) -> Dict:
+        """
+        Validate the records of the active segment that are not indexed yet
+        (normally none), index the valid ones and truncate a torn tail left
+        by a writer that died mid-append, so the next append starts on a
+        record boundary. Caller holds the event_log lock.
+        
+        Returns counts plus "valid_end", the new end of the segment.
+        """
+        if not self.index.exists():
+            self._update_index(self._rebuild_index_locked)
+        
+        start = self.index.indexed_end(number)
+        if start > end:
+            # The index outran a log that lost unsynced writes
+            self._update_index(self._rebuild_index_locked)
+            start = min(self.index.indexed_end(number), end)
+        
+        report = {"records_valid": 0, "records_corrupt": 0, "bytes_truncated": 0, "valid_end": end}
+        if start == end:
+            return report
+        
+        with open(path, 'rb') as f:
+            f.seek(start)
+            chunk = f.read(end - start)
+        
+        entries, valid_end, corrupt = self._scan_records(chunk, number, start)
+        if entries:
+            self._update_index(self.index.append, entries)
+        
+        if valid_end < end:
+            os.truncate(path, valid_end)
+            print(f"⚠️ Truncated torn event log tail: segment {number}, {end - valid_end} bytes")
+        
+        report.update(records_valid=len(entries), records_corrupt=corrupt,
+                      bytes_truncated=end - valid_end, valid_end=valid_end)
+        return report
+    
+    def _checkpointed_segment(self) -> int:
+        """Last sealed segment covered by the newest snapshot (0 if none)."""
+        snapshots = self._snapshot_paths()
+        return int(snapshots[0].name.split(".")[1]) if snapshots else 0
+    
+    def recover_log(self) -> Dict:
+        """
+        Crash recovery: validate the log from the newest snapshot on and
+        truncate a torn tail of the active segment.
+        
+        Sealed segments were fsynced before sealing, so only segments
+        written after the snapshot (normally just the active one, at most
+        segment_max_bytes) are checked, which bounds recovery time
+        independently of the log's total size.
+        """
+        start_time = time.perf_counter()
+        if not self.acquire_lock("event_log"):
+            raise Exception("Failed to acquire event log lock")
+        
+        try:
+            covered = self._checkpointed_segment()
+            
+            report = {"segments_checked": 0, "bytes_checked": 0, "records_valid": 0,
+                      "records_corrupt": 0, "bytes_truncated": 0}
+            for number in self._sealed_segment_numbers():
+                if number <= covered:
+                    continue
+                with open(self._segment_path(number), 'rb') as f:
+                    chunk = f.read()
+                entries, _, corrupt = self._scan_records(chunk, number, 0)
+                report["segments_checked"] += 1
+                report["bytes_checked"] += len(chunk)
+                report["records_valid"] += len(entries)
+                report["records_corrupt"] += corrupt
+            
+            # The whole active segment is revalidated, not just its unindexed tail
+            with open(self.event_log_path, 'rb') as f:
+                chunk = f.read()
+            number = self._active_segment_number()
+            entries, valid_end, corrupt = self._scan_records(chunk, number, 0)
+            if valid_end < len(chunk):
+                os.truncate(self.event_log_path, valid_end)
+                print(f"⚠️ Truncated torn event log tail: segment {number}, {len(chunk) - valid_end} bytes")
+            
+            report["segments_checked"] += 1
+            report["bytes_checked"] += len(chunk)
+            report["records_valid"] += len(entries)
+            report["records_corrupt"] += corrupt
+            report["bytes_truncated"] = len(chunk) - valid_end
+            
+            # Index whatever valid records the crashed writer did not
+            self._recover_tail(number, self.event_log_path, valid_end)
+        finally:
+            self.release_lock("event_log")
+        
+        report["duration_seconds"] = round(time.perf_counter() - start_time, 4)
+        return report
+    
+    def _rebuild_index_locked(self) -> int:
+        """Index every segment on disk from scratch; caller holds the event_log lock."""
+        def entries():
+            for number in self._sealed_segment_numbers():
+                with open(self._segment_path(number), 'rb') as f:
+                    yield from self._index_entries(f.read(), number, 0)
+            with open(self.event_log_path, 'rb') as f:
+                yield from self._index_entries(f.read(), self._active_segment_number(), 0)
+        
+        return self.index.rebuild(entries())
+    
+    def rebuild_index(self) -> int:
+        """Rebuild the offset index from the segments on disk."""
+        if not self.acquire_lock("event_log"):
+            raise Exception("Failed to acquire event log lock")
+        
+        try:
+            return self._rebuild_index_locked()
+        finally:
+            self.release_lock("event_log")
+    
+    def _read_locations(self, locations: List[Tuple[int, int, int]]) -> Optional[List[Dict]]:
+        """
+        Decode the records at the given locations through mmap, without
+        parsing anything else. Returns None if a location no longer spans
+        exactly one record, e.g. because compaction rewrote the segment
+        meanwhile.
+        """
+        events = []
+        for number, group in itertools.groupby(locations, key=lambda location: location[0]):
+            path = self._segment_path(number)
+            if not path.exists():
+                path = self.event_log_path  # Still the active segment
+            
+            try:
+                with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    for _, offset, length in group:
+                        records = list(self._parse_chunk(mapped[offset:offset + length], number, offset, None))
+                        if len(records) != 1 or records[0][1][1] != offset + length:
+                            return None  # No longer a record boundary
+                        if records[0][0] is not None:
+                            events.append(records[0][0])  # Damaged records are left out, as in replay
+            except (OSError, ValueError, CorruptRecord):
+                return None
+        return events
+    
+    def _unindexed_events(self) -> List[Dict]:
+        """Events in the active segment past the indexed end (appends in flight)."""
+        f, number = self._open_active_segment(None, 0)
+        with f:
+            start = self.index.indexed_end(number)
+            f.seek(start)
+            return [event for event, _ in self._parse_chunk(f.read(), number, start, None)
+                    if event is not None]
+    
+    def _scan_events(self) -> Iterator[Dict]:
+        """Every event on disk by linear scan; the fallback when the index is unusable."""
+        for event, _ in self.read_events(self.first_position()):
+            if event is not None:
+                yield event
+    
+    def _indexed_lookup(self, locations_for: Callable, matches: Callable[[Dict], bool]) -> List[Dict]:
+        """Events matching a predicate, read through the index where possible."""
+        if not self.index.exists():
+            self.rebuild_index()
+        self.index.refresh()
+        
+        events = self._read_locations(locations_for())
+        if events is None or not all(matches(event) for event in events):
+            return [event for event in self._scan_events() if matches(event)]
+        
+        return events + [event for event in self._unindexed_events() if matches(event)]
+    
+    def task_history(self, task_id: str) -> List[Dict]:
+        """Every event concerning task_id, oldest first, read via the offset index."""
+        return self._indexed_lookup(lambda: self.index.locate_task(task_id),
+                                    lambda event: event_task_id(event) == task_id)
+    
+    def get_event(self, event_id: str) -> Optional[Dict]:
+        """A single event by id, read via the offset index."""
+        def locations():
+            location = self.index.locate_event(event_id)
+            return [location] if location else []
+        
+        events = self._indexed_lookup(locations, lambda event: event["id"] == event_id)
+        return events[0] if events else None
+    
+    # ==================== DERIVED VIEWS ====================
+    
+    def write_views(self, tasks: Dict, agents: Dict, changed_tasks: Optional[Set[str]],
+                    changed_agents: Optional[Set[str]], position: Any,
+                    durability: Durability = Durability.STRICT, flush: bool = False) -> None:
+        """
+        Rewrite task-queue.json and/or agent-registry.json atomically.
+        
+        Each rewrite costs the whole view, so changes are only noted here
+        and written when the active segment is sealed or on flush; a burst
+        of task creations no longer rewrites the queue once per task.
+        """
+        self._task_view_stale |= changed_tasks is None or bool(changed_tasks)
+        self._agent_view_stale |= changed_agents is None or bool(changed_agents)
+        if not flush:
+            return
+        
+        log_position = list(position[:2])
+        fsync = durability == Durability.STRICT
+        
+        if self._task_view_stale:
+            self._task_view_stale = False
+            atomic_write_json(self.task_queue_path, {
+                "tasks": tasks,
+                "version": int(time.time()),
+                "log_position": log_position,
+                "rebuilt_at": datetime.now(timezone.utc).isoformat()
+            }, fsync=fsync)
+        
+        if self._agent_view_stale:
+            self._agent_view_stale = False
+            atomic_write_json(self.agent_registry_path, {
+                "agents": agents,
+                "version": int(time.time()),
+                "log_position": log_position,
+                "rebuilt_at": datetime.now(timezone.utc).isoformat()
+            }, fsync=fsync)
+    
+    def check_health(self) -> bool:
+        """Check that the derived JSON views parse."""
+        try:
+            with open(self.task_queue_path) as f:
+                json.load(f)
+            with open(self.agent_registry_path) as f:
+                json.load(f)
+            return True
+        except Exception:
+            return False
+    
+    # ==================== COMPACTION ====================
+    
+    def compact(self) -> Dict:
+        """
+        Fold superseded events into a snapshot and rewrite old segments.
+        
+        Seals the active segment (which writes a fresh snapshot), then rewrites
+        every sealed segment covered by that snapshot without agent heartbeats.
+        Intermediate status updates stay: dropping one would shift the versions
+        that later claims were checked against, so replay would flip them.
+        """
+        if not self.acquire_lock("event_log"):
+            raise Exception("Failed to acquire event log lock")
+        
+        try:
+            self._seal_active_segment()
+            
+            snapshots = self._snapshot_paths()
+            if not snapshots:
+                return {"segments_compacted": 0, "events_before": 0, "events_after": 0}
+            
+            covered = int(snapshots[0].name.split(".")[1])
+            numbers = [n for n in self._sealed_segment_numbers()
+                       if self._compacted_through() < n <= covered]
+            
+            # Publish the marker before rewriting anything: readers still
+            # positioned inside these segments reload from the snapshot instead.
+            atomic_write_json(self.segments_path / "compaction.json", {
+                "compacted_through": covered,
+                "compacted_at": datetime.now(timezone.utc).isoformat()
+            })
+            
+            # Rewrite each segment without superseded events
+            events_before = events_after = 0
+            for number in numbers:
+                segment_path = self._segment_path(number)
+                kept = []
+                for record, event in self._segment_records(number):
+                    events_before += 1
+                    if event["type"] == "agent_heartbeat":
+                        continue
+                    kept.append(record)
+                
+                temp_path = segment_path.with_suffix(f".tmp.{uuid.uuid4().hex}")
+                with open(temp_path, 'wb') as f:
+                    f.writelines(kept)
+                    f.flush()
+                    os.fsync(f.fileno())
+                temp_path.replace(segment_path)
+                events_after += len(kept)
+            
+            # Records moved, so the offsets have to be indexed again
+            if numbers:
+                self._update_index(self._rebuild_index_locked)
+            
+            for old_snapshot in snapshots[self.snapshot_retention:]:
+                old_snapshot.unlink()
+            
+            return {
+                "segments_compacted": len(numbers),
+                "events_before": events_before,
+                "events_after": events_after,
+                "snapshot": covered
+            }
+        finally:
+            self.release_lock("event_log")
+
+
+class BinaryStorageBackend(JsonlStorageBackend):
+    """
+    The JSONL backend's segments, snapshots and views, with events stored as
+    length-prefixed, CRC-checked binary records (see event_codec.py) instead
+    of JSON lines.
+    """
+    
+    name = "binary"
+    log_suffix = "bin"
+    
+    def _encode_event(self, event: Dict) -> bytes:
+        return encode_event(event)
+    
+    def _parse_chunk(self, chunk: bytes, segment: int, offset: int,
+                     inode: Optional[int]) -> Iterator[Tuple[Dict, Any]]:
+        """Yield every complete record in chunk with the position after it."""
+        for event, end in decode_records(chunk):
+            yield event, (segment, offset + end, inode)
+
+
+class GlobalSequence:
+    """
+    Cross-process counter handing out the global sequence numbers of the
+    sharded backend: the next free number, 8 bytes little-endian, updated
+    under flock. The lock covers only the read-modify-write, never a log
+    write or fsync. The file is not fsynced; after a machine crash
+    recover_log() moves the counter past the highest number in the logs.
+    """
+    
+    COUNTER = struct.Struct("<Q")
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()  # flock does not exclude threads sharing the descriptor
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+    
+    def _read(self) -> int:
+        data = os.pread(self._fd, self.COUNTER.size, 0)
+        return self.COUNTER.unpack(data)[0] if len(data) == self.COUNTER.size else 1
+    
+    def peek(self) -> int:
+        """The number the next allocation will start at."""
+        with self._lock:
+            return self._read()
+    
+    def allocate(self, count: int = 1) -> int:
+        """Reserve count consecutive numbers; returns the first."""
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                first = self._read()
+                os.pwrite(self._fd, self.COUNTER.pack(first + count), 0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return first
+    
+    def ensure_above(self, seq: int) -> None:
+        """Make every number handed out from now on greater than seq."""
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if self._read() <= seq:
+                    os.pwrite(self._fd, self.COUNTER.pack(seq + 1), 0)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class ShardLog(JsonlStorageBackend):
+    """
+    One shard of ShardedStorageBackend: a JSONL segmented log with its own
+    offset index and event_log lock, but no views or snapshots of its own.
+    """
+    
+    checkpointed_segment = 0  # Set from the global snapshot before recovery
+    
+    def _checkpointed_segment(self) -> int:
+        return self.checkpointed_segment
+    
+    def _initialize_files(self):
+        self.orchestration_path.mkdir(parents=True, exist_ok=True)
+        self.locks_path.mkdir(exist_ok=True)
+        self.segments_path.mkdir(exist_ok=True)
+        
+        if not self.event_log_path.exists():
+            self.event_log_path.touch()
+            os.chmod(self.event_log_path, 0o600)
+
+
+class ShardedStorageBackend(JsonlStorageBackend):
+    """
+    Event log split into independent shards (shards/<name>/), each a
+    ShardLog with its own segments, index and event_log lock, so appends to
+    different shards never wait for each other. shard_for(event) picks the
+    shard; the protocol shards by agent type.
+    
+    Each event is stamped with a global sequence number ("seq") under its
+    shard's lock, immediately before the write, and read_events merges the
+    shards back into that one total order. Replay, claim resolution and
+    subscriptions therefore see the same sequence in every process.
+    
+    A number is never skipped on a reader's say-so alone. read_events stops
+    at a missing number; await_position (called by readers outside their
+    own locks) waits for it, and once it has been missing for hole_timeout
+    takes every shard's event_log lock, so no writer can be between
+    numbering and writing, and only if the number is still absent appends
+    a durable sequence_skipped record for it. Every reader obeys that
+    record, and no event can carry the number afterwards.
+    
+    The other locks, the JSON views and check_health are the JSONL
+    backend's, at the top level. Checkpoints are global snapshots
+    (snapshots/snapshot.<seq>.json) written every snapshot_interval events.
+    A position is (next_seq, ((shard, shard position), ...)); next_seq 0
+    means "whatever number comes next".
+    """
+    
+    name = "sharded"
+    DEFAULT_SHARDS = ("shard-0", "shard-1", "shard-2", "shard-3")
+    
+    def __init__(self, orchestration_path: Path,
+                 checkpoint_source: Callable[[], Tuple[Dict, Dict, Any]],
+                 shard_for: Optional[Callable[[Dict], str]] = None,
+                 shards: Iterable[str] = ()):
+        self.shards_path = Path(orchestration_path) / "shards"
+        super().__init__(orchestration_path, checkpoint_source)
+        
+        self.default_shards = tuple(shards) or self.DEFAULT_SHARDS
+        self.shard_for = shard_for or self._hashed_shard
+        self.sequence = GlobalSequence(self.orchestration_path / "sequence.bin")
+        
+        # A sequence number that is missing while later ones are on disk
+        # normally belongs to a writer between numbering and writing. After
+        # hole_timeout seconds the reader resolves it under all shard locks
+        # (see _resolve_hole) instead of re-reading.
+        self.hole_timeout = 0.1
+        self._holes: Dict[int, float] = {}  # seq -> when first found missing
+        self._holes_lock = threading.Lock()  # Readers on several threads share _holes
+        
+        self.snapshot_interval = 10000  # Events between global snapshots
+        self._last_snapshot = 0
+        
+        self._shards: Dict[str, ShardLog] = {}
+        self._shards_lock = threading.Lock()
+        for name in self.default_shards:
+            self._shard(name)
+    
+    def _initialize_files(self):
+        """Views, locks and snapshots at the top level; the log lives in the shards."""
+        self.orchestration_path.mkdir(parents=True, exist_ok=True)
+        self.locks_path.mkdir(exist_ok=True)
+        self.snapshots_path.mkdir(exist_ok=True)
+        self.shards_path.mkdir(exist_ok=True)
+        
+        if not self.task_queue_path.exists():
+            atomic_write_json(self.task_queue_path, {"tasks": {}, "version": 1})
+        
+        if not self.agent_registry_path.exists():
+            atomic_write_json(self.agent_registry_path, {"agents": {}, "version": 1})
+    
+    # ==================== SHARDS ====================
+    
+    def _hashed_shard(self, event: Dict) -> str:
+        """Default shard_for: spread tasks and agents over default_shards by id."""
+        data = event["data"]
+        key = event_task_id(event) or data.get("agent_id") or data.get("id") or event["id"]
+        return self.default_shards[zlib.crc32(key.encode()) % len(self.default_shards)]
+    
+    def _shard(self, name: str) -> ShardLog:
+        shard = self._shards.get(name)
+        if shard is not None:
+            return shard
+        if not name or not all(c.isalnum() or c in "-_" for c in name):
+            raise ValueError(f"Invalid shard name: {name!r}")
+        
+        with self._shards_lock:
+            if name not in self._shards:
+                # Shard seals never snapshot (the checkpoint position never
+                # matches); the global snapshots cover all shards
+                shard = ShardLog(self.shards_path / name, checkpoint_source=lambda: ({}, {}, (0, 0, None)))
+                shard.sequencer = self.sequence.allocate
+                shard.segment_max_bytes = self.segment_max_bytes
+                self._shards[name] = shard
+            return self._shards[name]
+    
+    def _shard_names(self) -> List[str]:
+        """Every shard on disk; other processes may have added some."""
+        return sorted(path.name for path in self.shards_path.iterdir() if path.is_dir())
+    
+    def append_event(self, event: Dict, durability: Durability = Durability.STRICT) -> None:
+        """Append to the event's shard, which numbers it under its own lock."""
+        self._shard(self.shard_for(event)).append_event(event, durability)
+    
+    # ==================== MERGED READS ====================
+    
+    def first_position(self) -> Tuple[int, Tuple]:
+        return (1, tuple((name, self._shard(name).first_position()) for name in self._shard_names()))
+    
+    def end_position(self) -> Tuple[int, Tuple]:
+        return (0, tuple((name, self._shard(name).end_position()) for name in self._shard_names()))
+    
+    def _shard_stream(self, name: str, position: Any) -> Iterator[Tuple[Optional[int], Optional[Dict], Any]]:
+        """(seq, event, position after) for a shard's events, then (None, None, final position)."""
+        shard = self._shard(name)
+        last = position if position is not None else shard.first_position()
+        for event, after in shard.read_events(last):
+            if event is not None:
+                yield event.get("seq", 0), event, after
+            last = after
+        yield None, None, last
+    
+    @staticmethod
+    def _advance(name: str, stream: Iterator, heads: Dict, positions: Dict) -> None:
+        """Load the next event of a shard into heads, or record where the shard ends."""
+        seq, event, after = next(stream)
+        if event is None:
+            positions[name] = after
+        else:
+            heads[name] = (seq, event, after, stream)
+    
+    def _resolve_hole(self, next_seq: int, positions: Dict) -> None:
+        """
+        Settle a missing sequence number for good. With every shard's
+        event_log lock held no writer is between numbering and writing, so
+        numbers from next_seq up to the lowest one on disk that are still
+        absent were lost with their writer (it died or its write failed).
+        They are recorded in a STRICT sequence_skipped record. If the number
+        has turned up meanwhile, nothing is written.
+        """
+        shards = [self._shard(name) for name in self._shard_names()]
+        locked = []
+        try:
+            for shard in shards:
+                if not shard.acquire_lock("event_log"):
+                    raise Exception("Failed to acquire event log lock")
+                locked.append(shard)
+            
+            present = [seq for name in self._shard_names()
+                       for seq, event, _ in self._shard_stream(name, positions.get(name))
+                       if event is not None and seq >= next_seq]
+            if not present or min(present) == next_seq:
+                return
+            
+            through = min(present) - 1
+            marker = {
+                "id": str(uuid.uuid4()),
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "type": "sequence_skipped",
+                "data": {"through": through},
+                "seq": next_seq
+            }
+            shards[0]._append_locked([shards[0]._encode_event(marker)], [marker], Durability.STRICT,
+                                     number_events=False)
+            print(f"⚠️ Event seq {next_seq}..{through} never written (writer died?), recorded as skipped")
+        finally:
+            for shard in locked:
+                shard.release_lock("event_log")
+    
+    def read_events(self, position: Any) -> Iterator[Tuple[Optional[Dict], Any]]:
+        """
+        Yield the events of all shards in global sequence order.
+        
+        Stops before a missing number, noting it in _holes; await_position
+        then waits until it is written or settled by a sequence_skipped
+        record (_resolve_hole), which is applied like any event but yielded
+        as None.
+        """
+        next_seq, shard_positions = position
+        positions = dict(shard_positions)
+        
+        streams = [self._shard_stream(name, positions.get(name)) for name in self._shard_names()]
+        heads: Dict[str, Tuple] = {}
+        for name, stream in zip(self._shard_names(), streams):
+            self._advance(name, stream, heads, positions)
+        
+        try:
+            while heads:
+                name = min(heads, key=lambda shard_name: heads[shard_name][0])
+                seq, event, after, stream = heads[name]
+                if next_seq and seq > next_seq:
+                    with self._holes_lock:
+                        self._holes.setdefault(next_seq, time.monotonic())
+                    break
+                
+                del heads[name]
+                positions[name] = after
+                if next_seq and seq < next_seq:
+                    # Numbers are unique, so this is a duplicate of an applied record
+                    print(f"⚠️ Event {event['id']} (seq {seq}) is out of order, ignoring it")
+                elif event["type"] == "sequence_skipped":
+                    next_seq = event["data"]["through"] + 1
+                    yield None, (next_seq, tuple(sorted(positions.items())))
+                else:
+                    next_seq = seq + 1
+                    yield event, (next_seq, tuple(sorted(positions.items())))
+                self._advance(name, stream, heads, positions)
+        finally:
+            for stream in streams:
+                stream.close()
+        
+        yield None, (next_seq, tuple(sorted(positions.items())))
+    
+    def await_position(self, position: Any) -> bool:
+        """
+        Wait briefly for the missing number read_events stopped at, or,
+        once it has been missing for hole_timeout, settle it (_resolve_hole).
+        """
+        next_seq, shard_positions = position
+        with self._holes_lock:
+            for seq in [seq for seq in self._holes if seq < next_seq]:
+                del self._holes[seq]  # Filled or settled since
+            missing_since = self._holes.get(next_seq)
+        if missing_since is None:
+            return False
+        
+        if time.monotonic() - missing_since < self.hole_timeout:
+            time.sleep(0.0005)  # Its writer is normally between numbering and writing
+        else:
+            self._resolve_hole(next_seq, dict(shard_positions))
+            with self._holes_lock:
+                self._holes.pop(next_seq, None)
+        return True
+    
+    def position_token(self, position: Any, event_id: Optional[str]) -> str:
+        """Token "next_seq|shard:segment:offset,...|event_id"."""
+        next_seq, shard_positions = position
+        shards = ",".join(f"{name}:{segment}:{offset}" for name, (segment, offset, _) in shard_positions)
+        return f"{next_seq}|{shards}|{event_id or ''}"
+    
+    def token_position(self, token: str) -> Tuple[Any, Optional[str]]:
+        try:
+            next_seq, shards, event_id = token.split("|")
+            positions = []
+            for item in filter(None, shards.split(",")):
+                name, segment, offset = item.split(":")
+                positions.append((name, (int(segment), int(offset), None)))
+            return (int(next_seq), tuple(positions)), event_id or None
+        except ValueError:
+            raise ValueError(f"Invalid resume token: {token!r}")
+    
+    def relocate(self, event_id: str) -> Any:
+        """Shards are never rewritten, so there is nothing to relocate into."""
+        raise LogPositionLost(f"event {event_id} cannot be relocated in a sharded log")
+    
+    def watch_paths(self) -> List[Tuple[Path, List[str]]]:
+        return [(self.shards_path / name, [self._shard(name).event_log_path.name])
+                for name in self._shard_names()]
+    
+    def task_history(self, task_id: str) -> List[Dict]:
+        """A task's events from every shard (each via its offset index), in global order."""
+        events = [event for name in self._shard_names() for event in self._shard(name).task_history(task_id)]
+        return sorted(events, key=lambda event: event.get("seq", 0))
+    
+    def get_event(self, event_id: str) -> Optional[Dict]:
+        for name in self._shard_names():
+            event = self._shard(name).get_event(event_id)
+            if event is not None:
+                return event
+        return None
+    
+    def rebuild_index(self) -> int:
+        return sum(self._shard(name).rebuild_index() for name in self._shard_names())
+    
+    # ==================== CHECKPOINTS & RECOVERY ====================
+    
+    def _write_global_snapshot(self, tasks: Dict, agents: Dict, position: Any) -> None:
+        """Checkpoint the state as of a merged position."""
+        next_seq, shard_positions = position
+        atomic_write_json(self.snapshots_path / f"snapshot.{next_seq:016d}.json", {
+            "next_seq": next_seq,
+            "shards": {name: [segment, offset] for name, (segment, offset, _) in shard_positions},
+            "tasks": tasks,
+            "agents": agents,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
+        self._last_snapshot = next_seq
+        
+        for old_snapshot in self._snapshot_paths()[self.snapshot_retention:]:
+            old_snapshot.unlink(missing_ok=True)
+    
+    def load_checkpoint(self) -> Tuple[Dict, Dict, Any]:
+        """Load the newest readable global snapshot, else replay all shards."""
+        for snapshot_path in self._snapshot_paths():
+            try:
+                with open(snapshot_path) as f:
+                    snapshot_data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            
+            self._last_snapshot = snapshot_data["next_seq"]
+            positions = tuple((name, (segment, offset, None))
+                              for name, (segment, offset) in sorted(snapshot_data["shards"].items()))
+            return snapshot_data["tasks"], snapshot_data["agents"], (snapshot_data["next_seq"], positions)
+        
+        return {}, {}, self.first_position()
+    
+    def checkpoint_before(self, moment: Optional[datetime] = None,
+                          position: Any = None) -> Tuple[Dict, Dict, Any]:
+        """Newest global snapshot written before moment and at or before position."""
+        for snapshot_path in self._snapshot_paths():
+            next_seq = int(snapshot_path.name.split(".")[1])
+            if position is not None and next_seq > position[0]:
+                continue
+            try:
+                if moment is not None and snapshot_path.stat().st_mtime > moment.timestamp():
+                    continue
+                with open(snapshot_path) as f:
+                    snapshot_data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            
+            positions = tuple((name, (segment, offset, None))
+                              for name, (segment, offset) in sorted(snapshot_data["shards"].items()))
+            return snapshot_data["tasks"], snapshot_data["agents"], (next_seq, positions)
+        
+        return {}, {}, self.first_position()
+    
+    def write_views(self, tasks: Dict, agents: Dict, changed_tasks: Optional[Set[str]],
+                    changed_agents: Optional[Set[str]], position: Any,
+                    durability: Durability = Durability.STRICT, flush: bool = False) -> None:
+        """The JSONL views, written with a global snapshot every snapshot_interval events."""
+        next_seq = position[0]
+        checkpoint = next_seq // self.snapshot_interval > self._last_snapshot // self.snapshot_interval
+        super().write_views(tasks, agents, changed_tasks, changed_agents, position, durability,
+                            flush=flush or checkpoint)
+        
+        if checkpoint:
+            self._write_global_snapshot(tasks, agents, position)
+    
+    def compact(self) -> Dict:
+        """
+        Take a global snapshot so replay starts there. Shard segments are not
+        rewritten: task history and resume tokens stay valid.
+        """
+        tasks, agents, position = self.checkpoint_source()
+        if position[0]:
+            self._write_global_snapshot(tasks, agents, position)
+        return {"segments_compacted": 0, "events_before": 0, "events_after": 0, "snapshot": position[0]}
+    
+    def _last_seq(self, name: str) -> int:
+        """Highest sequence number in a shard (numbers rise along each shard)."""
+        shard = self._shard(name)
+        events = shard._unindexed_events()
+        location = shard.index.last_location()
+        if not events and location is not None:
+            events = shard._read_locations([location]) or []
+        return max((event.get("seq", 0) for event in events), default=0)
+    
+    def recover_log(self) -> Dict:
+        """
+        Recover every shard, then move the sequence counter past the highest
+        number on disk (the counter is not fsynced).
+        """
+        start_time = time.perf_counter()
+        report = {"segments_checked": 0, "bytes_checked": 0, "records_valid": 0,
+                  "records_corrupt": 0, "bytes_truncated": 0}
+        names = self._shard_names()
+        checkpointed = {}
+        snapshots = self._snapshot_paths()
+        if snapshots:
+            try:
+                with open(snapshots[0]) as f:
+                    checkpointed = json.load(f)["shards"]
+            except (OSError, ValueError, KeyError):
+                pass
+        
+        for name in names:
+            shard = self._shard(name)
+            # Segments sealed before the global snapshot's position were fsynced
+            shard.checkpointed_segment = checkpointed.get(name, [1])[0] - 1
+            shard_report = shard.recover_log()
+            for key in report:
+                report[key] += shard_report[key]
+        
+        self.sequence.ensure_above(max((self._last_seq(name) for name in names), default=0))
+        report["shards"] = len(names)
+        report["duration_seconds"] = round(time.perf_counter() - start_time, 4)
+        return report
+
+
+class SqliteStorageBackend(StorageBackend):
+    """
+    SQLite backend: events, tasks and agents tables in one WAL-mode database.
+    
+    Locks map onto a single IMMEDIATE transaction per thread, so an operation
+    that holds a lock appends its event and updates the views atomically.
+    The position is the events.seq of the last applied event.
+    """
+    
+    name = "sqlite"
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            timestamp TEXT NOT NULL,
+            type TEXT NOT NULL,
+            task_id TEXT,
+            body TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS events_type ON events (type, seq);
+        CREATE INDEX IF NOT EXISTS events_task ON events (task_id, seq);
+        
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            priority INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            assigned_to TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            body TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS tasks_status_priority ON tasks (status, priority, created_at);
+        CREATE INDEX IF NOT EXISTS tasks_assigned_to ON tasks (assigned_to, status);
+        CREATE INDEX IF NOT EXISTS tasks_type ON tasks (type);
+        
+        CREATE TABLE IF NOT EXISTS agents (
+            id TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            status TEXT NOT NULL,
+            last_heartbeat TEXT,
+            body TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS agents_type ON agents (type, status);
+        
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+    
+    def __init__(self, orchestration_path: Path):
+        self.orchestration_path = Path(orchestration_path)
+        self.database_path = self.orchestration_path / "coordination.db"
+        
+        # One connection (and transaction depth) per thread
+        self._local = threading.local()
+        
+        self.orchestration_path.mkdir(parents=True, exist_ok=True)
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(self.SCHEMA)
+        os.chmod(self.database_path, 0o600)
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Thread-local connection in autocommit mode; transactions are explicit."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(str(self.database_path), timeout=10,
+                                         isolation_level=None)
+            self._local.connection = connection
+            self._local.depth = 0
+        return connection
+    
+    # ==================== LOCKING ====================
+    
+    # synchronous level per durability; BATCHED relies on WAL checkpoints to sync
+    SYNCHRONOUS = {
+        Durability.STRICT: "FULL",
+        Durability.BATCHED: "NORMAL",
+        Durability.VOLATILE: "OFF",
+    }
+    
+    def acquire_lock(self, lock_name: str, timeout: int = 10,
+                     durability: Durability = Durability.STRICT) -> bool:
+        """
+        Open (or join) this thread's write transaction.
+        
+        SQLite has a single writer, so every lock name maps onto the same
+        database lock; the busy timeout replaces polling. The durability of
+        the outermost lock applies to the whole transaction.
+        """
+        connection = self._connection()
+        if self._local.depth == 0:
+            connection.execute(f"PRAGMA synchronous={self.SYNCHRONOUS[durability]}")
+            connection.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError:
+                return False  # Database locked for longer than timeout
+        self._local.depth += 1
+        return True
+    
+    def release_lock(self, lock_name: str) -> None:
+        """Leave the write transaction, committing when the outermost lock is released."""
+        if getattr(self._local, "depth", 0) == 0:
+            return
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            self._connection().execute("COMMIT")
+    
+    @contextmanager
+    def views_transaction(self, durability: Durability = Durability.STRICT):
+        """Hold the write transaction around the caller's view update."""
+        if not self.acquire_lock("views", durability=durability):
+            raise Exception("Failed to acquire database lock")
+        try:
+            yield
+        finally:
+            self.release_lock("views")
+    
+    # ==================== EVENT LOG ====================
+    
+    def append_event(self, event: Dict, durability: Durability = Durability.STRICT) -> None:
+        """Insert the event; committed with the enclosing transaction, if any."""
+        if not self.acquire_lock("event_log", durability=durability):
+            raise Exception("Failed to acquire event log lock")
+        
+        try:
+            self._connection().execute(
+                "INSERT OR IGNORE INTO events (id, timestamp, type, task_id, body) VALUES (?, ?, ?, ?, ?)",
+                (event["id"], event["timestamp"], event["type"], event_task_id(event),
+                 json.dumps(event, default=str))
+            )
+        finally:
+            self.release_lock("event_log")
+    
+    def load_checkpoint(self) -> Tuple[Dict, Dict, Any]:
+        """The tasks and agents tables are the checkpoint; meta records their position."""
+        connection = self._connection()
+        tasks = {row[0]: json.loads(row[1]) for row in connection.execute("SELECT id, body FROM tasks")}
+        agents = {row[0]: json.loads(row[1]) for row in connection.execute("SELECT id, body FROM agents")}
+        row = connection.execute("SELECT value FROM meta WHERE key = 'position'").fetchone()
+        return tasks, agents, int(row[0]) if row else 0
+    
+    def first_position(self) -> int:
+        """Position before the first event."""
+        return 0
+    
+    def end_position(self) -> int:
+        row = self._connection().execute("SELECT max(seq) FROM events").fetchone()
+        return row[0] or 0
+    
+    def position_token(self, position: Any, event_id: Optional[str]) -> str:
+        """Token "seq:event_id"; seq values survive compaction."""
+        return f"{position}:{event_id or ''}"
+    
+    def token_position(self, token: str) -> Tuple[Any, Optional[str]]:
+        try:
+            seq, event_id = token.split(":", 1)
+            return int(seq), event_id or None
+        except ValueError:
+            raise ValueError(f"Invalid resume token: {token!r}")
+    
+    def relocate(self, event_id: str) -> int:
+        row = self._connection().execute("SELECT seq FROM events WHERE id = ?", (event_id,)).fetchone()
+        if row is None:
+            raise LogPositionLost(f"event {event_id} is no longer in the log")
+        return row[0] - 1
+    
+    def watch_paths(self) -> List[Tuple[Path, List[str]]]:
+        """Commits land in the WAL file (or the database after a checkpoint)."""
+        return [(self.orchestration_path, [self.database_path.name, self.database_path.name + "-wal"])]
+    
+    def read_events(self, position: Any) -> Iterator[Tuple[Optional[Dict], Any]]:
+        """Yield events with seq greater than position, in order."""
+        connection = self._connection()
+        row = connection.execute("SELECT max(seq) FROM events").fetchone()
+        if position > (row[0] or 0):
+            raise LogPositionLost("database has fewer events than the saved position")
+        
+        for seq, body in connection.execute(
+                "SELECT seq, body FROM events WHERE seq > ? ORDER BY seq", (position,)):
+            yield json.loads(body), seq
+    
+    def recover_log(self) -> Dict:
+        """
+        SQLite rolls back torn transactions itself when the database is
+        opened; this only reports how many events follow the checkpoint.
+        """
+        start_time = time.perf_counter()
+        connection = self._connection()
+        row = connection.execute("SELECT value FROM meta WHERE key = 'position'").fetchone()
+        records = connection.execute("SELECT count(*) FROM events WHERE seq > ?",
+                                     (int(row[0]) if row else 0,)).fetchone()[0]
+        return {"segments_checked": 0, "bytes_checked": 0, "records_valid": records,
+                "records_corrupt": 0, "bytes_truncated": 0,
+                "duration_seconds": round(time.perf_counter() - start_time, 4)}
+    
+    def task_history(self, task_id: str) -> List[Dict]:
+        """Every event concerning task_id, oldest first (events_task index)."""
+        return [json.loads(row[0]) for row in self._connection().execute(
+            "SELECT body FROM events WHERE task_id = ? ORDER BY seq", (task_id,))]
+    
+    def get_event(self, event_id: str) -> Optional[Dict]:
+        """A single event by id (unique index on events.id)."""
+        row = self._connection().execute("SELECT body FROM events WHERE id = ?", (event_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def rebuild_index(self) -> int:
+        """Rebuild the events indexes."""
+        connection = self._connection()
+        connection.execute("REINDEX events")
+        return connection.execute("SELECT count(*) FROM events").fetchone()[0]
+    
+    # ==================== DERIVED VIEWS ====================
+    
+    def write_views(self, tasks: Dict, agents: Dict, changed_tasks: Optional[Set[str]],
+                    changed_agents: Optional[Set[str]], position: Any,
+                    durability: Durability = Durability.STRICT, flush: bool = False) -> None:
+        """Upsert the changed rows and the position in one transaction (never deferred)."""
+        if not self.acquire_lock("views", durability=durability):
+            raise Exception("Failed to acquire database lock")
+        
+        try:
+            connection = self._connection()
+            
+            if changed_tasks is None:
+                connection.execute("DELETE FROM tasks")
+                changed_tasks = tasks.keys()
+            for task_id in changed_tasks:
+                task = tasks.get(task_id)
+                if task is None:
+                    connection.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+                    continue
+                connection.execute(
+                    "INSERT OR REPLACE INTO tasks (id, type, priority, status, assigned_to, "
+                    "created_at, updated_at, body) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (task_id, task["type"], task["priority"], task["status"], task.get("assigned_to"),
+                     task["created_at"], task["updated_at"], json.dumps(task, default=str))
+                )
+            
+            if changed_agents is None:
+                connection.execute("DELETE FROM agents")
+                changed_agents = agents.keys()
+            for agent_id in changed_agents:
+                agent = agents.get(agent_id)
+                if agent is None:
+                    connection.execute("DELETE FROM agents WHERE id = ?", (agent_id,))
+                    continue
+                connection.execute(
+                    "INSERT OR REPLACE INTO agents (id, type, status, last_heartbeat, body) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (agent_id, agent["type"], agent["status"], agent.get("last_heartbeat"),
+                     json.dumps(agent, default=str))
+                )
+            
+            connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('position', ?)",
+                               (str(position),))
+        finally:
+            self.release_lock("views")
+    
+    def check_health(self) -> bool:
+        """Check that the database answers queries."""
+        try:
+            self._connection().execute("SELECT 1 FROM meta LIMIT 1").fetchall()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    # ==================== COMPACTION ====================
+    
+    def compact(self) -> Dict:
+        """
+        Delete heartbeats already folded into the tables. Status updates
+        stay, since claims replay against the versions they count.
+        """
+        if not self.acquire_lock("event_log"):
+            raise Exception("Failed to acquire database lock")
+        
+        try:
+            connection = self._connection()
+            row = connection.execute("SELECT value FROM meta WHERE key = 'position'").fetchone()
+            covered = int(row[0]) if row else 0
+            events_before = connection.execute("SELECT count(*) FROM events").fetchone()[0]
+            
+            connection.execute("DELETE FROM events WHERE seq <= ? AND type = 'agent_heartbeat'",
+                               (covered,))
+            
+            events_after = connection.execute("SELECT count(*) FROM events").fetchone()[0]
+        finally:
+            self.release_lock("event_log")
+        
+        return {
+            "segments_compacted": 0,
+            "events_before": events_before,
+            "events_after": events_after,
+            "position": covered
+        }
+
+
+BACKENDS = {
+    JsonlStorageBackend.name: JsonlStorageBackend,
+    BinaryStorageBackend.name: BinaryStorageBackend,
+    ShardedStorageBackend.name: ShardedStorageBackend,
+    SqliteStorageBackend.name: SqliteStorageBackend,
+}
+
+
+def configured_backend(orchestration_path: Path) -> str:
+    """Backend recorded in storage.json, defaulting to the JSONL files."""
+    try:
+        with open(Path(orchestration_path) / "storage.json") as f:
+            return json.load(f)["backend"]
+    except (OSError, ValueError, KeyError):
+        return JsonlStorageBackend.name
+
+
+def migrate_event_log(coordination_path: str, backend: str = "sqlite",
+                      shard_for: Optional[Callable[[Dict], str]] = None) -> Dict:
+    """
+    Import the JSONL event log (all segments) into the SQLite, binary or
+    sharded backend.
+    
+    SQLite inserts events by id, and the binary backend rewrites each segment
+    under its original number (so snapshots stay valid); either way the
+    import can be re-run safely. The sharded backend numbers the events in
+    log order into the shards the protocol uses at runtime (shard_for
+    defaults to CoordinationProtocol.import_shard_router()) and refuses to
+    import into a log that already has events. The caller is expected to
+    stop the orchestrator and agents first.
+    """
+    orchestration_path = Path(coordination_path) / "orchestration"
+    source = JsonlStorageBackend(orchestration_path, checkpoint_source=lambda: ({}, {}, (0, 0, None)))
+    
+    imported = 0
+    if backend == BinaryStorageBackend.name:
+        target = BinaryStorageBackend(orchestration_path, checkpoint_source=source.checkpoint_source)
+        location = target.event_log_path
+        
+        if not source.acquire_lock("event_log"):
+            raise Exception("Failed to acquire event log lock")
+        try:
+            for number in source._sealed_segment_numbers():
+                imported += convert_file(source._segment_path(number), target._segment_path(number),
+                                         to_binary=True)
+            imported += convert_file(source.event_log_path, target.event_log_path, to_binary=True)
+        finally:
+            source.release_lock("event_log")
+        
+        target.rebuild_index()
+    
+    elif backend == SqliteStorageBackend.name:
+        target = SqliteStorageBackend(orchestration_path)
+        location = target.database_path
+        
+        if not target.acquire_lock("migration"):
+            raise Exception("Failed to acquire database lock")
+        try:
+            for event, _ in source.read_events(source.first_position()):
+                if event is not None:
+                    target.append_event(event)
+                    imported += 1
+        finally:
+            target.release_lock("migration")
+    
+    elif backend == ShardedStorageBackend.name:
+        from coordination_protocol import CoordinationProtocol  # It imports this module
+        target = ShardedStorageBackend(orchestration_path,
+                                       checkpoint_source=lambda: ({}, {}, target.first_position()),
+                                       shard_for=shard_for or CoordinationProtocol.import_shard_router(),
+                                       shards=CoordinationProtocol.SHARDS)
+        location = target.shards_path
+        if target.sequence.peek() > 1:
+            raise Exception(f"{location} already holds events; not importing twice")
+        
+        if not source.acquire_lock("event_log"):
+            raise Exception("Failed to acquire event log lock")
+        try:
+            for event, _ in source.read_events(source.first_position()):
+                if event is not None:
+                    target.append_event(event, Durability.BATCHED)
+                    imported += 1
+        finally:
+            source.release_lock("event_log")
+        
+        for name in target._shard_names():
+            target._shard(name)._timed_fsync()
+    
+    else:
+        raise ValueError(f"Cannot migrate to storage backend: {backend}")
+    
+    atomic_write_json(orchestration_path / "storage.json", {
+        "backend": backend,
+        "migrated_at": datetime.now(timezone.utc).isoformat(),
+        "events_imported": imported
+    })
+    
+    return {"events_imported": imported, "location": str(location)}
+
+
+def main():
+    """Command-line entry point for storage maintenance."""
+    parser = argparse.ArgumentParser(description="Coordination storage tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    migrate = subparsers.add_parser("migrate", help="Import event-log.jsonl into another backend")
+    migrate.add_argument("--coordination-path", default="/Users/michaelmishayev/Desktop/Projects/school_2/coordination",
+                         help="Coordination directory containing orchestration/")
+    migrate.add_argument("--backend", choices=[SqliteStorageBackend.name, BinaryStorageBackend.name,
+                                                  ShardedStorageBackend.name],
+                         default=SqliteStorageBackend.name, help="Backend to migrate to")
+    
+    args = parser.parse_args()
+    
+    if args.command == "migrate":
+        stats = migrate_event_log(args.coordination_path, args.backend)
+        print(f"✅ Imported {stats['events_imported']} events into {stats['location']}")
+        print("   Derived state is rebuilt from the imported events on first use "
+              "(or run: repair-coordination.sh --repair-files)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Binary Event Codec
+
+Compact, length-prefixed binary encoding of coordination events, used by the
+"binary" storage backend in place of one JSON object per line.
+
+Record layout (little-endian):
+  header: format version (u8), body length (u32), CRC32 of body (u32)
+  body:   event type code (u8), then a per-type payload; a code with the
+          high bit set is followed by the event's global "seq" (i64), as
+          written by the sharded backend
+
+Each known event type has a fixed schema: ids are stored as 16 raw UUID
+bytes, event types and task statuses as interned one-byte codes, integers
+packed, and strings in one UTF-8 tail; only nested values (results,
+dependency lists) remain JSON. Any event that does not fit its schema
+exactly is stored whole as JSON under type code 0, so decoding always
+returns the event that was encoded.
+
+JSONL logs get a per-record checksum too: each line ends with a "crc" key
+holding the CRC32 of the line without it, so a line stays plain JSON for
+other tools while torn or damaged lines can be told apart from good ones.
+
+Usage:
+  python3 event_codec.py encode event-log.jsonl event-log.bin
+  python3 event_codec.py decode event-log.bin -          # JSONL to stdout
+  python3 event_codec.py benchmark --events 20000
+"""
+
+import argparse
+import gc
+import json
+import os
+import re
+import struct
+import sys
+import tempfile
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+FORMAT_VERSION = 1
+RECORD_HEADER = struct.Struct("<BII")
+
+# Interned codes. Append-only: a code, once written to a log, keeps its meaning.
+EVENT_TYPES = ["task_created", "task_assigned", "task_updated",
+               "agent_registered", "agent_heartbeat", "agent_deregistered", "task_claimed",
+               "tasks_archived", "autoscaler_decision", "sequence_skipped"]
+TASK_STATUSES = ["pending", "assigned", "in_progress", "completed", "failed", "cancelled"]  # TaskStatus values
+
+RAW_JSON = 0
+SEQUENCED = 0x80  # Type code flag: a packed seq follows the code
+_SEQ = struct.Struct("<q")
+_EVENT_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES, 1)}
+_STATUS_CODES = {status: code for code, status in enumerate(TASK_STATUSES)}
+
+# Reused encoder/scanner: json.dumps with options builds a new encoder per call
+_dump_json = json.JSONEncoder(separators=(",", ":"), default=str).encode
+_scan_json = json.JSONDecoder().scan_once
+_ABSENT = 0xFFFFFFFF  # String length marking None (or a missing optional key)
+_UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+class CorruptRecord(Exception):
+    """A complete record failed its CRC or has an unknown format version."""
+
+
+def _uuid_string(raw: bytes) -> str:
+    h = raw.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _uuid_bytes(value) -> Optional[bytes]:
+    """16 raw bytes for a canonical (lowercase, hyphenated) UUID string, else None."""
+    if not isinstance(value, str) or not _UUID_PATTERN.fullmatch(value):
+        return None
+    return bytes.fromhex(value.replace("-", ""))
+
+
+# Field kinds. Fixed-size fields live in the record's struct; strings and
+# JSON values are concatenated into one UTF-8 tail, with their lengths (in
+# characters) in the struct, so the tail is decoded once per record.
+UUID, STATUS, INT, STR, JSON, OPTIONAL_JSON = range(6)
+_KIND_FORMATS = {UUID: "16s", STATUS: "B", INT: "q", STR: "I", JSON: "I", OPTIONAL_JSON: "I"}
+
+
+class _EventSchema:
+    """Compact layout of one event type: type code, event id, timestamp, then data fields."""
+    
+    def __init__(self, code: int, fields: List[Tuple[str, int]]):
+        self.code = code
+        self.fields = fields
+        self.struct = struct.Struct("<B16sI" + "".join(_KIND_FORMATS[kind] for _, kind in fields))
+    
+    def encode(self, event_id: bytes, timestamp: str, data: Dict) -> Optional[bytes]:
+        """Body for the event, or None if data does not have exactly this shape."""
+        values = [self.code, event_id, len(timestamp)]
+        texts = [timestamp]
+        present = 0
+        
+        for name, kind in self.fields:
+            if name not in data:
+                if kind != OPTIONAL_JSON:
+                    return None
+                values.append(_ABSENT)
+                continue
+            
+            present += 1
+            value = data[name]
+            if kind == UUID:
+                value = _uuid_bytes(value)
+                if value is None:
+                    return None
+            elif kind == STATUS:
+                value = _STATUS_CODES.get(value) if isinstance(value, str) else None
+                if value is None:
+                    return None
+            elif kind == INT:
+                if type(value) is not int or not -2 ** 63 <= value < 2 ** 63:
+                    return None
+            elif kind == STR:
+                if value is None:
+                    value = _ABSENT
+                elif not isinstance(value, str):
+                    return None
+                else:
+                    texts.append(value)
+                    value = len(value)
+            else:
+                if value is None and kind == OPTIONAL_JSON:
+                    return None  # Would decode as a missing key
+                text = "null" if value is None else "[]" if value == [] else _dump_json(value)
+                texts.append(text)
+                value = len(text)
+            values.append(value)
+        
+        if present != len(data):
+            return None  # Unknown keys
+        
+        try:
+            return self.struct.pack(*values) + "".join(texts).encode()
+        except (struct.error, UnicodeEncodeError):
+            return None  # Oversized string or lone surrogate
+    
+    def decode(self, body: bytes) -> Tuple[str, str, Dict]:
+        """(event id, timestamp, data) from a body written by encode()."""
+        values = self.struct.unpack_from(body)
+        text = body[self.struct.size:].decode()
+        position = values[2]
+        
+        data = {}
+        for (name, kind), value in zip(self.fields, values[3:]):
+            if kind == UUID:
+                data[name] = _uuid_string(value)
+            elif kind == STATUS:
+                data[name] = TASK_STATUSES[value]
+            elif kind == INT:
+                data[name] = value
+            elif value == _ABSENT:
+                if kind == STR:
+                    data[name] = None
+            else:
+                end = position + value
+                value = text[position:end]
+                position = end
+                if kind != STR:
+                    # Skip the parser for the values nearly every task carries
+                    value = None if value == "null" else [] if value == "[]" else _scan_json(value, 0)[0]
+                data[name] = value
+        
+        return _uuid_string(values[1]), text[:values[2]], data
+
+
+# Field order follows the protocol, so converted JSONL matches the original
+_SCHEMAS = {
+    "task_created": [("id", UUID), ("type", STR), ("priority", INT), ("assigned_to", STR),
+                     ("status", STATUS), ("created_at", STR), ("updated_at", STR),
+                     ("description", STR), ("context", STR), ("dependencies", JSON),
+                     ("result", JSON)],
+    "task_assigned": [("task_id", UUID), ("agent_id", STR), ("timestamp", STR)],
+    "task_updated": [("task_id", UUID), ("status", STATUS), ("timestamp", STR),
+                     ("agent_id", STR), ("result", OPTIONAL_JSON)],
+    "agent_registered": [("id", STR), ("type", STR), ("pid", INT), ("status", STR),
+                         ("last_heartbeat", STR), ("current_task", STR),
+                         ("tasks_completed", INT), ("tasks_failed", INT)],
+    "agent_heartbeat": [("agent_id", STR), ("timestamp", STR), ("current_task", STR)],
+    "agent_deregistered": [("agent_id", STR), ("timestamp", STR)],
+    "task_claimed": [("task_id", UUID), ("agent_id", STR), ("timestamp", STR),
+                     ("expected_version", INT)],
+    "tasks_archived": [("tasks", JSON), ("timestamp", STR)],
+    # Retirements log no backlog figures, hence the optional fields
+    "autoscaler_decision": [("agent_type", STR), ("action", STR), ("count", INT), ("reason", STR),
+                            ("backlog", OPTIONAL_JSON), ("current_agents", OPTIONAL_JSON),
+                            ("desired_agents", OPTIONAL_JSON), ("warm_target", OPTIONAL_JSON),
+                            ("retire", JSON), ("timestamp", STR)],
+    "sequence_skipped": [("through", INT)],
+}
+_ENCODERS = {event_type: _EventSchema(_EVENT_CODES[event_type], fields)
+             for event_type, fields in _SCHEMAS.items()}
+_DECODERS = {schema.code: (event_type, schema) for event_type, schema in _ENCODERS.items()}
+
+
+# ==================== RECORDS ====================
+
+def _encode_body(event: Dict) -> bytes:
+    """Compact body for event, falling back to the whole event as JSON."""
+    schema = _ENCODERS.get(event.get("type"))
+    seq = event.get("seq")
+    sequenced = "seq" in event and type(seq) is int and -2 ** 63 <= seq < 2 ** 63
+    if (schema is not None and len(event) == 4 + sequenced and isinstance(event.get("data"), dict)
+            and isinstance(event.get("timestamp"), str)):
+        event_id = _uuid_bytes(event.get("id"))
+        if event_id is not None:
+            body = schema.encode(event_id, event["timestamp"], event["data"])
+            if body is not None:
+                if sequenced:
+                    body = bytes([body[0] | SEQUENCED]) + _SEQ.pack(seq) + body[1:]
+                return body
+    
+    return bytes([RAW_JSON]) + _dump_json(event).encode()
+
+
+def _decode_body(body: bytes) -> Dict:
+    if body[0] == RAW_JSON:
+        return json.loads(body[1:])
+    
+    seq = None
+    if body[0] & SEQUENCED:
+        seq = _SEQ.unpack_from(body, 1)[0]
+        body = bytes([body[0] & ~SEQUENCED]) + body[1 + _SEQ.size:]
+    
+    event_type, schema = _DECODERS[body[0]]
+    event_id, timestamp, data = schema.decode(body)
+    event = {"id": event_id, "timestamp": timestamp, "type": event_type, "data": data}
+    if seq is not None:
+        event["seq"] = seq
+    return event
+
+
+def encode_event(event: Dict) -> bytes:
+    """Encode one event as a complete record (header + body)."""
+    body = _encode_body(event)
+    return RECORD_HEADER.pack(FORMAT_VERSION, len(body), zlib.crc32(body)) + body
+
+
+def decode_records(chunk: bytes, start: int = 0) -> Iterator[Tuple[Dict, int]]:
+    """
+    Yield (event, offset_after_record) for every complete record in chunk.
+    
+    A truncated record at the end (still being appended) ends the iteration;
+    a complete record that fails its CRC raises CorruptRecord.
+    """
+    offset = start
+    header_size = RECORD_HEADER.size
+    end = len(chunk)
+    while offset + header_size <= end:
+        version, length, crc = RECORD_HEADER.unpack_from(chunk, offset)
+        body_end = offset + header_size + length
+        if body_end > end:
+            return
+        
+        body = chunk[offset + header_size:body_end]
+        if version != FORMAT_VERSION:
+            raise CorruptRecord(f"unsupported event format version {version} at offset {offset}")
+        if zlib.crc32(body) != crc:
+            raise CorruptRecord(f"CRC mismatch at offset {offset}")
+        
+        yield _decode_body(body), body_end
+        offset = body_end
+
+
+# ==================== JSON LINES ====================
+
+_CRC_KEY = b', "crc": "'
+_CRC_SUFFIX_LENGTH = len(_CRC_KEY) + 8 + 2  # key, 8 hex digits, closing '"}'
+
+
+def encode_json_line(event: Dict) -> bytes:
+    """One event as a JSONL record whose last key is the CRC32 of the rest."""
+    body = json.dumps(event, default=str).encode()
+    return b'%s%s%08x"}\n' % (body[:-1], _CRC_KEY, zlib.crc32(body))
+
+
+def decode_json_line(line: bytes) -> Optional[Dict]:
+    """
+    Parse one complete JSONL record. Returns None if it fails its checksum
+    or is not JSON. Lines written before checksums are accepted unchecked.
+    """
+    body = line.rstrip(b'\n')
+    marker = len(body) - _CRC_SUFFIX_LENGTH
+    if marker > 0 and body.endswith(b'"}') and body[marker:marker + len(_CRC_KEY)] == _CRC_KEY:
+        checksum = body[marker + len(_CRC_KEY):-2]
+        body = body[:marker] + b'}'
+        try:
+            if zlib.crc32(body) != int(checksum, 16):
+                return None
+        except ValueError:
+            return None
+    
+    try:
+        event = json.loads(body)
+    except ValueError:
+        return None
+    return event if isinstance(event, dict) else None
+
+
+# ==================== CONVERSION ====================
+
+def _read_jsonl(path: Path) -> Iterator[Dict]:
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                event = decode_json_line(line)
+                if event is None:
+                    raise CorruptRecord(f"corrupt JSONL record in {path}")
+                yield event
+
+
+def _read_binary(path: Path) -> Iterator[Dict]:
+    with open(path, 'rb') as f:
+        for event, _ in decode_records(f.read()):
+            yield event
+
+
+def convert_file(source: Path, target: Path, to_binary: bool) -> int:
+    """
+    Convert an event log between JSONL and binary records.
+    
+    The target is written to a temp file and renamed into place. target may
+    be "-" to write to stdout. Returns the number of events converted.
+    """
+    events = _read_jsonl(Path(source)) if to_binary else _read_binary(Path(source))
+    encode = encode_event if to_binary else encode_json_line
+    
+    if str(target) == "-":
+        count = 0
+        for event in events:
+            sys.stdout.buffer.write(encode(event))
+            count += 1
+        sys.stdout.buffer.flush()
+        return count
+    
+    target = Path(target)
+    temp_path = target.with_suffix(f".tmp.{uuid.uuid4().hex}")
+    count = 0
+    try:
+        with open(temp_path, 'wb') as f:
+            for event in events:
+                f.write(encode(event))
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        temp_path.replace(target)
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+    return count
+
+
+# ==================== BENCHMARK ====================
+
+def _sample_events(count: int) -> List[Dict]:
+    """A log shaped like real traffic: each task is created, assigned and updated twice."""
+    from datetime import datetime, timezone
+    
+    events = []
+    task_id = None
+    for i in range(count):
+        now = datetime.now(timezone.utc).isoformat()
+        phase = i % 4
+        if phase == 0:
+            task_id = str(uuid.uuid4())
+            event_type = "task_created"
+            data = {"id": task_id, "type": "search", "description": f"Benchmark task {i}",
+                    "priority": 2, "status": "pending", "assigned_to": None, "created_at": now,
+                    "updated_at": now, "context": None, "dependencies": [], "result": None}
+        elif phase == 1:
+            event_type = "task_claimed"
+            data = {"task_id": task_id, "agent_id": "blue-agent-1", "timestamp": now,
+                    "expected_version": 1}
+        else:
+            event_type = "task_updated"
+            data = {"task_id": task_id, "status": "in_progress" if phase == 2 else "completed",
+                    "timestamp": now, "agent_id": "blue-agent-1"}
+            if phase == 3:
+                data["result"] = {"summary": "done"}
+        events.append({"id": str(uuid.uuid4()), "timestamp": now, "type": event_type, "data": data})
+    return events
+
+
+def benchmark(count: int = 20000, rounds: int = 3) -> Dict:
+    """
+    Compare append (encode + write, fsync per 100 events) and replay
+    (read + decode) throughput of JSONL and binary logs, best of rounds.
+    Garbage collection is paused while timing, as with timeit.
+    """
+    events = _sample_events(count)
+    formats = {
+        "jsonl": (encode_json_line,
+                  lambda data: [decode_json_line(line) for line in data.splitlines() if line.strip()]),
+        "binary": (encode_event,
+                   lambda data: [event for event, _ in decode_records(data)]),
+    }
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, (encode, replay) in formats.items():
+            path = Path(temp_dir) / f"bench.{name}"
+            append_duration = replay_duration = float("inf")
+            
+            for _ in range(rounds):
+                path.unlink(missing_ok=True)
+                gc.disable()
+                try:
+                    start_time = time.perf_counter()
+                    with open(path, 'ab') as f:
+                        for start in range(0, count, 100):
+                            f.write(b"".join(encode(event) for event in events[start:start + 100]))
+                            f.flush()
+                            os.fsync(f.fileno())
+                    append_duration = min(append_duration, time.perf_counter() - start_time)
+                    
+                    start_time = time.perf_counter()
+                    with open(path, 'rb') as f:
+                        replayed = replay(f.read())
+                    replay_duration = min(replay_duration, time.perf_counter() - start_time)
+                finally:
+                    gc.enable()
+                
+                if replayed != events:
+                    raise Exception(f"{name} round trip changed the events")
+            
+            results[name] = {
+                "bytes": path.stat().st_size,
+                "append_events_per_second": count / append_duration,
+                "replay_events_per_second": count / replay_duration
+            }
+    
+    return results
+
+
+def main():
+    """Command-line entry point for converting and benchmarking event logs."""
+    parser = argparse.ArgumentParser(description="Binary event log tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    encode = subparsers.add_parser("encode", help="Convert a JSONL event log to binary records")
+    encode.add_argument("source")
+    encode.add_argument("target")
+    
+    decode = subparsers.add_parser("decode", help="Convert binary records to JSONL ('-' for stdout)")
+    decode.add_argument("source")
+    decode.add_argument("target", nargs="?", default="-")
+    
+    bench = subparsers.add_parser("benchmark", help="Compare JSONL and binary append/replay speed")
+    bench.add_argument("--events", type=int, default=20000)
+    
+    args = parser.parse_args()
+    
+    if args.command in ("encode", "decode"):
+        count = convert_file(args.source, args.target, to_binary=args.command == "encode")
+        if args.target != "-":
+            print(f"✅ Converted {count} events: {args.source} -> {args.target}")
+    
+    elif args.command == "benchmark":
+        results = benchmark(args.events)
+        for name, stats in results.items():
+            print(f"📊 {name:6s}  {stats['bytes']:>10,d} bytes  "
+                  f"append {stats['append_events_per_second']:>9,.0f} ev/s  "
+                  f"replay {stats['replay_events_per_second']:>9,.0f} ev/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Event Log Offset Index
+
+Sidecar index for the segmented event log: one fixed-size entry per event
+giving the segment, byte offset and length of its record, keyed by the
+event id and by the id of the task it concerns. Lookups return locations,
+so a task's history is read by slicing just those records out of the
+mapped segments instead of parsing the whole log.
+
+Layout (little-endian):
+  header: magic, version
+  entry:  event key, task key, segment, offset, length
+
+Keys are 16-byte BLAKE2b digests, so any id string can be indexed; callers
+check the decoded event, which makes a collision harmless. Entries are
+appended under the event_log lock right after the log write, in log
+order, so the last entry tells how far the log is indexed without loading
+the rest. After a crash the index can lag the log; the backend indexes the
+missing tail before its next append. Compaction moves records, so it rebuilds the index
+into a new file, and readers notice the new inode and reload.
+"""
+
+import hashlib
+import os
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b"EVTINDEX"
+VERSION = 1
+HEADER = struct.Struct("<8sI")
+ENTRY = struct.Struct("<16s16sIQI")
+NO_TASK = bytes(16)
+
+Location = Tuple[int, int, int]  # (segment, offset, length)
+
+
+def index_key(value: str) -> bytes:
+    """16-byte lookup key for an event or task id."""
+    return hashlib.blake2b(value.encode(), digest_size=16).digest()
+
+
+def event_task_id(event: Dict) -> Optional[str]:
+    """Id of the task an event concerns, or None for agent events."""
+    data = event["data"]
+    return data.get("task_id") or (data.get("id") if event["type"] == "task_created" else None)
+
+
+class EventIndex:
+    """
+    Offset index over the event log segments, loaded incrementally.
+    
+    CRITICAL: append() and rebuild() must be called with the event_log lock
+    held; lookups only need refresh() first.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+        self._inode: Optional[int] = None
+        self._reset()
+    
+    def _reset(self) -> None:
+        self._read_offset = HEADER.size
+        self._by_event: Dict[bytes, Location] = {}
+        self._by_task: Dict[bytes, List[Location]] = {}
+    
+    def exists(self) -> bool:
+        return self.path.exists()
+    
+    def _open(self) -> bool:
+        """Open the current index file if it changed since the last call; False if missing."""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+        
+        if inode != self._inode:
+            if self._fd is not None:
+                os.close(self._fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+            self._inode = os.fstat(self._fd).st_ino
+            self._reset()
+            
+            magic, version = HEADER.unpack(os.pread(self._fd, HEADER.size, 0))
+            if magic != MAGIC or version != VERSION:
+                raise Exception(f"Not an event index: {self.path}")
+        return True
+    
+    def _add(self, event_key: bytes, task_key: bytes, segment: int, offset: int, length: int) -> None:
+        location = (segment, offset, length)
+        self._by_event[event_key] = location
+        if task_key != NO_TASK:
+            self._by_task.setdefault(task_key, []).append(location)
+    
+    def refresh(self) -> None:
+        """Load entries appended (or a rebuilt file written) since the last call."""
+        with self._lock:
+            if not self._open():
+                self._inode = None
+                self._reset()
+                return
+            
+            size = os.fstat(self._fd).st_size
+            complete = (size - self._read_offset) // ENTRY.size * ENTRY.size
+            if complete > 0:
+                for entry in ENTRY.iter_unpack(os.pread(self._fd, complete, self._read_offset)):
+                    self._add(*entry)
+                self._read_offset += complete
+    
+    @staticmethod
+    def _pack(entries: Iterable[Tuple[str, Optional[str], int, int, int]]) -> bytes:
+        return b"".join(ENTRY.pack(index_key(event_id), index_key(task_id) if task_id else NO_TASK,
+                                   segment, offset, length)
+                        for event_id, task_id, segment, offset, length in entries)
+    
+    def append(self, entries: List[Tuple[str, Optional[str], int, int, int]]) -> None:
+        """Append (event_id, task_id, segment, offset, length) entries for new records."""
+        if not entries:
+            return
+        
+        with self._lock:
+            if not self._open():
+                raise Exception(f"Event index missing: {self.path}")
+            
+            # A torn entry from a crashed writer would misalign everything after it
+            size = os.fstat(self._fd).st_size
+            aligned = HEADER.size + (size - HEADER.size) // ENTRY.size * ENTRY.size
+            if aligned != size:
+                os.ftruncate(self._fd, aligned)
+            
+            os.write(self._fd, self._pack(entries))
+    
+    def rebuild(self, entries: Iterable[Tuple[str, Optional[str], int, int, int]]) -> int:
+        """Replace the index with the given entries. Returns the number written."""
+        count = 0
+        temp_path = self.path.with_suffix(f".tmp.{os.getpid()}.{threading.get_ident()}")
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION))
+                for entry in entries:
+                    f.write(self._pack([entry]))
+                    count += 1
+            os.chmod(temp_path, 0o600)
+            temp_path.replace(self.path)
+        finally:
+            temp_path.unlink(missing_ok=True)
+        
+        return count
+    
+    def last_location(self) -> Optional[Location]:
+        """Location of the last indexed record, read without loading the index."""
+        with self._lock:
+            if not self._open():
+                return None
+            
+            count = (os.fstat(self._fd).st_size - HEADER.size) // ENTRY.size
+            if count <= 0:
+                return None
+            _, _, segment, offset, length = ENTRY.unpack(
+                os.pread(self._fd, ENTRY.size, HEADER.size + (count - 1) * ENTRY.size))
+        return (segment, offset, length)
+    
+    def indexed_end(self, segment: int) -> int:
+        """
+        Byte offset up to which a segment is indexed, read from the last
+        entry alone. Segments before the last indexed one count as fully
+        indexed (sys.maxsize).
+        """
+        last = self.last_location()
+        if last is None:
+            return 0
+        
+        last_segment, offset, length = last
+        if last_segment == segment:
+            return offset + length
+        return 0 if last_segment < segment else sys.maxsize
+    
+    def locate_event(self, event_id: str) -> Optional[Location]:
+        return self._by_event.get(index_key(event_id))
+    
+    def locate_task(self, task_id: str) -> List[Location]:
+        """Locations of every indexed event concerning task_id, in log order."""
+        return sorted(self._by_task.get(index_key(task_id), []))
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+                self._inode = None
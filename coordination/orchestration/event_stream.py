@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Coordination Event Stream
+
+Follows the event log as it grows, so consumers react to new events within
+milliseconds instead of on a polling interval:
+
+- LogWatcher: wakes a waiter when the log files change (inotify on Linux,
+  stat polling elsewhere)
+- Subscription: iterator and async iterator over new events, with resume
+  tokens for restarting without missing or re-reading events
+
+A resume token names the position after an event plus that event's id.
+If compaction rewrote the segment the position points into, the id is
+looked up again (offset index / SQLite) to continue right after it.
+
+Usage:
+  python3 event_stream.py --coordination-path /path/to/coordination
+  python3 event_stream.py --types task_created,task_updated --from earliest
+"""
+
+import argparse
+import asyncio
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from coordination_storage import BACKENDS, JsonlStorageBackend, LogPositionLost, StorageBackend, configured_backend
+
+# inotify(7) event masks
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+_WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+_libc = None
+
+
+def _inotify_libc():
+    """libc with inotify support, or None (non-Linux, or not loadable)."""
+    global _libc
+    if _libc is None:
+        _libc = False
+        if sys.platform.startswith("linux"):
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+                libc.inotify_init1, libc.inotify_add_watch  # Both must exist
+                _libc = libc
+            except (OSError, AttributeError):
+                pass
+    return _libc or None
+
+
+class LogWatcher:
+    """
+    Waits for changes to named files in one or more directories.
+    
+    Uses inotify where available; otherwise compares (inode, size, mtime)
+    of the files every poll_interval seconds.
+    """
+    
+    def __init__(self, watches: Iterable[Tuple[Path, Iterable[str]]], poll_interval: float = 0.05):
+        self.watches = [(Path(directory), set(names)) for directory, names in watches]
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        self._names_by_wd: Dict[int, set] = {}
+        
+        libc = _inotify_libc()
+        if libc:
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                for directory, names in self.watches:
+                    wd = libc.inotify_add_watch(fd, os.fsencode(directory), _WATCH_MASK)
+                    if wd < 0:
+                        self._names_by_wd = {}
+                        break
+                    self._names_by_wd.setdefault(wd, set()).update(names)
+                if self._names_by_wd:
+                    self._fd = fd
+                else:
+                    os.close(fd)
+        
+        self._snapshot = self._stat()
+    
+    @property
+    def uses_inotify(self) -> bool:
+        return self._fd is not None
+    
+    def _stat(self) -> tuple:
+        snapshot = []
+        for directory, names in self.watches:
+            for name in sorted(names):
+                try:
+                    stat = os.stat(directory / name)
+                    snapshot.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+                except FileNotFoundError:
+                    snapshot.append(None)
+        return tuple(snapshot)
+    
+    def _relevant(self, data: bytes) -> bool:
+        """Whether a batch of inotify events touches one of our files."""
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(data):
+            wd, _, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            if name in self._names_by_wd.get(wd, ()):
+                return True
+        return False
+    
+    def wait(self, timeout: float) -> bool:
+        """Block until a watched file changes (True) or timeout seconds pass (False)."""
+        deadline = time.monotonic() + timeout
+        
+        if self._fd is not None:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                try:
+                    ready, _, _ = select.select([self._fd], [], [], remaining)
+                    if not ready:
+                        return False
+                    if self._relevant(os.read(self._fd, 65536)):
+                        return True
+                except BlockingIOError:
+                    continue  # Another waiter drained the notifications
+                except (OSError, TypeError, ValueError):
+                    return False  # Closed while waiting
+        
+        while True:
+            snapshot = self._stat()
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.poll_interval, remaining))
+    
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class Subscription:
+    """
+    Live feed of coordination events from a storage backend.
+    
+    Iterate it (or `async for` over it) to receive events as they are
+    appended; `resume_token` is the token to pass as from_offset to pick up
+    after the last event handed out. Iteration ends once stop_event is set
+    or close() is called.
+    """
+    
+    BATCH_SIZE = 1000  # Events read per pass, so a long backlog is not buffered whole
+    
+    def __init__(self, storage: StorageBackend, position: Any, last_event_id: Optional[str] = None,
+                 types: Optional[Iterable[str]] = None, stop_event: Optional[threading.Event] = None,
+                 wait_interval: float = 0.5):
+        self.storage = storage
+        self.types = set(types) if types else None
+        self.stop_event = stop_event or threading.Event()
+        self.wait_interval = wait_interval  # Longest blocking wait; bounds shutdown latency
+        
+        self._position = position
+        self._last_event_id = last_event_id
+        self._skip_through: Optional[str] = None  # Set after relocating: already delivered up to this id
+        self._buffer: deque = deque()  # (event, token)
+        self._lock = threading.Lock()  # Guards reading and the buffer
+        self._read_token = self.storage.position_token(position, last_event_id)
+        self.resume_token = self._read_token
+        self._watcher = LogWatcher(storage.watch_paths())
+    
+    def _fill(self) -> bool:
+        """Buffer newly appended matching events; True if any were buffered."""
+        for attempt in range(2):
+            try:
+                read = 0
+                for event, position in self.storage.read_events(self._position):
+                    self._position = position
+                    if event is None:
+                        continue
+                    if self._skip_through is not None:
+                        if event["id"] == self._skip_through:
+                            self._skip_through = None
+                        continue
+                    
+                    self._last_event_id = event["id"]
+                    self._read_token = self.storage.position_token(position, event["id"])
+                    if self.types is None or event["type"] in self.types:
+                        self._buffer.append((event, self._read_token))
+                    
+                    read += 1
+                    if read >= self.BATCH_SIZE:
+                        break
+                break
+            except LogPositionLost:
+                # The segment was compacted under us: continue after the last event seen
+                if attempt or self._last_event_id is None:
+                    raise
+                self._position = self.storage.relocate(self._last_event_id)
+                self._skip_through = self._last_event_id
+        
+        if not self._buffer:
+            self.resume_token = self._read_token  # Skipped events need not be read again
+        return bool(self._buffer)
+    
+    def _take(self) -> Dict:
+        event, self.resume_token = self._buffer.popleft()
+        if not self._buffer:
+            self.resume_token = self._read_token
+        return event
+    
+    def _wait_ready(self, timeout: Optional[float]) -> bool:
+        """
+        Wait up to timeout seconds (None: until stopped) for a matching
+        event to be buffered. Events are only taken by the caller, so an
+        abandoned wait (a cancelled async consumer) loses nothing.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.stop_event.is_set():
+            with self._lock:
+                if self._buffer or self._fill():
+                    return True
+                position = self._position
+            if self.storage.await_position(position):
+                continue  # Read again once the held-back event is in or settled
+            
+            wait = self.wait_interval if deadline is None else min(self.wait_interval, deadline - time.monotonic())
+            if wait <= 0:
+                return False
+            self._watcher.wait(wait)
+        return False
+    
+    def next_event(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """
+        The next matching event, waiting up to timeout seconds (None: until
+        one arrives or the subscription is stopped). Returns None if none came.
+        """
+        if not self._wait_ready(timeout):
+            return None
+        with self._lock:
+            return self._take() if self._buffer else None
+    
+    def poll(self, timeout: float = 0) -> List[Dict]:
+        """All matching events available within timeout seconds; returns as soon as there are any."""
+        if not self._wait_ready(timeout):
+            return []
+        events = []
+        with self._lock:
+            while self._buffer or self._fill():
+                events.append(self._take())
+        return events
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self) -> Dict:
+        event = self.next_event()
+        if event is None:
+            raise StopIteration
+        return event
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self) -> Dict:
+        # Wait in a worker thread, one wait_interval at a time, so a
+        # cancelled consumer leaves no thread waiting for long
+        loop = asyncio.get_running_loop()
+        while not self.stop_event.is_set():
+            with self._lock:
+                if self._buffer:
+                    return self._take()
+            await loop.run_in_executor(None, self._wait_ready, self.wait_interval)
+        raise StopAsyncIteration
+    
+    def close(self) -> None:
+        self.stop_event.set()
+        self._watcher.close()
+
+
+def open_subscription(storage: StorageBackend, from_offset: Optional[str] = None,
+                      types: Optional[Iterable[str]] = None, **kwargs) -> Subscription:
+    """
+    Subscribe to a backend's events.
+    
+    from_offset is a resume token, "earliest" (replay the whole log on
+    disk), or None / "latest" (only events appended from now on).
+    """
+    last_event_id = None
+    if from_offset in (None, "latest"):
+        position = storage.end_position()
+    elif from_offset == "earliest":
+        position = storage.first_position()
+    else:
+        position, last_event_id = storage.token_position(from_offset)
+    return Subscription(storage, position, last_event_id, types, **kwargs)
+
+
+def main():
+    """Print coordination events as they are appended (one JSON object per line)."""
+    parser = argparse.ArgumentParser(description="Follow the coordination event log")
+    parser.add_argument("--coordination-path", default="/Users/michaelmishayev/Desktop/Projects/school_2/coordination",
+                        help="Coordination directory containing orchestration/")
+    parser.add_argument("--types", help="Comma-separated event types to show")
+    parser.add_argument("--from", dest="from_offset", default="latest",
+                        help="Resume token, 'earliest' or 'latest'")
+    args = parser.parse_args()
+    
+    orchestration_path = Path(args.coordination_path) / "orchestration"
+    backend = configured_backend(orchestration_path)
+    if issubclass(BACKENDS[backend], JsonlStorageBackend):
+        # Readers never seal segments, so no checkpoint source is needed
+        storage = BACKENDS[backend](orchestration_path, checkpoint_source=lambda: ({}, {}, None))
+    else:
+        storage = BACKENDS[backend](orchestration_path)
+    
+    subscription = open_subscription(storage, args.from_offset,
+                                     args.types.split(",") if args.types else None)
+    try:
+        for event in subscription:
+            print(json.dumps({"token": subscription.resume_token, "event": event}), flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscription.close()
+
+
+if __name__ == "__main__":
+    main()
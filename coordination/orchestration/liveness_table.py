@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Agent Liveness Table
+
+Fixed-size, memory-mapped table with one slot per registered agent. Agents
+write heartbeats into their own slot in place, and the orchestrator reads the
+whole table in one pass, so heartbeats never touch the event log.
+
+Layout (little-endian):
+  header: magic, version, slot count
+  slot:   sequence, pid, timestamp, agent id, current task
+
+Every slot write (claim, release, heartbeat) is serialized with flock on the
+table file plus a thread lock, and re-checks the slot's owner inside that
+critical section, so a heartbeat can never land in a slot that was released
+and handed to another agent. Writers bump the sequence to an odd value before
+changing the slot and back to even afterwards; readers take no lock and retry
+until they see the same even sequence on both sides of the read. After
+READ_RETRIES attempts a reader takes the lock instead; an odd sequence seen
+then was left by a writer that died mid-update and is reset.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+MAGIC = b"LIVENESS"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+SLOT = struct.Struct("<Iqd64s64s")
+SLOT_SIZE = 160  # SLOT.size padded for room to grow
+ID_FIELD_SIZE = 64
+
+_SEQUENCE = struct.Struct("<I")
+_AGENT_ID_OFFSET = struct.calcsize("<Iqd")
+
+READ_RETRIES = 1000  # Lock-free read attempts before a reader takes the lock
+
+
+class LivenessTable:
+    """
+    Memory-mapped agent liveness table.
+    
+    CRITICAL: agent ids and task ids longer than 64 bytes are truncated, so
+    ids must stay unique within their first 64 bytes.
+    """
+    
+    def __init__(self, path: Path, slot_count: int = 256):
+        self.path = Path(path)
+        self._slot_index: Dict[str, int] = {}  # agent_id -> slot, verified on use
+        self._lock = threading.RLock()  # flock does not exclude threads sharing the descriptor
+        self._lock_depth = 0  # Nesting of _locked() in the thread holding _lock
+        
+        self._create_if_missing(slot_count)
+        self._file = open(self.path, 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        
+        magic, version, self.slot_count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise Exception(f"Not a liveness table: {self.path}")
+    
+    def _create_if_missing(self, slot_count: int) -> None:
+        """Create a zeroed table; linking the finished file in keeps creation atomic."""
+        if self.path.exists():
+            return
+        
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(f".tmp.{os.getpid()}")
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, slot_count))
+                f.write(b"\0" * (self._slot_offset(slot_count) - HEADER.size))
+                f.flush()
+                os.fsync(f.fileno())
+            os.link(temp_path, self.path)
+        except FileExistsError:
+            pass  # Another process created it first
+        finally:
+            temp_path.unlink(missing_ok=True)
+    
+    @staticmethod
+    def _slot_offset(slot: int) -> int:
+        return HEADER.size + slot * SLOT_SIZE
+    
+    @staticmethod
+    def _encode_id(value: Optional[str]) -> bytes:
+        return (value or "").encode()[:ID_FIELD_SIZE]
+    
+    @contextmanager
+    def _locked(self):
+        """
+        Exclusive access for slot writers, across threads and processes.
+        Re-entrant: only the outermost level takes and drops the flock, so a
+        nested use (a locked reader under a writer) keeps the writer's
+        critical section whole.
+        """
+        with self._lock:
+            if not self._lock_depth:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if not self._lock_depth:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+    
+    def _read_slot(self, slot: int) -> Optional[Dict]:
+        """Consistent copy of one slot, or None if it is free."""
+        offset = self._slot_offset(slot)
+        if not self._map[offset + _AGENT_ID_OFFSET]:
+            return None  # Free slots are skipped without decoding
+        
+        for _ in range(READ_RETRIES):
+            sequence, pid, timestamp, agent_id, current_task = SLOT.unpack_from(self._map, offset)
+            if sequence % 2 == 0 and _SEQUENCE.unpack_from(self._map, offset)[0] == sequence:
+                break
+            time.sleep(0)  # Writer mid-update
+        else:
+            # No writer can be mid-update while we hold the lock
+            with self._locked():
+                sequence, pid, timestamp, agent_id, current_task = SLOT.unpack_from(self._map, offset)
+                if sequence % 2:
+                    _SEQUENCE.pack_into(self._map, offset, (sequence + 1) & 0xFFFFFFFF)  # Writer died mid-update
+        
+        agent_id = agent_id.rstrip(b"\0").decode(errors="replace")
+        if not agent_id:
+            return None
+        
+        return {
+            "agent_id": agent_id,
+            "pid": pid,
+            "last_heartbeat": timestamp,
+            "current_task": current_task.rstrip(b"\0").decode(errors="replace") or None
+        }
+    
+    def _write_slot(self, slot: int, agent_id: Optional[str], pid: int,
+                    timestamp: float, current_task: Optional[str]) -> None:
+        """Overwrite one slot in place under its sequence counter; caller holds _locked()."""
+        offset = self._slot_offset(slot)
+        sequence = _SEQUENCE.unpack_from(self._map, offset)[0]
+        _SEQUENCE.pack_into(self._map, offset, (sequence + 1) & 0xFFFFFFFF)
+        SLOT.pack_into(self._map, offset, (sequence + 1) & 0xFFFFFFFF, pid, timestamp,
+                       self._encode_id(agent_id), self._encode_id(current_task))
+        _SEQUENCE.pack_into(self._map, offset, (sequence + 2) & 0xFFFFFFFF)
+    
+    def _find_slot(self, agent_id: str) -> Optional[int]:
+        """Slot currently held by agent_id, checking the cached index first."""
+        encoded = self._encode_id(agent_id)
+        
+        slot = self._slot_index.get(agent_id)
+        if slot is not None:
+            entry = self._read_slot(slot)
+            if entry and self._encode_id(entry["agent_id"]) == encoded:
+                return slot
+            del self._slot_index[agent_id]
+        
+        for slot in range(self.slot_count):
+            entry = self._read_slot(slot)
+            if entry and self._encode_id(entry["agent_id"]) == encoded:
+                self._slot_index[agent_id] = slot
+                return slot
+        return None
+    
+    def claim(self, agent_id: str, pid: int) -> int:
+        """Give agent_id a slot (reusing one it already holds) and mark it alive."""
+        with self._locked():
+            slot = self._find_slot(agent_id)
+            if slot is None:
+                slot = next((s for s in range(self.slot_count) if self._read_slot(s) is None), None)
+                if slot is None:
+                    raise Exception(f"Liveness table full ({self.slot_count} slots)")
+            
+            self._write_slot(slot, agent_id, pid, time.time(), None)
+            self._slot_index[agent_id] = slot
+            return slot
+    
+    def release(self, agent_id: str) -> bool:
+        """Free agent_id's slot. Returns False if it held none."""
+        with self._locked():
+            slot = self._find_slot(agent_id)
+            if slot is None:
+                return False
+            
+            self._write_slot(slot, None, 0, 0.0, None)
+            self._slot_index.pop(agent_id, None)
+            return True
+    
+    def beat(self, agent_id: str, current_task: Optional[str] = None) -> bool:
+        """
+        Record a heartbeat in agent_id's slot. Returns False if it holds none,
+        including when the slot was released (and maybe reclaimed) under it.
+        """
+        with self._locked():
+            slot = self._find_slot(agent_id)
+            entry = self._read_slot(slot) if slot is not None else None
+            if entry is None:
+                return False
+            
+            self._write_slot(slot, agent_id, entry["pid"], time.time(), current_task)
+            return True
+    
+    def get(self, agent_id: str) -> Optional[Dict]:
+        """Liveness entry for one agent, or None if it holds no slot."""
+        slot = self._find_slot(agent_id)
+        return self._read_slot(slot) if slot is not None else None
+    
+    def scan(self) -> Dict[str, Dict]:
+        """Liveness entries of every agent holding a slot."""
+        entries = {}
+        for slot in range(self.slot_count):
+            entry = self._read_slot(slot)
+            if entry:
+                entries[entry["agent_id"]] = entry
+        return entries
+    
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
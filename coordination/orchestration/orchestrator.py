@@ -19,14 +19,23 @@ import json
 import signal
 import subprocess
 import threading
+import uuid
+from collections import deque
 from pathlib import Path
+from statistics import median
 from typing import Dict, List, Optional, Set
 from datetime import datetime, timezone
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 
 # Add coordination module to path
 sys.path.append(str(Path(__file__).parent))
 from coordination_protocol import CoordinationProtocol, AgentType, TaskStatus
+from scheduler import SCHEDULERS
+from autoscaler import Autoscaler, ScalingPolicy
+
+# An agent that prints a line containing this is ready for work (registering
+# through the coordination protocol counts as well)
+AGENT_READY_LINE = "CLAUDE_AGENT_READY"
 
 @dataclass
 class AgentProcess:
@@ -36,8 +45,10 @@ class AgentProcess:
     process: subprocess.Popen
     workspace_path: Path
     last_heartbeat: float
-    status: str  # "starting", "active", "idle", "error", "stopped"
+    status: str  # "starting", "active", "idle", "draining", "retiring", "error", "stopped"
     restart_count: int = 0
+    started_at: float = 0.0  # When the process was spawned
+    output: deque = field(default_factory=lambda: deque(maxlen=20))  # Last lines of stdout/stderr
     
 class MultiClaudeOrchestrator:
     """
@@ -51,7 +62,8 @@ class MultiClaudeOrchestrator:
     - Provide central coordination interface
     """
     
-    def __init__(self, base_path: str = "/Users/michaelmishayev/Desktop/Projects/school_2"):
+    def __init__(self, base_path: str = "/Users/michaelmishayev/Desktop/Projects/school_2",
+                 scheduler: str = "least-outstanding"):
         self.base_path = Path(base_path)
         self.coordination_path = self.base_path / "coordination"
         self.protocol = CoordinationProtocol(str(self.coordination_path))
@@ -68,12 +80,39 @@ class MultiClaudeOrchestrator:
             AgentType.RED: 1     # Only one red agent (expensive)
         }
         
+        # Autoscaling between min and max per type (autoscaler.py). Blue and
+        # Green always run one agent and keep up to one more warm when
+        # demand is high; Red keeps one warm standby so the first critical
+        # review doesn't wait for an Opus agent to start
+        self.scaling_policies = {
+            AgentType.BLUE: ScalingPolicy(min_agents=1, max_agents=self.max_agents_per_type[AgentType.BLUE],
+                                          max_warm_agents=1),
+            AgentType.GREEN: ScalingPolicy(min_agents=1, max_agents=self.max_agents_per_type[AgentType.GREEN],
+                                           max_warm_agents=1),
+            AgentType.RED: ScalingPolicy(min_agents=0, max_agents=self.max_agents_per_type[AgentType.RED],
+                                         warm_agents=1, max_warm_agents=1, scale_down_cooldown=120)
+        }
+        self.autoscaler = Autoscaler(self.scaling_policies)
+        
         self.heartbeat_timeout = 60  # Seconds before considering agent dead
+        self.startup_timeout = 120  # Seconds for a new agent to become ready
+        self._spawn_lock = threading.Lock()  # Guards "starting" -> "active"/failed transitions
         self.max_restart_attempts = 3
         
-        # Task distribution settings
-        self.task_check_interval = 10  # Seconds between task distribution
-        self.load_balance_threshold = 5  # Max tasks per agent before load balancing
+        # Retention: finished tasks older than this move to the task archive,
+        # checked every archive_interval seconds
+        self.task_retention = 24 * 3600
+        self.archive_interval = 3600
+        self._last_archive = 0.0
+        
+        # Task distribution settings: the dispatcher wakes on coordination
+        # events and otherwise runs a safety-net round every task_check_interval
+        self.task_check_interval = 30  # Seconds between rounds without events
+        self.load_balance_threshold = 5  # Max outstanding (queued + running) tasks per agent
+        self.scheduler = SCHEDULERS[scheduler]()  # Picks the agent for each ready task
+        self._dispatch_wakeup = threading.Condition()
+        self._dispatch_requested = False
+        self._dispatch_latencies = deque(maxlen=1000)  # Recent create-to-assign seconds
         
         # Register signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
@@ -104,10 +143,12 @@ class MultiClaudeOrchestrator:
             self.monitor_thread = threading.Thread(target=self._monitor_agents, daemon=True)
             self.monitor_thread.start()
             
-            # Start task distribution thread
+            # Start task distribution thread, woken by coordination events
             print("📦 Starting task distribution...")
             distribution_thread = threading.Thread(target=self._distribute_tasks, daemon=True)
             distribution_thread.start()
+            watch_thread = threading.Thread(target=self._watch_dispatch_events, daemon=True)
+            watch_thread.start()
             
             print("✅ Multi-Claude Orchestrator is running!")
             print("📊 Monitor status: ./monitor-agents.sh")
@@ -128,14 +169,19 @@ class MultiClaudeOrchestrator:
         # Start 1 Green agent initially (code generation)
         self._start_agent(AgentType.GREEN)
         
-        # Red agent is started on-demand for critical tasks
-        print("🔴 Red agent on standby (started on-demand for critical tasks)")
+        # Red agent is started by the autoscaler as a warm standby for critical tasks
+        print("🔴 Red agent on warm standby (kept ready by the autoscaler)")
     
     def _start_agent(self, agent_type: AgentType) -> Optional[str]:
         """
-        Start a single agent process.
+        Start a single agent process without waiting for it.
+        
+        The agent stays "starting" until it registers with the coordination
+        protocol or prints AGENT_READY_LINE, and is then dispatched to;
+        _check_starting_agents() drops it if it exits or misses
+        startup_timeout. Several agents can start at once.
         
-        Returns agent_id if successful, None if failed.
+        Returns agent_id if the process was spawned, None if failed.
         """
         # Check if we've reached the limit for this agent type
         active_agents = [a for a in self.agents.values() 
@@ -145,9 +191,9 @@ class MultiClaudeOrchestrator:
             print(f"⚠️ Maximum {agent_type.value} agents already running")
             return None
         
-        # Generate unique agent ID
+        # Generate unique agent ID (agents started in the same second differ by suffix)
         timestamp = int(time.time())
-        agent_id = f"{agent_type.value}-agent-{timestamp}"
+        agent_id = f"{agent_type.value}-agent-{timestamp}-{uuid.uuid4().hex[:6]}"
         
         # Prepare workspace
         workspace_path = self.coordination_path / "agent-workspaces" / f"{agent_type.value}-agent"
@@ -162,8 +208,9 @@ class MultiClaudeOrchestrator:
             process = subprocess.Popen(
                 cmd,
                 cwd=workspace_path,
+                env=self._agent_environment(agent_id, agent_type, workspace_path),
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
                 universal_newlines=True,
                 bufsize=1
             )
@@ -175,29 +222,70 @@ class MultiClaudeOrchestrator:
                 process=process,
                 workspace_path=workspace_path,
                 last_heartbeat=time.time(),
-                status="starting"
+                status="starting",
+                started_at=time.time()
             )
             
             self.agents[agent_id] = agent_process
-            
-            # Wait briefly to ensure process started
-            time.sleep(2)
-            
-            if process.poll() is None:  # Process still running
-                print(f"✅ {agent_type.value.upper()} agent started: {agent_id}")
-                agent_process.status = "active"
-                return agent_id
-            else:
-                print(f"❌ {agent_type.value} agent failed to start: {agent_id}")
-                stdout, stderr = process.communicate()
-                print(f"   stdout: {stdout[:200]}...")
-                print(f"   stderr: {stderr[:200]}...")
-                return None
+            threading.Thread(target=self._follow_agent_output, args=(agent_process,), daemon=True).start()
+            return agent_id
                 
         except Exception as e:
             print(f"❌ Error starting {agent_type.value} agent: {e}")
+            self.autoscaler.record_start_failure(agent_type)
             return None
     
+    def _follow_agent_output(self, agent: AgentProcess) -> None:
+        """Read an agent's output (so its pipe never fills) and watch for the readiness line."""
+        try:
+            for line in agent.process.stdout:
+                agent.output.append(line.rstrip())
+                if AGENT_READY_LINE in line:
+                    self._agent_ready(agent.agent_id, "readiness line")
+        except (OSError, ValueError):
+            pass  # Pipe closed while stopping the agent
+    
+    def _agent_ready(self, agent_id: str, probe: str) -> None:
+        """Move a starting agent to active and let the dispatcher use it."""
+        with self._spawn_lock:
+            agent = self.agents.get(agent_id)
+            if agent is None or agent.status != "starting":
+                return
+            agent.status = "active"
+            agent.last_heartbeat = time.time()
+        
+        startup = time.time() - agent.started_at
+        self.autoscaler.record_startup(agent.agent_type, startup)
+        print(f"✅ {agent.agent_type.value.upper()} agent ready after {startup:.1f}s ({probe}): {agent_id}")
+        self._wake_dispatcher()
+    
+    def _check_starting_agents(self) -> None:
+        """Probe starting agents: registered means ready; exited or timed out means failed."""
+        for agent in [a for a in list(self.agents.values()) if a.status == "starting"]:
+            if self.protocol.get_agent(agent.agent_id) is not None:
+                self._agent_ready(agent.agent_id, "registered")
+                continue
+            
+            exited = agent.process.poll() is not None
+            if not exited and time.time() - agent.started_at < self.startup_timeout:
+                continue
+            
+            with self._spawn_lock:
+                if agent.status != "starting":
+                    continue
+                agent.status = "error"
+            
+            if exited:
+                print(f"❌ {agent.agent_type.value} agent failed to start: {agent.agent_id}")
+            else:
+                print(f"⏱️ {agent.agent_type.value} agent not ready after {self.startup_timeout}s: {agent.agent_id}")
+                agent.process.kill()
+                agent.process.wait()
+            if agent.output:
+                print("   output: " + " | ".join(agent.output)[-400:])
+            self.autoscaler.record_start_failure(agent.agent_type)  # Backs off its replacement
+            del self.agents[agent.agent_id]  # Frees the slot; the autoscaler replaces it
+    
     def _build_agent_command(self, agent_id: str, agent_type: AgentType, 
                            workspace_path: Path) -> List[str]:
         """
@@ -210,15 +298,6 @@ class MultiClaudeOrchestrator:
         # Base Claude Code command
         cmd = ["claude", "code"]
         
-        # Add agent-specific environment variables
-        env = os.environ.copy()
-        env.update({
-            "CLAUDE_AGENT_ID": agent_id,
-            "CLAUDE_AGENT_TYPE": agent_type.value,
-            "CLAUDE_WORKSPACE": str(workspace_path),
-            "CLAUDE_COORDINATION_PATH": str(self.coordination_path)
-        })
-        
         # Model selection based on agent type
         model_mapping = {
             AgentType.BLUE: "haiku",     # Fast and cheap for search
@@ -233,6 +312,17 @@ class MultiClaudeOrchestrator:
         
         return cmd
     
+    def _agent_environment(self, agent_id: str, agent_type: AgentType, workspace_path: Path) -> Dict[str, str]:
+        """Environment for an agent process: ours plus its identity and paths."""
+        env = os.environ.copy()
+        env.update({
+            "CLAUDE_AGENT_ID": agent_id,
+            "CLAUDE_AGENT_TYPE": agent_type.value,
+            "CLAUDE_WORKSPACE": str(workspace_path),
+            "CLAUDE_COORDINATION_PATH": str(self.coordination_path)
+        })
+        return env
+    
     def _monitor_agents(self) -> None:
         """
         Continuous monitoring of agent processes.
@@ -242,14 +332,20 @@ class MultiClaudeOrchestrator:
         - Process restart on failures
         - Resource monitoring
         - Deadlock detection
+        - Archiving finished tasks past the retention period
+        - Flushing the derived views for external readers
         """
         
         while not self.shutdown_event.is_set():
             try:
                 current_time = time.time()
                 agents_to_restart = []
+                self._refresh_heartbeats()
                 
-                for agent_id, agent in self.agents.items():
+                for agent_id, agent in list(self.agents.items()):
+                    if agent.status == "starting":
+                        continue  # Startup is watched by _check_starting_agents
+                    
                     # Check if process is still running
                     if agent.process.poll() is not None:
                         print(f"💀 {agent.agent_type.value.upper()} agent died: {agent_id}")
@@ -259,17 +355,21 @@ class MultiClaudeOrchestrator:
                     # Check heartbeat timeout
                     if current_time - agent.last_heartbeat > self.heartbeat_timeout:
                         print(f"💓 {agent.agent_type.value.upper()} agent heartbeat timeout: {agent_id}")
-                        # Try to get latest heartbeat from coordination system
-                        self._update_agent_heartbeat(agent_id)
-                        
-                        # If still timed out, mark for restart
-                        if current_time - agent.last_heartbeat > self.heartbeat_timeout:
-                            agents_to_restart.append(agent_id)
+                        agents_to_restart.append(agent_id)
                 
                 # Restart failed agents
                 for agent_id in agents_to_restart:
                     self._restart_agent(agent_id)
                 
+                if current_time - self._last_archive >= self.archive_interval:
+                    self._last_archive = current_time
+                    report = self.protocol.archive_tasks(self.task_retention)
+                    if report and report["archived"]:
+                        print(f"🗄️ Archived {report['archived']} finished tasks ({', '.join(report['partitions'])})")
+                
+                # Keep task-queue.json / agent-registry.json current for the shell tools
+                self.protocol.flush_views()
+                
                 # Sleep before next check
                 self.shutdown_event.wait(30)  # Check every 30 seconds
                 
@@ -277,35 +377,31 @@ class MultiClaudeOrchestrator:
                 print(f"❌ Error in agent monitoring: {e}")
                 self.shutdown_event.wait(10)
     
-    def _update_agent_heartbeat(self, agent_id: str) -> None:
-        """Update agent heartbeat from coordination system."""
+    def _refresh_heartbeats(self) -> None:
+        """Update every agent's heartbeat from one scan of the liveness table."""
         try:
-            with open(self.protocol.agent_registry_path) as f:
-                registry_data = json.load(f)
+            liveness = self.protocol.get_agent_liveness()
             
-            if agent_id in registry_data["agents"]:
-                agent_data = registry_data["agents"][agent_id]
-                last_heartbeat_str = agent_data["last_heartbeat"]
-                
-                # Parse ISO timestamp
-                last_heartbeat_dt = datetime.fromisoformat(last_heartbeat_str.replace('Z', '+00:00'))
-                last_heartbeat_timestamp = last_heartbeat_dt.timestamp()
-                
-                # Update our record
-                if agent_id in self.agents:
-                    self.agents[agent_id].last_heartbeat = last_heartbeat_timestamp
+            for agent_id, agent in self.agents.items():
+                entry = liveness.get(agent_id)
+                if entry is not None:
+                    agent.last_heartbeat = max(agent.last_heartbeat, entry["last_heartbeat"])
                     
         except Exception as e:
-            print(f"⚠️ Error updating heartbeat for {agent_id}: {e}")
+            print(f"⚠️ Error reading agent heartbeats: {e}")
     
     def _restart_agent(self, agent_id: str) -> None:
         """
         Restart a failed agent process.
         """
-        if agent_id not in self.agents:
-            return
+        agent = self.agents.get(agent_id)
+        if agent is None or agent.status == "retiring":
+            return  # Already gone, or being retired by the dispatcher
         
-        agent = self.agents[agent_id]
+        if self._begin_retirement(agent_id):
+            # Was being retired anyway: stop it for good instead of restarting it
+            self._retire_agent(agent_id, "died while draining")
+            return
         
         # Check restart limit
         if agent.restart_count >= self.max_restart_attempts:
@@ -325,6 +421,11 @@ class MultiClaudeOrchestrator:
         except Exception as e:
             print(f"⚠️ Error terminating process: {e}")
         
+        self.protocol.deregister_agent(agent_id)
+        released = self.protocol.release_agent_tasks(agent_id)  # The new agent gets a new id
+        if released:
+            print(f"↩️ Requeued {len(released)} tasks held by {agent_id}")
+        
         # Increment restart count
         agent.restart_count += 1
         
@@ -333,7 +434,7 @@ class MultiClaudeOrchestrator:
         
         if new_agent_id:
             # Remove old agent record
-            del self.agents[agent_id]
+            self.agents.pop(agent_id, None)
             print(f"✅ Agent restarted: {agent_id} -> {new_agent_id}")
         else:
             print(f"❌ Failed to restart agent: {agent_id}")
@@ -348,84 +449,270 @@ class MultiClaudeOrchestrator:
         - Load balancing across agents
         - Priority-based task scheduling
         - Dynamic agent scaling
+        
+        A round runs as soon as _wake_dispatcher() is called (new task,
+        finished task, agent joining or leaving), and at the latest every
+        task_check_interval seconds in case a wakeup was missed.
         """
         
         while not self.shutdown_event.is_set():
             try:
+                # Starting agents are probed every second until they are ready
+                starting = any(a.status == "starting" for a in list(self.agents.values()))
+                with self._dispatch_wakeup:
+                    self._dispatch_wakeup.wait_for(
+                        lambda: self._dispatch_requested or self.shutdown_event.is_set(),
+                        timeout=1.0 if starting else self.task_check_interval)
+                    self._dispatch_requested = False
+                if self.shutdown_event.is_set():
+                    break
+                
+                self._check_starting_agents()
                 self._distribute_pending_tasks()
                 self._scale_agents_if_needed()
                 
-                # Sleep before next distribution cycle
-                self.shutdown_event.wait(self.task_check_interval)
-                
             except Exception as e:
                 print(f"❌ Error in task distribution: {e}")
                 self.shutdown_event.wait(5)
     
+    def _wake_dispatcher(self) -> None:
+        """Request a distribution round now. Wakeups coalesce while a round runs."""
+        with self._dispatch_wakeup:
+            self._dispatch_requested = True
+            self._dispatch_wakeup.notify()
+    
+    def _watch_dispatch_events(self) -> None:
+        """
+        Wake the dispatcher on coordination events from other processes:
+        tasks submitted by agents or external tools, agents finishing a
+        task (and so becoming idle), and agents registering or leaving.
+        The subscription follows the log via inotify where available.
+        """
+        types = ["task_created", "task_updated", "agent_registered", "agent_deregistered"]
+        while not self.shutdown_event.is_set():
+            subscription = self.protocol.subscribe(types=types, stop_event=self.shutdown_event)
+            try:
+                while not self.shutdown_event.is_set():
+                    events = subscription.poll(timeout=self.task_check_interval)
+                    for event in events:
+                        if event["type"] == "agent_registered":
+                            self._agent_ready(event["data"]["id"], "registered")  # Readiness probe
+                        elif event["type"] == "task_created":
+                            for agent_type in self.protocol.agent_types_for(event["data"]["type"]):
+                                self.autoscaler.record_arrival(agent_type)  # Sizes the warm pools
+                    if events:
+                        self._wake_dispatcher()
+            except Exception as e:
+                print(f"⚠️ Error following coordination events: {e}")
+                self._wake_dispatcher()  # Whatever was missed is picked up by this round
+                self.shutdown_event.wait(5)
+            finally:
+                subscription.close()
+    
     def _distribute_pending_tasks(self) -> None:
-        """Distribute pending tasks to available agents."""
+        """
+        Distribute pending tasks to available agents.
+        
+        Each agent holds at most load_balance_threshold outstanding tasks
+        (assigned and not finished); the scheduler picks among the agents
+        with room. Idle agents then steal queued work from busy siblings.
+        """
         
-        # Get pending tasks for each agent type
         for agent_type in AgentType:
-            available_tasks = self.protocol.get_available_tasks(agent_type)
-            
-            if not available_tasks:
-                continue
-            
             # Get active agents of this type
-            active_agents = [a for a in self.agents.values() 
+            active_agents = [a.agent_id for a in self.agents.values() 
                            if a.agent_type == agent_type and a.status == "active"]
+            has_work = self.protocol.count_available_tasks(agent_type) > 0
             
             if not active_agents:
-                # No agents of this type - consider starting one
-                if agent_type != AgentType.RED:  # Don't auto-start expensive Red agents
-                    print(f"🤖 No {agent_type.value} agents available, starting one...")
-                    self._start_agent(agent_type)
-                continue
+                continue  # The autoscaler starts one if the type has work
             
-            # Distribute tasks to agents
-            for task in available_tasks[:len(active_agents)]:  # One task per agent max
-                # Simple round-robin assignment for now
-                # TODO: Implement intelligent load balancing
-                agent = active_agents[0]  # Pick first available agent
-                
-                task_id = task["id"]
-                success = self.protocol.assign_task(task_id, agent.agent_id)
-                
-                if success:
-                    print(f"📋 Assigned {task['type']} task to {agent.agent_type.value} agent")
-                else:
-                    print(f"⚠️ Failed to assign task {task_id}")
+            load = self._agent_load(active_agents)
+            if has_work:
+                self._assign_ready_tasks(agent_type, active_agents, load)
+            self._steal_work(active_agents, load)
+    
+    def _agent_load(self, agent_ids: List[str]) -> Dict[str, int]:
+        """Outstanding (queued or running) task count per agent, from the query indexes."""
+        return {agent_id: sum(self.protocol.count_tasks(status=status, assigned_to=agent_id)
+                              for status in (TaskStatus.ASSIGNED, TaskStatus.IN_PROGRESS))
+                for agent_id in agent_ids}
+    
+    def _assign_ready_tasks(self, agent_type: AgentType, agent_ids: List[str], load: Dict[str, int]) -> None:
+        """Assign ready tasks in priority order to the agents the scheduler picks."""
+        capacity = sum(max(0, self.load_balance_threshold - load[agent_id]) for agent_id in agent_ids)
+        if not capacity:
+            return
+        
+        for task in self.protocol.get_available_tasks(agent_type, limit=capacity):
+            candidates = [agent_id for agent_id in agent_ids if load[agent_id] < self.load_balance_threshold]
+            if not candidates:
+                break
+            agent_id = self.scheduler.choose(candidates, load)
+            
+            task_id = task["id"]
+            success = self.protocol.assign_task(task_id, agent_id)
+            
+            if success:
+                load[agent_id] += 1
+                self._record_dispatch_latency(task, agent_type)
+                print(f"📋 Assigned {task['type']} task to {agent_id}")
+            else:
+                print(f"⚠️ Failed to assign task {task_id}")
+    
+    def _steal_work(self, agent_ids: List[str], load: Dict[str, int]) -> None:
+        """
+        Move queued, unstarted tasks from the busiest agents to idle ones of
+        the same type, newest first, until their loads are within one. An
+        agent's only task is never taken; it is about to start it.
+        """
+        for thief in [agent_id for agent_id in agent_ids if load[agent_id] == 0]:
+            victim = max(agent_ids, key=lambda agent_id: load[agent_id])
+            if load[victim] < 2:
+                break
+            
+            queued = self.protocol.query_tasks(status=TaskStatus.ASSIGNED, assigned_to=victim,
+                                               limit=self.load_balance_threshold)["tasks"]
+            for task in reversed(queued):
+                if load[victim] - load[thief] < 2:
+                    break
+                if self.protocol.reassign_task(task["id"], victim, thief):
+                    load[victim] -= 1
+                    load[thief] += 1
+                    print(f"🔀 {thief} took queued {task['type']} task from {victim}")
+    
+    def _record_dispatch_latency(self, task: Dict, agent_type: AgentType) -> None:
+        """Record the time from a task's creation to its assignment."""
+        created_at = datetime.fromisoformat(task["created_at"])
+        self._dispatch_latencies.append((agent_type, (datetime.now(timezone.utc) - created_at).total_seconds()))
+    
+    def get_dispatch_latency(self, agent_type: Optional[AgentType] = None) -> Dict:
+        """Median and worst create-to-assign latency (ms) over recent assignments (of one agent type)."""
+        latencies = [seconds for assigned_type, seconds in list(self._dispatch_latencies)
+                     if agent_type is None or assigned_type == agent_type]
+        if not latencies:
+            return {"samples": 0, "median_ms": None, "max_ms": None}
+        return {
+            "samples": len(latencies),
+            "median_ms": round(median(latencies) * 1000, 1),
+            "max_ms": round(max(latencies) * 1000, 1)
+        }
+    
+    def get_warm_pool_report(self) -> Dict:
+        """
+        Per agent type: the warm pool target and idle ready agents, against
+        the measured agent startup time and the time tasks actually waited
+        for an agent. startup_avoided_s is what a task would have waited
+        without a ready agent, minus what it did wait.
+        """
+        report = {}
+        for agent_type in self.autoscaler.policies:
+            ready = [a.agent_id for a in list(self.agents.values())
+                     if a.agent_type == agent_type and a.status == "active"]
+            startup = self.autoscaler.startup_time(agent_type)
+            assign = self.get_dispatch_latency(agent_type)
+            report[agent_type.value] = {
+                "warm_target": self.autoscaler.warm_target(agent_type),
+                "idle_ready_agents": sum(1 for held in self._agent_load(ready).values() if not held),
+                "median_startup_s": None if startup is None else round(startup, 2),
+                "median_time_to_assign_ms": assign["median_ms"],
+                "startup_avoided_s": (None if startup is None or assign["median_ms"] is None
+                                      else round(startup - assign["median_ms"] / 1000, 2))
+            }
+        return report
     
     def _scale_agents_if_needed(self) -> None:
         """
         Dynamic agent scaling based on workload.
+        
+        The autoscaler decides per type; decisions are applied here and
+        logged as autoscaler_decision events. Agents chosen for retirement
+        are drained (no new tasks) and stopped once they hold none.
         """
-        # Get current task queue sizes
-        task_counts = {agent_type: len(self.protocol.get_available_tasks(agent_type)) 
-                      for agent_type in AgentType}
-        
-        # Scale up if needed (except Red agents)
-        for agent_type in [AgentType.BLUE, AgentType.GREEN]:
-            pending_tasks = task_counts[agent_type]
-            active_agents = len([a for a in self.agents.values() 
-                               if a.agent_type == agent_type and a.status == "active"])
+        self._retire_drained_agents()
+        
+        for agent_type in self.autoscaler.policies:
+            running = [a.agent_id for a in list(self.agents.values())
+                       if a.agent_type == agent_type and a.status in ("starting", "active")]
+            decision = self.autoscaler.evaluate(agent_type, self.protocol.count_available_tasks(agent_type),
+                                                self._agent_load(running))
+            if decision is None:
+                continue
             
-            # If more tasks than agents and under limit, start another agent
-            if (pending_tasks > active_agents and 
-                active_agents < self.max_agents_per_type[agent_type]):
-                
-                print(f"📈 Scaling up {agent_type.value} agents: {pending_tasks} tasks, {active_agents} agents")
-                self._start_agent(agent_type)
+            self.protocol.log_scaling_decision(asdict(decision))
+            if decision.action == "scale_up":
+                print(f"📈 Scaling up {agent_type.value} agents by {decision.count}: {decision.reason}")
+                for _ in range(decision.count):
+                    self._start_agent(agent_type)
+            else:
+                print(f"📉 Scaling down {agent_type.value} agents: {decision.reason}")
+                for agent_id in decision.retire:
+                    agent = self.agents.get(agent_id)
+                    if agent is not None:  # May have died and been replaced meanwhile
+                        agent.status = "draining"
+    
+    def _retire_drained_agents(self) -> None:
+        """Stop draining agents that have finished all their tasks."""
+        draining = [a.agent_id for a in list(self.agents.values()) if a.status == "draining"]
+        for agent_id, held in self._agent_load(draining).items():
+            if held or not self._begin_retirement(agent_id):
+                continue
+            print(f"👋 Retiring idle {self.agents[agent_id].agent_type.value} agent: {agent_id}")
+            self._retire_agent(agent_id, "drained")
+    
+    def _begin_retirement(self, agent_id: str) -> bool:
+        """
+        Take a draining agent for retirement. The monitor (agent died) and
+        the dispatcher (agent drained) may race for the same agent; only the
+        one that gets True stops and removes it.
+        """
+        with self._spawn_lock:
+            agent = self.agents.get(agent_id)
+            if agent is None or agent.status != "draining":
+                return False
+            agent.status = "retiring"
+            return True
+    
+    def _retire_agent(self, agent_id: str, reason: str) -> None:
+        """Stop an agent taken by _begin_retirement, requeue what it still held and drop it."""
+        agent = self.agents[agent_id]
+        self._stop_agent(agent_id)
+        released = self.protocol.release_agent_tasks(agent_id)
+        if released:
+            print(f"↩️ Requeued {len(released)} tasks held by {agent_id}")
+        self.agents.pop(agent_id, None)
+        self.protocol.log_scaling_decision({"agent_type": agent.agent_type.value, "action": "retired",
+                                            "count": 1, "reason": reason, "retire": [agent_id]})
+    
+    def _stop_agent(self, agent_id: str) -> None:
+        """Terminate an agent process and deregister it."""
+        agent = self.agents[agent_id]
+        try:
+            if agent.process is not None and agent.process.poll() is None:
+                agent.process.terminate()
+                agent.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            print(f"🔪 Force killing agent: {agent_id}")
+            agent.process.kill()
+        except Exception as e:
+            print(f"⚠️ Error stopping agent {agent_id}: {e}")
+        
+        self.protocol.deregister_agent(agent_id)
+        agent.status = "stopped"
     
     def create_task(self, task_type: str, description: str, priority: int = 2,
-                   context: str = None, dependencies: List[str] = None) -> str:
+                   context: str = None, dependencies: List[str] = None,
+                   idempotency_key: Optional[str] = None) -> str:
         """
         Create a new task in the coordination system.
         
         This is the main interface for external systems to submit work.
+        Callers that may retry a submission pass an idempotency_key; a
+        repeat returns the original task's id.
         """
-        task_id = self.protocol.create_task(task_type, description, priority, context, dependencies)
+        task_id = self.protocol.create_task(task_type, description, priority, context, dependencies,
+                                            idempotency_key)
+        self._wake_dispatcher()
         
         priority_emoji = "🔴" if priority == 1 else "🟡" if priority == 2 else "🟢"
         print(f"📋 Created task {priority_emoji}: {description}")
@@ -442,32 +729,34 @@ class MultiClaudeOrchestrator:
             agents = [a for a in self.agents.values() if a.agent_type == agent_type]
             agent_status[agent_type.value] = {
                 "active": len([a for a in agents if a.status == "active"]),
+                "starting": len([a for a in agents if a.status == "starting"]),
+                "draining": len([a for a in agents if a.status == "draining"]),
                 "total": len(agents),
-                "max": self.max_agents_per_type[agent_type]
+                "max": self.max_agents_per_type.get(agent_type, 0)
             }
         
         # Task queue status
         task_status = {}
         for agent_type in AgentType:
-            tasks = self.protocol.get_available_tasks(agent_type)
-            task_status[agent_type.value] = len(tasks)
+            task_status[agent_type.value] = self.protocol.count_available_tasks(agent_type)
+        
+        # Totals per status straight from the protocol's secondary indexes
+        status_counts = {status.value: self.protocol.count_tasks(status=status) for status in TaskStatus}
         
         return {
             "timestamp": datetime.now(timezone.utc).isoformat(),
             "agents": agent_status,
             "pending_tasks": task_status,
+            "tasks_by_status": status_counts,
+            "dispatch_latency": self.get_dispatch_latency(),
+            "warm_pool": self.get_warm_pool_report(),
             "coordination_healthy": self._check_coordination_health()
         }
     
     def _check_coordination_health(self) -> bool:
         """Check if coordination system is healthy."""
         try:
-            # Try to read coordination files
-            with open(self.protocol.task_queue_path) as f:
-                json.load(f)
-            with open(self.protocol.agent_registry_path) as f:
-                json.load(f)
-            return True
+            return self.protocol.check_health()
         except Exception:
             return False
     
@@ -479,27 +768,19 @@ class MultiClaudeOrchestrator:
         
         # Signal shutdown to all threads
         self.shutdown_event.set()
+        self._wake_dispatcher()
         
         # Terminate all agent processes
-        for agent_id, agent in self.agents.items():
+        for agent_id, agent in list(self.agents.items()):
             print(f"🔄 Stopping {agent.agent_type.value} agent: {agent_id}")
-            
-            try:
-                if agent.process.poll() is None:
-                    agent.process.terminate()
-                    agent.process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                print(f"🔪 Force killing agent: {agent_id}")
-                agent.process.kill()
-            except Exception as e:
-                print(f"⚠️ Error stopping agent {agent_id}: {e}")
-            
-            agent.status = "stopped"
+            self._stop_agent(agent_id)
         
         # Wait for monitoring thread to finish
         if self.monitor_thread and self.monitor_thread.is_alive():
             self.monitor_thread.join(timeout=5)
         
+        self.protocol.flush_views()
+        
         print("✅ All agents stopped. Orchestrator shutdown complete.")
     
     def run_interactive(self) -> None:
@@ -570,10 +851,12 @@ def main():
                        help="Run in interactive mode")
     parser.add_argument("--base-path", default="/Users/michaelmishayev/Desktop/Projects/school_2",
                        help="Base path for coordination")
+    parser.add_argument("--scheduler", choices=sorted(SCHEDULERS), default="least-outstanding",
+                       help="Policy for picking the agent that gets each task")
     
     args = parser.parse_args()
     
-    orchestrator = MultiClaudeOrchestrator(args.base_path)
+    orchestrator = MultiClaudeOrchestrator(args.base_path, args.scheduler)
     
     if args.interactive:
         orchestrator.run_interactive()
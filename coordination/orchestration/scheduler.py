@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Task Schedulers
+
+Policies the orchestrator uses to pick which agent of a type receives a
+ready task. A policy sees the candidate agents (those with room under the
+orchestrator's load_balance_threshold) and each agent's outstanding load:
+tasks assigned to it that are queued or in progress.
+
+Policies:
+  least-outstanding   the agent with the fewest outstanding tasks (exact,
+                      reads every candidate's load)
+  power-of-two        the less loaded of two agents sampled at random
+                      (near-optimal balance from two reads, and concurrent
+                      dispatchers don't all pile onto the same agent)
+
+Usage:
+  MultiClaudeOrchestrator(base_path, scheduler="power-of-two")
+  SCHEDULERS["my-policy"] = MyScheduler   # any Scheduler subclass
+"""
+
+import random
+from typing import Dict, List, Optional
+
+
+class Scheduler:
+    """Base policy: subclasses implement choose()."""
+    
+    name = "base"
+    
+    def choose(self, agent_ids: List[str], load: Dict[str, int]) -> str:
+        """
+        The agent (from agent_ids, never empty) that gets the next task.
+        load maps every agent id to its outstanding task count; the caller
+        increments it after each assignment.
+        """
+        raise NotImplementedError
+
+
+class LeastOutstandingScheduler(Scheduler):
+    """Fewest outstanding tasks wins; ties go to the first candidate."""
+    
+    name = "least-outstanding"
+    
+    def choose(self, agent_ids: List[str], load: Dict[str, int]) -> str:
+        return min(agent_ids, key=lambda agent_id: load[agent_id])
+
+
+class PowerOfTwoScheduler(Scheduler):
+    """The less loaded of two random candidates."""
+    
+    name = "power-of-two"
+    
+    def __init__(self, seed: Optional[int] = None):
+        self._random = random.Random(seed)
+    
+    def choose(self, agent_ids: List[str], load: Dict[str, int]) -> str:
+        if len(agent_ids) == 1:
+            return agent_ids[0]
+        first, second = self._random.sample(agent_ids, 2)
+        return first if load[first] <= load[second] else second
+
+
+SCHEDULERS = {
+    LeastOutstandingScheduler.name: LeastOutstandingScheduler,
+    PowerOfTwoScheduler.name: PowerOfTwoScheduler,
+}
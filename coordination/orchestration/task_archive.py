@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Task Archive
+
+Cold storage for finished tasks that the retention policy
+(CoordinationProtocol.archive_tasks) moves out of the hot state. Archived
+tasks are appended as compressed JSON lines to one file per day of
+completion (UTC), so a date range maps to a handful of files and old
+partitions can be moved or deleted as a whole.
+
+Layout:
+  archive/<YYYY>/<MM>/tasks-<YYYY-MM-DD>.jsonl.gz   (gzip, default)
+  archive/<YYYY>/<MM>/tasks-<YYYY-MM-DD>.jsonl.xz   (lzma)
+  each append is one complete gzip member / xz stream; readers read the
+  members in sequence, and a batch torn by a crash ends the partition
+  archive/keys/<xx>.jsonl   idempotency key -> task id and partition day,
+                            bucketed by a one-byte hash of the key
+
+The key index backs the protocol's Bloom filter (archived-keys.bloom): a
+filter hit reads one bucket, about 1/256 of the archived keys, instead of
+every partition. Archives written before the index existed are indexed on
+first lookup.
+
+A record is the task as it left the hot state plus "archived_at". Results
+and contexts stay blob references (the blob store never deletes).
+
+Usage:
+  python3 task_archive.py query --coordination-path /path/to/coordination --status failed --since 2026-10-01
+  python3 task_archive.py archive --coordination-path /path/to/coordination --older-than-hours 24
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import shutil
+import sys
+import uuid
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# compression -> (file suffix, module with compress() and open())
+COMPRESSORS = {"gzip": (".gz", gzip), "lzma": (".xz", lzma)}
+_OPENERS = {suffix: module for suffix, module in COMPRESSORS.values()}
+
+
+def _as_date(value: Any) -> Optional[date]:
+    """A date from a date, datetime or ISO 8601 string (None passes through)."""
+    if value is None or (isinstance(value, date) and not isinstance(value, datetime)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+class TaskArchive:
+    """
+    Date-partitioned, compressed archive of finished tasks.
+    
+    Writers must be serialized by the caller (the protocol holds its
+    "archive" lock); readers need no lock.
+    """
+    
+    def __init__(self, path: Path, compression: str = "gzip"):
+        if compression not in COMPRESSORS:
+            raise ValueError(f"Unknown archive compression: {compression}")
+        self.path = Path(path)
+        self.compression = compression
+    
+    def _partition_path(self, day: date) -> Path:
+        suffix = COMPRESSORS[self.compression][0]
+        return self.path / f"{day:%Y}" / f"{day:%m}" / f"tasks-{day.isoformat()}.jsonl{suffix}"
+    
+    @staticmethod
+    def _key_bucket(keys_path: Path, key: str) -> Path:
+        return keys_path / f"{hashlib.blake2b(key.encode(), digest_size=1).hexdigest()}.jsonl"
+    
+    def _append_keys(self, keys_path: Path, tasks: List[Dict]) -> None:
+        """Record the idempotency keys of tasks in their buckets (fsynced)."""
+        by_bucket: Dict[Path, List[bytes]] = {}
+        for task in tasks:
+            key = task.get("idempotency_key")
+            if key is None:
+                continue
+            entry = {"key": key, "id": task["id"], "day": _as_date(task["updated_at"]).isoformat()}
+            line = json.dumps(entry, separators=(",", ":")).encode() + b"\n"
+            by_bucket.setdefault(self._key_bucket(keys_path, key), []).append(line)
+        
+        keys_path.mkdir(parents=True, exist_ok=True)
+        for bucket_path, lines in by_bucket.items():
+            with open(bucket_path, "ab") as f:
+                f.write(b"".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def _ensure_key_index(self) -> None:
+        """Index the keys of an archive written before the key index existed."""
+        keys_path = self.path / "keys"
+        if keys_path.exists() or not self.partitions():
+            return
+        
+        # Built aside and renamed in, so a concurrent reader never sees half an index
+        building_path = self.path / f"keys.tmp.{uuid.uuid4().hex}"
+        try:
+            for partition_path in self.partitions():
+                self._append_keys(building_path, list(self.read_partition(partition_path)))
+            building_path.rename(keys_path)
+        except OSError:
+            pass  # Another reader renamed its index in first
+        finally:
+            shutil.rmtree(building_path, ignore_errors=True)
+    
+    def find_key(self, key: str) -> Optional[Tuple[str, str]]:
+        """
+        (task id, partition day) of the archived task submitted with
+        idempotency key, or None. Reads a single key bucket.
+        """
+        self._ensure_key_index()
+        found = None
+        try:
+            with open(self._key_bucket(self.path / "keys", key), "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Torn by a crash mid-append
+                    if entry["key"] == key:
+                        found = (entry["id"], entry["day"])
+        except FileNotFoundError:
+            pass
+        return found
+    
+    def append(self, tasks: List[Dict]) -> List[str]:
+        """
+        Archive tasks into the partition of the day each was last updated,
+        and their idempotency keys into the key index. Every file written is
+        fsynced before this returns. Returns the partition file names.
+        """
+        self._ensure_key_index()  # Before these tasks' partitions exist
+        archived_at = datetime.now(timezone.utc).isoformat()
+        by_day: Dict[date, List[bytes]] = {}
+        for task in tasks:
+            record = dict(task, archived_at=archived_at)
+            line = json.dumps(record, separators=(",", ":"), default=str).encode() + b"\n"
+            by_day.setdefault(_as_date(task["updated_at"]), []).append(line)
+        
+        module = COMPRESSORS[self.compression][1]
+        written = []
+        for day, lines in sorted(by_day.items()):
+            partition_path = self._partition_path(day)
+            partition_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(partition_path, "ab") as f:
+                f.write(module.compress(b"".join(lines)))
+                f.flush()
+                os.fsync(f.fileno())
+            written.append(partition_path.name)
+        self._append_keys(self.path / "keys", tasks)
+        return written
+    
+    def partitions(self, since: Any = None, until: Any = None) -> List[Path]:
+        """Partition files for the days from since to until (inclusive), oldest first."""
+        since, until = _as_date(since), _as_date(until)
+        selected = []
+        for partition_path in self.path.glob("*/*/tasks-*.jsonl.*"):
+            suffix = partition_path.suffix
+            if suffix not in _OPENERS:
+                continue
+            day = date.fromisoformat(partition_path.name[len("tasks-"):-len(".jsonl" + suffix)])
+            if (since is None or day >= since) and (until is None or day <= until):
+                selected.append((day, partition_path))
+        return [partition_path for _, partition_path in sorted(selected)]
+    
+    def read_partition(self, partition_path: Path) -> Iterator[Dict]:
+        """Records of one partition, in the order they were archived."""
+        try:
+            with _OPENERS[partition_path.suffix].open(partition_path, "rt") as f:
+                for line in f:
+                    yield json.loads(line)
+        except (EOFError, OSError, lzma.LZMAError, ValueError) as e:
+            print(f"⚠️ Archive partition {partition_path.name} ends in a damaged batch: {e}")
+    
+    def query(self, status: Optional[str] = None, task_type: Optional[str] = None,
+              assigned_to: Optional[str] = None, since: Any = None, until: Any = None) -> Iterator[Dict]:
+        """
+        Archived tasks matching every given filter, oldest partition first.
+        since/until bound the completion day; only those partitions are read.
+        """
+        filters = {"status": status, "type": task_type, "assigned_to": assigned_to}
+        filters = {field: value for field, value in filters.items() if value is not None}
+        for partition_path in self.partitions(since, until):
+            # A batch re-archived after a crash repeats its tasks; the last copy wins
+            records = {record["id"]: record for record in self.read_partition(partition_path)}
+            for record in records.values():
+                if all(record.get(field) == value for field, value in filters.items()):
+                    yield record
+    
+    def get(self, task_id: str, day: Any = None) -> Optional[Dict]:
+        """
+        An archived task by id. With day (the task's last update) only that
+        partition is read; otherwise partitions are searched newest first.
+        """
+        candidates = self.partitions(day, day) if day is not None else self.partitions()[::-1]
+        for partition_path in candidates:
+            found = None
+            for record in self.read_partition(partition_path):
+                if record["id"] == task_id:
+                    found = record
+            if found is not None:
+                return found
+        return None
+
+
+def main():
+    """Command-line access to the task archive."""
+    parser = argparse.ArgumentParser(description="Query or apply the task archive")
+    parser.add_argument("command", choices=["query", "archive"])
+    parser.add_argument("--coordination-path", default="/Users/michaelmishayev/Desktop/Projects/school_2/coordination",
+                        help="Coordination directory containing orchestration/")
+    parser.add_argument("--status", help="query: archived status (completed, failed, cancelled)")
+    parser.add_argument("--type", help="query: task type")
+    parser.add_argument("--since", help="query: first completion day (YYYY-MM-DD)")
+    parser.add_argument("--until", help="query: last completion day (YYYY-MM-DD)")
+    parser.add_argument("--task-id", help="query: a single task")
+    parser.add_argument("--older-than-hours", type=float, default=24,
+                        help="archive: retention period for finished tasks")
+    
+    args = parser.parse_args()
+    
+    if args.command == "archive":
+        from coordination_protocol import CoordinationProtocol
+        
+        report = CoordinationProtocol(args.coordination_path).archive_tasks(args.older_than_hours * 3600)
+        if not report:
+            print("❌ Failed to acquire archive lock")
+            sys.exit(1)
+        print(f"🗄️ Archived {report['archived']} finished tasks ({', '.join(report['partitions']) or 'none due'})")
+        return
+    
+    archive = TaskArchive(Path(args.coordination_path) / "orchestration" / "archive")
+    if args.task_id:
+        records = [record for record in [archive.get(args.task_id)] if record is not None]
+    else:
+        records = archive.query(status=args.status, task_type=args.type, since=args.since, until=args.until)
+    for record in records:
+        print(json.dumps(record))
+
+
+if __name__ == "__main__":
+    main()
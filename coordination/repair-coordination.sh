@@ -335,24 +335,21 @@ except Exception as e:
 optimize_system() {
     info "Performing system optimization..."
     
-    # Compress old event logs
-    local event_log="$ORCHESTRATION_DIR/event-log.jsonl"
-    if [[ -f "$event_log" ]]; then
-        local event_count=$(wc -l < "$event_log")
-        if [[ $event_count -gt 10000 ]]; then
-            warning "Event log has $event_count events, consider archiving"
-            
-            # Create compressed archive of old events
-            local archive_file="$COORDINATION_DIR/logs/events-$(date +%Y%m%d-%H%M%S).jsonl.gz"
-            gzip -c "$event_log" > "$archive_file" || warning "Failed to archive events"
-            
-            # Keep only recent events (last 1000)
-            tail -1000 "$event_log" > "$event_log.tmp"
-            mv "$event_log.tmp" "$event_log"
-            
-            info "Archived old events to: $archive_file"
-        fi
-    fi
+    # Compact sealed log segments (folds heartbeats and superseded status
+    # updates into the latest snapshot; task history is kept)
+    cd "$ORCHESTRATION_DIR"
+    python3 -c "
+from coordination_protocol import CoordinationProtocol
+
+try:
+    protocol = CoordinationProtocol('$COORDINATION_DIR')
+    stats = protocol.compact_event_log()
+    print(f\"✅ Compacted {stats['segments_compacted']} segments: \"
+          f\"{stats['events_before']} -> {stats['events_after']} events\")
+except Exception as e:
+    print(f'❌ Compaction failed: {e}')
+    exit(1)
+" || warning "Failed to compact event log"
     
     # Optimize file permissions for performance
     find "$COORDINATION_DIR" -type f -exec chmod 600 {} \\; 2>/dev/null || true
@@ -387,6 +384,8 @@ emergency_recovery() {
     rm -f "$ORCHESTRATION_DIR/event-log.jsonl"
     rm -f "$ORCHESTRATION_DIR/task-queue.json"
     rm -f "$ORCHESTRATION_DIR/agent-registry.json"
+    rm -rf "$ORCHESTRATION_DIR/segments"
+    rm -rf "$ORCHESTRATION_DIR/snapshots"
     rm -rf "$ORCHESTRATION_DIR/locks"
     
     # Reinitialize